@@ -14,3 +14,17 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dcrm.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402  (после django.setup())
+
+if settings.DEBUG:
+    # как runserver: статика без отдельного веб-сервера в режиме отладки
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
+
+from website.telegram_bot.webhook import TelegramWebhookApp, webhook_enabled  # noqa: E402
+
+if webhook_enabled():
+    # Telegram бот в том же процессе: обновления приходят на секретный путь
+    application = TelegramWebhookApp(application)
@@ -1,3 +1,13 @@
+import heapq
+import json
+import logging
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+
 class StripNullOriginMiddleware:
     """
     Workaround for clients that send `Origin: null` on POST requests.
@@ -32,3 +42,206 @@ class StripNullOriginMiddleware:
         return self.get_response(request)
 
 
+sql_profiler_logger = logging.getLogger("dcrm.sql_profiler")
+
+_IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def sql_fingerprint(sql: str) -> str:
+    """Normalize a statement so repeated queries (N+1) share one fingerprint."""
+    sql = _IN_LIST_RE.sub("(%s, ...)", sql)
+    return _LITERAL_RE.sub("?", sql)
+
+
+class _QueryProfile:
+    """connection.execute_wrapper collecting per-request SQL stats."""
+
+    def __init__(self, top: int):
+        self.top = top
+        self.count = 0
+        self.total_ms = 0.0
+        self.by_fingerprint = defaultdict(lambda: [0, 0.0])
+        self.slowest = []  # min-heap of (ms, seq, sql), at most `top` items
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, (time.perf_counter() - started) * 1000)
+
+    def record(self, sql: str, ms: float):
+        self.count += 1
+        self.total_ms += ms
+        stats = self.by_fingerprint[sql_fingerprint(sql)]
+        stats[0] += 1
+        stats[1] += ms
+        item = (ms, self.count, sql)
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, item)
+        elif ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+    def duplicates(self):
+        dups = [(count, ms, fp) for fp, (count, ms) in self.by_fingerprint.items() if count > 1]
+        dups.sort(key=lambda d: (d[0], d[1]), reverse=True)
+        return dups[: self.top]
+
+
+class SQLProfilerMiddleware:
+    """
+    Opt-in per-request SQL profiler (settings.SQL_PROFILER_ENABLED).
+
+    For a sampled share of requests (SQL_PROFILER_SAMPLE_RATE) it counts queries on
+    every DB connection, total SQL time, repeated statement fingerprints (N+1) and
+    the slowest statements. Results go to the `Server-Timing` response header and
+    to one JSON line in the "dcrm.sql_profiler" logger: INFO normally, WARNING when
+    a threshold is exceeded (the "flags" field says which one).
+
+    Unsampled requests only pay for one random() call.
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+
+        self.get_response = get_response
+        self.sample_rate = settings.SQL_PROFILER_SAMPLE_RATE
+        self.top = settings.SQL_PROFILER_TOP
+        self.slow_request_ms = settings.SQL_PROFILER_SLOW_REQUEST_MS
+        self.slow_query_ms = settings.SQL_PROFILER_SLOW_QUERY_MS
+        self.max_queries = settings.SQL_PROFILER_MAX_QUERIES
+        self.max_duplicates = settings.SQL_PROFILER_MAX_DUPLICATES
+
+    def __call__(self, request):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        from django.db import connections
+
+        profile = _QueryProfile(self.top)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        self._add_server_timing(response, profile, total_ms)
+        self._log(request, response, profile, total_ms)
+        return response
+
+    def _add_server_timing(self, response, profile, total_ms):
+        timing = (
+            f'db;dur={profile.total_ms:.1f};desc="{profile.count} queries", '
+            f"app;dur={max(total_ms - profile.total_ms, 0):.1f}, "
+            f"total;dur={total_ms:.1f}"
+        )
+        existing = response.get("Server-Timing")
+        response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+
+    def _flags(self, profile, total_ms, duplicates):
+        flags = []
+        if total_ms >= self.slow_request_ms:
+            flags.append("slow_request")
+        if profile.count >= self.max_queries:
+            flags.append("many_queries")
+        if duplicates and duplicates[0][0] >= self.max_duplicates:
+            flags.append("duplicate_queries")
+        if profile.slowest and max(profile.slowest)[0] >= self.slow_query_ms:
+            flags.append("slow_query")
+        return flags
+
+    def _log(self, request, response, profile, total_ms):
+        duplicates = profile.duplicates()
+        flags = self._flags(profile, total_ms, duplicates)
+        level = logging.WARNING if flags else logging.INFO
+        if not sql_profiler_logger.isEnabledFor(level):
+            return
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "event": "sql_profile",
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(profile.total_ms, 1),
+            "queries": profile.count,
+            "flags": flags,
+            "duplicates": [
+                {"count": count, "ms": round(ms, 1), "sql": fp[:500]} for count, ms, fp in duplicates
+            ],
+            "slowest": [
+                {"ms": round(ms, 1), "sql": sql[:500]} for ms, _, sql in sorted(profile.slowest, reverse=True)
+            ],
+        }
+        sql_profiler_logger.log(level, json.dumps(record, ensure_ascii=False))
+
+
+class _QueryCounter:
+    """connection.execute_wrapper counting queries and SQL time only."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Request metrics for /metrics (settings.METRICS_ENABLED, see website/utils/metrics.py):
+    latency and status per URL name, SQL query count and SQL time per request.
+    """
+
+    def __init__(self, get_response):
+        from website.utils import metrics
+
+        self.get_response = get_response
+        self.metrics = metrics
+
+    def __call__(self, request):
+        from django.db import connections
+
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        # only resolved URL names as labels: arbitrary paths (404 scans) would blow up cardinality
+        view = (match.view_name or "<unnamed>") if match else "<unresolved>"
+        m = self.metrics
+        m.HTTP_REQUEST_SECONDS.labels(view, request.method).observe(elapsed)
+        m.HTTP_RESPONSES.labels(view, request.method, str(response.status_code)).inc()
+        m.HTTP_DB_QUERIES.labels(view).observe(counter.count)
+        m.HTTP_DB_SECONDS.labels(view).observe(counter.seconds)
+        return response
+
+
+class UserRoleMiddleware:
+    """
+    Attaches request.role (website.utils.user_role.UserRole): the user's profile, designer,
+    profession and method, resolved lazily with one query and shared by decorators, views
+    and templates for the rest of the request.
+    """
+
+    def __init__(self, get_response):
+        from website.utils.user_role import UserRole
+
+        self.get_response = get_response
+        self.user_role_class = UserRole
+
+    def __call__(self, request):
+        request.role = self.user_role_class(request.user)
+        return self.get_response(request)
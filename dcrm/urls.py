@@ -1,8 +1,16 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib.auth.decorators import login_required
+from django.views.static import serve
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('website.urls')),
-]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if not settings.DEBUG and settings.SERVE_MEDIA:
+    # static() работает только в DEBUG; в production-режиме (gunicorn) — только вошедшим пользователям
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), login_required(serve), {'document_root': settings.MEDIA_ROOT}),
+    ]
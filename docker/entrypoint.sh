@@ -3,13 +3,36 @@ set -eu
 
 echo "[entrypoint] running migrations..."
 python manage.py migrate --noinput
+# таблица для CACHE_BACKEND=db (ничего не делает для других бэкендов)
+python manage.py createcachetable
 
-if [ "${DJANGO_COLLECTSTATIC:-0}" = "1" ]; then
+# DJANGO_SERVER: runserver (разработка, по умолчанию) | gunicorn (WSGI) | uvicorn (gunicorn + uvicorn-воркеры, ASGI)
+server="${DJANGO_SERVER:-runserver}"
+
+if [ "${TELEGRAM_WEBHOOK_ENABLED:-0}" = "1" ] && [ "${server}" != "uvicorn" ]; then
+  # webhook бота обслуживается dcrm/asgi.py — нужен ASGI-сервер
+  echo "[entrypoint] TELEGRAM_WEBHOOK_ENABLED=1 -> DJANGO_SERVER=uvicorn"
+  server="uvicorn"
+fi
+
+# в production статику раздаёт whitenoise из STATIC_ROOT — собираем её всегда
+if [ "${DJANGO_COLLECTSTATIC:-0}" = "1" ] || [ "${server}" != "runserver" ]; then
   echo "[entrypoint] collectstatic..."
   python manage.py collectstatic --noinput
 fi
 
-echo "[entrypoint] starting django..."
-exec python manage.py runserver 0.0.0.0:8000
-
-
+case "${server}" in
+  gunicorn|uvicorn)
+    echo "[entrypoint] starting django (gunicorn, ${server})..."
+    export DJANGO_SERVER="${server}"
+    exec gunicorn -c /app/docker/gunicorn.conf.py
+    ;;
+  runserver)
+    echo "[entrypoint] starting django..."
+    exec python manage.py runserver 0.0.0.0:8000
+    ;;
+  *)
+    echo "[entrypoint] unknown DJANGO_SERVER=${server} (runserver|gunicorn|uvicorn)" >&2
+    exit 1
+    ;;
+esac
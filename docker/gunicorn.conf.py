@@ -0,0 +1,58 @@
+"""
+Конфигурация gunicorn для production-режима (DJANGO_SERVER=gunicorn|uvicorn в docker/entrypoint.sh)
+
+Мягкая перезагрузка кода/воркеров без простоя: docker compose kill -s HUP web
+(новый код подхватывается только без preload — GUNICORN_PRELOAD=0 по умолчанию; с GUNICORN_PRELOAD=1
+воркеры форкаются из уже импортированного мастера, и для нового кода нужен docker compose restart web)
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# SQLite — один писатель: много процессов не ускорят запись, поэтому по умолчанию не больше 4;
+# для PostgreSQL можно поднять WEB_CONCURRENCY.
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(multiprocessing.cpu_count() * 2 + 1, 4))
+
+if os.environ.get('DJANGO_SERVER') == 'uvicorn':
+    # ASGI (dcrm/asgi.py): webhook Telegram и async-код в одном event loop на воркер
+    wsgi_app = 'dcrm.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'dcrm.wsgi:application'
+    # потоки: запросы ждут БД/сеть (парсинг цен, UFALOFT), а не CPU
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# GUNICORN_PRELOAD=1: приложение импортируется один раз в мастере — воркеры форкаются быстрее и
+# делят память, но HUP больше не перечитывает код (см. выше)
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))  # экспорт Excel, загрузка цен
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+# периодический перезапуск воркеров — защита от утечек памяти
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+# Кому доверять X-Forwarded-* (схема https для is_secure/CSRF/secure-cookie). Порт 8000 публикуется
+# наружу (DJANGO_PORT), поэтому не '*': за Traefik укажите его адрес/подсеть (через запятую, CIDR),
+# а сам 8000 опубликуйте только локально: DJANGO_PORT=127.0.0.1:8000.
+forwarded_allow_ips = os.environ.get('GUNICORN_FORWARDED_ALLOW_IPS', '127.0.0.1')
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # значения метрик прошлого запуска web (PROMETHEUS_MULTIPROC_DIR, см. website/utils/metrics.py)
+    from website.utils.metrics import cleanup_process_files
+
+    cleanup_process_files()
+
+
+def post_fork(server, worker):
+    # соединения с БД, открытые в мастере при preload, нельзя делить между процессами
+    from django.db import connections
+
+    connections.close_all()
@@ -2,11 +2,9 @@
 from django.contrib import admin
 from django import forms
 from django.utils import timezone
-from decimal import Decimal
-import requests
-from bs4 import BeautifulSoup
-import re
-from .models import Category, CategoryField, Product, ProductCustomField, CalculationMethod, Profession, Designer, Profile, WorkerPayment, WorkerPaymentDeduction
+from .models import Category, CategoryField, Product, ProductCustomField, CalculationMethod, Profession, Designer, Profile, WorkerPayment, WorkerPaymentDeduction, PriceFetchFailure, RecordStatusEvent, TelegramOutbox, TelegramDigestItem
+from .utils.price_scraper import fetch_price, extract_price_from_text, scrape_prices
+from .utils.price_history import record_price_changes
 from django.urls import path
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect
@@ -282,64 +280,14 @@ class ProductAdmin(admin.ModelAdmin):
     def parse_price(self, url):
         """Универсальная функция парсинга цены"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
-            }
-            logger.debug(f"Попытка запроса к {url}")
-            response = requests.get(url, headers=headers, timeout=10, verify=False)
-            logger.debug(f"Статус: {response.status_code}")
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Пробуем стандартные селекторы для популярных селекторов цен
-            price_element = None
-            # Здесь можно добавить стандартные селекторы для различных сайтов
-            if price_element:
-                return self.extract_price_from_text(price_element.get_text())
-
-            # Автоопределение для MDM
-            if 'mdm-' in url or 'mdm.com' in url:
-                price_element = soup.select_one('.price-main')
-                if price_element:
-                    return self.extract_price_from_text(price_element.get_text())
-
-            # Универсальные селекторы
-            universal_selectors = [
-                '.price', '.product-price', '[itemprop="price"]',
-                '.current-price', '.js-product-price', '.price-value'
-            ]
-            for selector in universal_selectors:
-                price_element = soup.select_one(selector)
-                if price_element:
-                    price = self.extract_price_from_text(price_element.get_text())
-                    if price:
-                        return price
-
-            raise ValueError("Цена не найдена на странице")
-
+            return fetch_price(url)
         except Exception as e:
             logger.error(f"Ошибка парсинга: {str(e)}")
             raise Exception(f"Ошибка парсинга: {str(e)}")
 
     def extract_price_from_text(self, text):
         """Извлекает цену из текста"""
-        text = text.strip().replace(' ', '').replace(',', '.').replace('₽', '')
-        patterns = [
-            r'(\d+[\.,]\d{2})',  # 123.45 или 123,45
-            r'(\d+)',  # 12345
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                price_str = match.group(1).replace(',', '.')
-                try:
-                    return Decimal(price_str)
-                except:
-                    continue
-        return None
+        return extract_price_from_text(text)
 
     def get_urls(self):
         urls = super().get_urls()
@@ -356,9 +304,12 @@ class ProductAdmin(admin.ModelAdmin):
         product = get_object_or_404(Product, id=object_id)
         try:
             price = self.parse_price(product.source_url)
+            old_price = product.parsed_price
             product.parsed_price = price
             product.last_parsed = timezone.now()
             product.save()
+            record_price_changes([(product.id, old_price, price)], 'parser', ts=product.last_parsed)
+            PriceFetchFailure.objects.filter(url=product.source_url).delete()
             return JsonResponse({'success': True, 'price': str(price)})
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
@@ -374,23 +325,39 @@ class ProductAdmin(admin.ModelAdmin):
         form = super().get_form(request, obj, **kwargs)
         return form
 
+    def save_model(self, request, obj, form, change):
+        old_price = form.initial.get('our_price') if change else None
+        super().save_model(request, obj, form, change)
+        if not change or 'our_price' in form.changed_data:
+            record_price_changes([(obj.id, old_price, obj.our_price)], 'admin')
+
 # Плиты больше не используются
 
 @admin.action(description="Запарсить цены для выбранных товаров")
 def parse_selected_prices(modeladmin, request, queryset):
+    products = [p for p in queryset if p.source_url]
+    results = scrape_prices(p.source_url for p in products)
+    now = timezone.now()
+
     success = 0
     errors = 0
+    updated = []
+    changes = []
+    for product in products:
+        result = results.get(product.source_url)
+        if result and result.ok:
+            changes.append((product.id, product.parsed_price, result.price))
+            product.parsed_price = result.price
+            product.last_parsed = now
+            updated.append(product)
+            success += 1
+        else:
+            errors += 1
 
-    for product in queryset:
-        if product.source_url:
-            try:
-                parsed_price = modeladmin.parse_price(product.source_url)
-                product.parsed_price = parsed_price
-                product.last_parsed = timezone.now()
-                product.save()
-                success += 1
-            except:
-                errors += 1
+    if updated:
+        Product.objects.bulk_update(updated, ['parsed_price', 'last_parsed'])
+        record_price_changes(changes, 'parser', ts=now)
+        PriceFetchFailure.objects.filter(url__in={p.source_url for p in updated}).delete()
 
     modeladmin.message_user(
         request,
@@ -454,4 +421,46 @@ class WorkerPaymentDeductionAdmin(admin.ModelAdmin):
         "payment__record__last_name",
         "payment__record__id",
     ]
-    ordering = ["-created_at", "-id"]
\ No newline at end of file
+    ordering = ["-created_at", "-id"]
+
+
+@admin.register(PriceFetchFailure)
+class PriceFetchFailureAdmin(admin.ModelAdmin):
+    list_display = ["url", "failures", "last_error", "last_failed_at", "next_retry_at"]
+    search_fields = ["url", "last_error"]
+    readonly_fields = ["url", "failures", "last_error", "last_failed_at", "next_retry_at"]
+    ordering = ["-last_failed_at"]
+
+
+@admin.register(RecordStatusEvent)
+class RecordStatusEventAdmin(admin.ModelAdmin):
+    list_display = ["record", "field", "old_value", "new_value", "source", "ts"]
+    list_filter = ["field", "source"]
+    search_fields = ["record__id", "record__first_name", "record__last_name"]
+    readonly_fields = ["record", "field", "old_value", "new_value", "source", "ts"]
+    list_select_related = ["record"]
+    ordering = ["-id"]
+
+
+@admin.register(TelegramOutbox)
+class TelegramOutboxAdmin(admin.ModelAdmin):
+    list_display = ["id", "chat_id", "state", "attempts", "next_attempt_at", "created_at", "sent_at", "last_error"]
+    list_filter = ["state"]
+    search_fields = ["chat_id", "text"]
+    readonly_fields = ["claimed_by", "claimed_at", "created_at", "sent_at"]
+    ordering = ["-id"]
+    actions = ["retry_now"]
+
+    @admin.action(description="Отправить повторно")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(state="sent").update(state="pending", next_attempt_at=timezone.now(), attempts=0, claimed_by="")
+        self.message_user(request, f"Поставлено в очередь: {updated}")
+
+
+@admin.register(TelegramDigestItem)
+class TelegramDigestItemAdmin(admin.ModelAdmin):
+    list_display = ["id", "chat_id", "record", "status", "created_at"]
+    search_fields = ["chat_id"]
+    readonly_fields = ["chat_id", "record", "status", "text", "created_at"]
+    list_select_related = ["record"]
+    ordering = ["-id"]
@@ -11,12 +11,5 @@ class WebsiteConfig(AppConfig):
             import website.signals  # noqa
         except ImportError:
             pass
-        
-        # Стартуем планировщик, если включен через переменную окружения
-        try:
-            from . import apscheduler
-            apscheduler.start()
-        except Exception:
-            # Избегаем падения при миграциях/коллектах и пр.
-            pass
 
+        # Периодические задачи запускаются отдельным сервисом: python manage.py run_scheduler
@@ -1,68 +1,94 @@
+"""Периодические задачи. Запускаются только командой run_scheduler (отдельный сервис),
+веб-процессы фоновых потоков не держат."""
 import os
 import logging
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.background import BackgroundScheduler
 from django_apscheduler.jobstores import DjangoJobStore, register_events
-from django_apscheduler.models import DjangoJobExecution
 from django.core.management import call_command
 import threading
 
 logger = logging.getLogger(__name__)
 
-_scheduler: BackgroundScheduler | None = None
-
-
-def start():
-    global _scheduler
-    if _scheduler is not None:
-        return
-
-    # Start persistent Selenium watcher automatically if enabled
-    if os.environ.get('UFALOFT_WATCH_ENABLED', '0') == '1':
-        interval = os.environ.get('UFALOFT_WATCH_INTERVAL_MIN', '60')
-        index_field = os.environ.get('UFALOFT_INDEX_FIELD', 'first_name')
-        verbose = os.environ.get('UFALOFT_VERBOSE', '1')  # default verbose on
-        headless = os.environ.get('UFALOFT_HEADLESS', '0')
-
-        def run_watch():
-            try:
-                args = ['--interval-min', str(interval), '--index-field', index_field]
-                if verbose == '1':
-                    args.append('--verbose')
-                if headless == '1':
-                    args.append('--headless')
-                logger.info(f'Starting UFALOFT watcher with args: {args}')
-                call_command('ufaloft_watch', *args)
-            except Exception as e:
-                logger.exception('UFALOFT watcher stopped: %s', e)
-
-        t = threading.Thread(target=run_watch, name='UfaloftWatcher', daemon=True)
-        t.start()
-        logger.info('UFALOFT watcher thread started')
-    elif os.environ.get('UFALOFT_SCHEDULE_ENABLED', '0') != '1':
-        logger.info('UFALOFT scheduler disabled. Set UFALOFT_SCHEDULE_ENABLED=1 to enable.')
 
-    scheduler = BackgroundScheduler(timezone=os.environ.get('TZ', 'UTC'))
-    scheduler.add_jobstore(DjangoJobStore(), 'default')
-
-    def job_sync():
-        try:
-            call_command('sync_ufaloft_statuses')
-        except Exception as e:
-            logger.exception('UFALOFT sync failed: %s', e)
-
-    scheduler.add_job(
-        job_sync,
-        'interval',
-        id='ufaloft_sync_job',
-        minutes=60,
-        replace_existing=True,
-        max_instances=1,
-        coalesce=True,
-        jobstore='default',
+def job_sync():
+    try:
+        call_command('sync_ufaloft_statuses')
+    except Exception as e:
+        logger.exception('UFALOFT sync failed: %s', e)
+
+
+def job_refresh_prices():
+    try:
+        call_command('refresh_product_prices')
+    except Exception as e:
+        logger.exception('Price refresh failed: %s', e)
+
+
+def start_ufaloft_watch_thread() -> threading.Thread | None:
+    """Постоянный UFALOFT watcher, если включен UFALOFT_WATCH_ENABLED=1"""
+    if os.environ.get('UFALOFT_WATCH_ENABLED', '0') != '1':
+        return None
+
+    from .utils.watcher_registry import spawn_watcher
+
+    t = spawn_watcher(
+        os.environ.get('UFALOFT_WATCH_MODE', 'hybrid'),
+        int(os.environ.get('UFALOFT_WATCH_INTERVAL_MIN', '60')),
+        os.environ.get('UFALOFT_INDEX_FIELD', 'first_name'),
+        verbose=os.environ.get('UFALOFT_VERBOSE', '1') == '1',  # default verbose on
+        headless=os.environ.get('UFALOFT_HEADLESS', '0') == '1',
     )
+    logger.info('UFALOFT watcher thread started')
+    return t
 
-    register_events(scheduler)
-    scheduler.start()
-    _scheduler = scheduler
-    logger.info('UFALOFT scheduler started (every 60 minutes)')
 
+def _remove_stored_job(jobstore: DjangoJobStore, job_id: str) -> None:
+    """Задача выключена флагом — удаляем её из DjangoJobStore, иначе сохранённая в БД копия продолжит срабатывать"""
+    try:
+        jobstore.remove_job(job_id)
+        logger.info('Removed disabled job %s from the job store', job_id)
+    except JobLookupError:
+        pass
+
+
+def create_scheduler() -> BackgroundScheduler:
+    """Планировщик со всеми периодическими задачами (ещё не запущен)"""
+    scheduler = BackgroundScheduler(timezone=os.environ.get('TZ', 'UTC'))
+    jobstore = DjangoJobStore()
+    scheduler.add_jobstore(jobstore, 'default')
+
+    # Задачи — функции уровня модуля: DjangoJobStore сохраняет ссылку на callable
+    if os.environ.get('UFALOFT_SCHEDULE_ENABLED', '0') == '1':
+        scheduler.add_job(
+            job_sync,
+            'interval',
+            id='ufaloft_sync_job',
+            minutes=60,
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            jobstore='default',
+        )
+    else:
+        logger.info('UFALOFT scheduler disabled. Set UFALOFT_SCHEDULE_ENABLED=1 to enable.')
+        _remove_stored_job(jobstore, 'ufaloft_sync_job')
+
+    # Nightly price refresh: stalest products first, limited per run, with per-URL back-off
+    if os.environ.get('PRICE_REFRESH_ENABLED', '1') == '1':
+        scheduler.add_job(
+            job_refresh_prices,
+            'cron',
+            id='price_refresh_job',
+            hour=int(os.environ.get('PRICE_REFRESH_HOUR', '2')),
+            minute=int(os.environ.get('PRICE_REFRESH_MINUTE', '30')),
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            jobstore='default',
+        )
+    else:
+        _remove_stored_job(jobstore, 'price_refresh_job')
+
+    register_events(scheduler)
+    return scheduler
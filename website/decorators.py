@@ -5,7 +5,7 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from .models import Profile
+from .utils.user_role import get_user_role
 
 
 def worker_required(view_func):
@@ -13,12 +13,8 @@ def worker_required(view_func):
     @wraps(view_func)
     @login_required
     def _wrapped_view(request, *args, **kwargs):
-        try:
-            profile = Profile.objects.get(user=request.user)
-            if profile.is_worker or request.user.is_staff:
-                return view_func(request, *args, **kwargs)
-        except Profile.DoesNotExist:
-            pass
+        if get_user_role(request).is_worker or request.user.is_staff:
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, 'Доступ запрещен. Эта страница доступна только для работников.')
         return redirect('home')
@@ -31,12 +27,8 @@ def customer_required(view_func):
     @wraps(view_func)
     @login_required
     def _wrapped_view(request, *args, **kwargs):
-        try:
-            profile = Profile.objects.get(user=request.user)
-            if profile.is_customer or request.user.is_staff:
-                return view_func(request, *args, **kwargs)
-        except Profile.DoesNotExist:
-            pass
+        if get_user_role(request).is_customer or request.user.is_staff:
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, 'Доступ запрещен. Эта страница доступна только для заказчиков.')
         return redirect('home')
@@ -52,12 +44,8 @@ def staff_or_worker_required(view_func):
         if request.user.is_staff:
             return view_func(request, *args, **kwargs)
         
-        try:
-            profile = Profile.objects.get(user=request.user)
-            if profile.is_worker:
-                return view_func(request, *args, **kwargs)
-        except Profile.DoesNotExist:
-            pass
+        if get_user_role(request).is_worker:
+            return view_func(request, *args, **kwargs)
         
         messages.error(request, 'Доступ запрещен. Эта страница доступна только для сотрудников и работников.')
         return redirect('home')
@@ -5,6 +5,7 @@ from django.forms import inlineformset_factory
 from django.db.models import Q
 from urllib3 import request
 from .models import Record, Product, Category, UnplannedExpense, ProductCustomField, CategoryField
+from .utils.cache_ns import cached
 
 
 class SignUpForm(UserCreationForm):
@@ -133,45 +134,19 @@ class ProductFilterForm(forms.Form):
         super().__init__(*args, **kwargs)
         # Динамически добавляем фильтры на основе полей категорий
         try:
-            # Получаем все поля категорий
-            from .models import CategoryField
-            category_fields = CategoryField.objects.all().select_related('category').order_by('category__name', 'id')
-            
-            # Для каждого поля категории создаем фильтр
-            for field in category_fields:
-                field_key = field.field_key
-                field_name = f'filter_{field_key}'
-                
-                # Получаем уникальные значения из custom_fields для этого поля
-                values = set()
-                
-                # Получаем продукты этой категории
-                # Не используем __has_key, так как он не поддерживается в SQLite
-                products_with_category = Product.objects.filter(
-                    category=field.category
-                ).only('custom_fields', 'id')
-                
-                for product in products_with_category:
-                    value = product.get_field_value(field_key)
-                    if value and str(value).strip():
-                        values.add(str(value).strip())
-                
-                # Создаем фильтр только если есть значения
-                if values:
-                    # Сортируем значения
-                    sorted_values = sorted(values)
-                    choices = [('', f'Все {field.name.lower()}')] + [(v, v) for v in sorted_values]
-                    
-                    self.fields[field_name] = forms.ChoiceField(
-                        choices=choices,
-                        required=False,
-                        label=f"{field.category.name}: {field.name}",
-                        widget=forms.Select(attrs={
-                            'class': 'form-select form-select-sm',
-                            'data-category': field.category.name,
-                            'data-field-key': field_key
-                        })
-                    )
+            specs = cached('catalog', 'product_filter_specs', product_filter_specs)
+            for spec in specs:
+                choices = [('', f"Все {spec['name'].lower()}")] + [(v, v) for v in spec['values']]
+                self.fields[f"filter_{spec['field_key']}"] = forms.ChoiceField(
+                    choices=choices,
+                    required=False,
+                    label=f"{spec['category']}: {spec['name']}",
+                    widget=forms.Select(attrs={
+                        'class': 'form-select form-select-sm',
+                        'data-category': spec['category'],
+                        'data-field-key': spec['field_key']
+                    })
+                )
         except Exception as e:
             # Логируем ошибку для отладки
             import logging
@@ -179,6 +154,40 @@ class ProductFilterForm(forms.Form):
             logger.warning(f"Ошибка создания динамических фильтров: {e}")
 
 
+def product_filter_specs():
+    """
+    Описание динамических фильтров по полям категорий: уникальные значения custom_fields.
+
+    Кэшируется в пространстве 'catalog' (сбрасывается сигналами при изменении каталога);
+    товары каждой категории читаются одним запросом на категорию, а не на каждое поле.
+    """
+    category_fields = CategoryField.objects.all().select_related('category').order_by('category__name', 'id')
+    fields_by_category = {}
+    for field in category_fields:
+        fields_by_category.setdefault(field.category_id, []).append(field)
+
+    values = {field.id: set() for field in category_fields}
+    # Не используем __has_key, так как он не поддерживается в SQLite
+    products = Product.objects.filter(category_id__in=list(fields_by_category)).only('custom_fields', 'category_id')
+    for product in products.iterator():
+        for field in fields_by_category[product.category_id]:
+            value = product.get_field_value(field.field_key)
+            if value and str(value).strip():
+                values[field.id].add(str(value).strip())
+
+    # Создаем фильтр только если есть значения
+    return [
+        {
+            'field_key': field.field_key,
+            'name': field.name,
+            'category': field.category.name,
+            'values': sorted(values[field.id]),
+        }
+        for field in category_fields
+        if values[field.id]
+    ]
+
+
 class HingeFilterForm(forms.Form):
     name = forms.CharField(required=False, label="Название", widget=forms.TextInput(attrs={'class': 'form-control'}))
 
@@ -231,10 +240,11 @@ class UpdateRecordForm(forms.ModelForm):
     
     class Meta:
         model = Record
-        fields = ['customer', 'first_name', 'last_name', 'telegram', 'phone', 'address', 'city', 'kto', 'status', 'advance', 'contract_amount', 'designer', 'designer_worker', 'assembler_worker', 'delivery_price', 'workshop_price', 'designer_manual_salary', 'designer_worker_manual_salary', 'assembler_worker_manual_salary']
+        fields = ['customer', 'first_name', 'last_name', 'external_index', 'telegram', 'phone', 'address', 'city', 'kto', 'status', 'advance', 'contract_amount', 'designer', 'designer_worker', 'assembler_worker', 'delivery_price', 'workshop_price', 'designer_manual_salary', 'designer_worker_manual_salary', 'assembler_worker_manual_salary']
         widgets = {
             'first_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Индекс'}),
             'last_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Наименование'}),
+            'external_index': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Номер заказа в UFALOFT'}),
             'telegram': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Telegram'}),
             'phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Телефон'}),
             'address': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Адрес'}),
@@ -254,6 +264,7 @@ class UpdateRecordForm(forms.ModelForm):
         labels = {
             'first_name': 'Индекс',
             'last_name': 'Наименование',
+            'external_index': 'Индекс UFALOFT',
             'designer': 'Проектировщик',
             'designer_worker': 'Дизайнер',
             'assembler_worker': 'Сборщик',
@@ -0,0 +1,161 @@
+"""
+Бенчмарк конкурентного доступа к SQLite: читатели и писатели на одном файле
+
+Сравнивает настройки SQLite по умолчанию (rollback journal, DEFERRED) с настройками из
+settings.SQLITE_PRAGMAS (WAL, busy_timeout, IMMEDIATE). Работает на временном файле,
+рабочая БД не затрагивается.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+DEFAULT_PROFILE = {
+    'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000},
+    'begin': 'BEGIN',
+}
+
+
+def tuned_profile():
+    return {'pragmas': dict(settings.SQLITE_PRAGMAS), 'begin': 'BEGIN IMMEDIATE'}
+
+
+def _connect(path, pragmas):
+    conn = sqlite3.connect(path, timeout=pragmas.get('busy_timeout', 5000) / 1000, isolation_level=None,
+                           check_same_thread=False)
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+
+def _prepare(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE record (id INTEGER PRIMARY KEY, status TEXT, amount INTEGER, note TEXT)')
+    conn.executemany(
+        'INSERT INTO record (status, amount, note) VALUES (?, ?, ?)',
+        ((random.choice('abcde'), random.randint(0, 10 ** 6), 'x' * 64) for _ in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, seconds, readers, writers, rows, hold_ms):
+    fd, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(fd)
+    os.unlink(path)
+    try:
+        _prepare(path, rows)
+        stop = threading.Event()
+        read_lat, write_lat = [], []
+        errors = {'read': 0, 'write': 0}
+        lock = threading.Lock()
+
+        def reader():
+            conn = _connect(path, profile['pragmas'])
+            local = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute('SELECT status, count(*), sum(amount) FROM record WHERE id > ? GROUP BY status',
+                                 (random.randint(0, rows),)).fetchall()
+                    local.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    with lock:
+                        errors['read'] += 1
+            conn.close()
+            with lock:
+                read_lat.extend(local)
+
+        def writer():
+            conn = _connect(path, profile['pragmas'])
+            local = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute(profile['begin'])
+                    conn.execute('UPDATE record SET amount = amount + 1 WHERE id = ?', (random.randint(1, rows),))
+                    conn.execute('INSERT INTO record (status, amount, note) VALUES (?, ?, ?)', ('a', 1, 'bench'))
+                    # имитация работы внутри транзакции (как sync_dashboard_items)
+                    time.sleep(hold_ms / 1000)
+                    conn.execute('COMMIT')
+                    local.append(time.perf_counter() - started)
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    with lock:
+                        errors['write'] += 1
+            conn.close()
+            with lock:
+                write_lat.extend(local)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+    return {
+        'reads_per_sec': len(read_lat) / seconds,
+        'read_p50_ms': statistics.median(read_lat) * 1000 if read_lat else 0.0,
+        'read_p99_ms': _percentile(read_lat, 99) * 1000,
+        'read_max_ms': max(read_lat, default=0.0) * 1000,
+        'writes_per_sec': len(write_lat) / seconds,
+        'write_p99_ms': _percentile(write_lat, 99) * 1000,
+        'read_errors': errors['read'],
+        'write_errors': errors['write'],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает конкурентное чтение/запись SQLite: настройки по умолчанию и SQLITE_PRAGMAS из settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--hold-ms', type=float, default=5, help='Сколько писатель держит транзакцию')
+        parser.add_argument('--profile', choices=['both', 'default', 'tuned'], default='both')
+
+    def handle(self, *args, **options):
+        profiles = []
+        if options['profile'] in ('both', 'default'):
+            profiles.append(('default', DEFAULT_PROFILE))
+        if options['profile'] in ('both', 'tuned'):
+            profiles.append(('tuned', tuned_profile()))
+
+        self.stdout.write(
+            f"readers={options['readers']} writers={options['writers']} rows={options['rows']} "
+            f"seconds={options['seconds']} hold_ms={options['hold_ms']}"
+        )
+        header = f"{'profile':<8} {'reads/s':>9} {'read p50':>9} {'read p99':>9} {'read max':>9} " \
+                 f"{'writes/s':>9} {'write p99':>10} {'errors r/w':>11}"
+        self.stdout.write(header)
+        for name, profile in profiles:
+            r = run_profile(profile, options['seconds'], options['readers'], options['writers'],
+                            options['rows'], options['hold_ms'])
+            self.stdout.write(
+                f"{name:<8} {r['reads_per_sec']:>9.0f} {r['read_p50_ms']:>7.2f}ms {r['read_p99_ms']:>7.2f}ms "
+                f"{r['read_max_ms']:>7.1f}ms {r['writes_per_sec']:>9.1f} {r['write_p99_ms']:>8.1f}ms "
+                f"{r['read_errors']:>5}/{r['write_errors']}"
+            )
@@ -0,0 +1,58 @@
+"""
+Синтетический набор данных для бенчмарков (website/utils/benchmark_data.py)
+
+    python manage.py generate_benchmark_data                 # 50k заказов, 10k товаров, 500k позиций
+    python manage.py generate_benchmark_data --records 5000 --products 1000 --record-products 50000
+    python manage.py generate_benchmark_data --flush         # удалить сгенерированное
+
+Запускать на отдельной БД (DB_PATH=/tmp/bench.sqlite3 или DATABASE_URL), не на рабочей, и с отдельным
+MEDIA_ROOT (MEDIA_ROOT=/tmp/bench-media) — иначе команда откажется писать CSV раскроя (или --csv-ratio 0).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.utils.benchmark_data import BenchmarkScale, flush_benchmark_data, generate_benchmark_data
+
+
+class Command(BaseCommand):
+    help = 'Генерирует большой синтетический набор данных (bulk_create) для run_benchmarks'
+
+    def add_arguments(self, parser):
+        defaults = BenchmarkScale()
+        parser.add_argument('--records', type=int, default=defaults.records)
+        parser.add_argument('--products', type=int, default=defaults.products)
+        parser.add_argument('--record-products', type=int, default=defaults.record_products)
+        parser.add_argument('--categories', type=int, default=defaults.categories)
+        parser.add_argument('--csv-ratio', type=float, default=defaults.csv_ratio,
+                            help='Доля заказов с CSV раскроя (cp1251) в MEDIA_ROOT/uploads/bench; '
+                                 'нужен отдельный MEDIA_ROOT')
+        parser.add_argument('--payment-ratio', type=float, default=defaults.payment_ratio)
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--flush', action='store_true', help='Только удалить ранее сгенерированные данные')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            deleted = flush_benchmark_data()
+            self.stdout.write(self.style.SUCCESS(f'Удалено: {deleted}'))
+            return
+
+        scale = BenchmarkScale(
+            records=options['records'],
+            products=options['products'],
+            record_products=options['record_products'],
+            categories=options['categories'],
+            csv_ratio=options['csv_ratio'],
+            payment_ratio=options['payment_ratio'],
+            batch_size=options['batch_size'],
+        )
+        started = time.monotonic()
+        try:
+            summary = generate_benchmark_data(scale, seed=options['seed'], log=self.stdout.write)
+        except ValueError as exc:
+            raise CommandError(f'{exc}: задайте MEDIA_ROOT=/tmp/bench-media или --csv-ratio 0')
+        elapsed = time.monotonic() - started
+        for label, count in summary.items():
+            self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Готово за {elapsed:.1f} с'))
@@ -0,0 +1,136 @@
+"""
+Перенос данных из файла SQLite в текущую БД (PostgreSQL из DATABASE_URL)
+
+Порядок:
+    1) DATABASE_URL=postgres://... python manage.py migrate
+    2) DATABASE_URL=postgres://... python manage.py migrate_sqlite_to_postgres --sqlite /data/db.sqlite3
+
+Таблицы копируются по одной, строки читаются потоково (iterator) и пишутся пачками
+многострочным INSERT. Всё в одной транзакции: внешние ключи Django в PostgreSQL
+DEFERRABLE INITIALLY DEFERRED, поэтому порядок таблиц не важен. Целевые таблицы очищаются.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+SOURCE_ALIAS = 'sqlite_source'
+# лимит PostgreSQL — 65535 параметров на запрос
+MAX_PARAMS = 60000
+
+
+def _register_source(path: str):
+    connections.settings[SOURCE_ALIAS] = connections.configure_settings({
+        DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+        SOURCE_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+    })[SOURCE_ALIAS]
+    return connections[SOURCE_ALIAS]
+
+
+def _models_to_copy(source_tables, target_tables):
+    models = []
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta
+        if opts.proxy or not opts.managed:
+            continue
+        if opts.db_table in source_tables and opts.db_table in target_tables:
+            models.append(model)
+    return models
+
+
+class Command(BaseCommand):
+    help = 'Потоково переносит все таблицы из SQLite в PostgreSQL (DATABASE_URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sqlite', default=settings.DB_PATH, help='Путь к файлу SQLite (по умолчанию DB_PATH)')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--noinput', '--no-input', action='store_true', help='Не спрашивать подтверждение')
+
+    def handle(self, *args, **options):
+        target = connections[DEFAULT_DB_ALIAS]
+        if target.vendor != 'postgresql':
+            raise CommandError('Целевая БД — не PostgreSQL: задайте DATABASE_URL=postgres://...')
+        source = _register_source(options['sqlite'])
+        try:
+            source_tables = set(source.introspection.table_names())
+        except Exception as e:
+            raise CommandError(f'Не удалось открыть SQLite {options["sqlite"]}: {e}')
+        if not source_tables:
+            raise CommandError(f'В {options["sqlite"]} нет таблиц')
+        target_tables = set(target.introspection.table_names())
+        if 'website_record' not in target_tables:
+            raise CommandError('В PostgreSQL нет таблиц — сначала выполните manage.py migrate')
+
+        models = _models_to_copy(source_tables, target_tables)
+        skipped = sorted(
+            m._meta.db_table for m in apps.get_models(include_auto_created=True)
+            if m._meta.managed and not m._meta.proxy and m._meta.db_table not in source_tables
+        )
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Нет в SQLite, пропускаю: {", ".join(skipped)}'))
+
+        if not options['noinput']:
+            answer = input(f'Таблицы PostgreSQL ({len(models)}) будут очищены и заполнены из {options["sqlite"]}. Продолжить? [y/N] ')
+            if answer.strip().lower() not in ('y', 'yes', 'д', 'да'):
+                raise CommandError('Отменено')
+
+        started = time.monotonic()
+        total = 0
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            with target.cursor() as cursor:
+                tables = ', '.join(target.ops.quote_name(m._meta.db_table) for m in models)
+                cursor.execute(f'TRUNCATE {tables} RESTART IDENTITY CASCADE')
+                for model in models:
+                    copied = self._copy_model(model, cursor, target, options['batch_size'])
+                    total += copied
+                    self.stdout.write(f'{model._meta.label}: {copied}')
+                for sql in target.ops.sequence_reset_sql(no_style(), models):
+                    cursor.execute(sql)
+
+        mismatched = []
+        for model in models:
+            src_count = model._base_manager.using(SOURCE_ALIAS).count()
+            dst_count = model._base_manager.using(DEFAULT_DB_ALIAS).count()
+            if src_count != dst_count:
+                mismatched.append(f'{model._meta.label}: {src_count} -> {dst_count}')
+        if mismatched:
+            raise CommandError('Не совпало число строк: ' + '; '.join(mismatched))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {len(models)} таблиц, {total} строк за {time.monotonic() - started:.1f} с'
+        ))
+
+    def _copy_model(self, model, cursor, target, batch_size) -> int:
+        fields = model._meta.concrete_fields
+        columns = ', '.join(target.ops.quote_name(f.column) for f in fields)
+        placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        rows_per_insert = max(1, min(batch_size, MAX_PARAMS // len(fields)))
+        table = target.ops.quote_name(model._meta.db_table)
+
+        rows = (
+            model._base_manager.using(SOURCE_ALIAS)
+            .order_by('pk')
+            .values_list(*(f.attname for f in fields))
+            .iterator(chunk_size=batch_size)
+        )
+        copied = 0
+        batch = []
+
+        def flush():
+            params = []
+            for row in batch:
+                params.extend(f.get_db_prep_save(value, connection=target) for f, value in zip(fields, row))
+            cursor.execute(f'INSERT INTO {table} ({columns}) VALUES ' + ', '.join([placeholders] * len(batch)), params)
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= rows_per_insert:
+                flush()
+                copied += len(batch)
+                batch = []
+        if batch:
+            flush()
+            copied += len(batch)
+        return copied
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from website.utils.price_refresh import DEFAULT_BUDGET, DEFAULT_WORKERS, refresh_stale_prices
+
+
+class Command(BaseCommand):
+    help = 'Обновляет цены товаров с source_url: сначала самые давно не парсенные, не больше --budget URL за запуск'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET, help='Максимум URL за один запуск')
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Параллельных запросов к поставщикам')
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--verbose', action='store_true')
+
+    def handle(self, *args, **options):
+        report = refresh_stale_prices(
+            budget=max(0, options['budget']),
+            max_workers=max(1, options['workers']),
+            dry_run=options['dry_run'],
+        )
+        if options['verbose']:
+            for url, error in report.errors.items():
+                self.stdout.write(f'[FAIL] {url}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово. URL: {report.urls}, обновлено товаров: {report.updated}, ошибок: {report.failed}'
+        ))
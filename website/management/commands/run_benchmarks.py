@@ -0,0 +1,186 @@
+"""
+Бенчмарк ключевых страниц: время ответа и число SQL-запросов, результат — JSON
+
+    python manage.py generate_benchmark_data --records 5000 ...   # данные (отдельная БД!)
+    python manage.py run_benchmarks                                # -> /tmp/dcrm-benchmarks/<commit>.json
+    python manage.py run_benchmarks --compare /tmp/dcrm-benchmarks/abc123.json --fail-on-regression
+
+Страницы запрашиваются через django.test.Client от имени суперпользователя, без сети и сервера:
+меряется работа Django (ORM, расчёты, шаблоны). Регрессия — рост числа запросов или медианы
+времени больше чем на --threshold относительно файла --compare. Результаты по умолчанию пишутся
+вне дерева проекта (BENCHMARKS_DIR или <tmp>/dcrm-benchmarks), чтобы не попадать в git.
+"""
+import json
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from website.models import Product, Record, RecordProduct, UploadedFile, WorkerPayment
+
+BENCH_USERNAME = 'bench'
+OUTPUT_DIR = os.environ.get('BENCHMARKS_DIR') or os.path.join(tempfile.gettempdir(), 'dcrm-benchmarks')
+
+# (имя, url name, нужен ли pk заказа)
+CASES = [
+    ('home', 'home', False),
+    ('record_detail', 'record_detail', True),
+    ('analytics_dashboard', 'analytics_dashboard', False),
+    ('payments_page', 'payments_page', False),
+    ('add_products_to_record', 'add_products_to_record', True),
+    ('export_products', 'export_products', True),
+]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class _QueryCounter:
+    # execute_wrapper, а не CaptureQueriesContext: тот хранит не больше 9000 запросов
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Время и число SQL-запросов ключевых страниц (JSON для сравнения между коммитами)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Замеров на страницу')
+        parser.add_argument('--warmup', type=int, default=1, help='Прогревочных запросов (не учитываются)')
+        parser.add_argument('--cold', action='store_true', help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--record', type=int, help='pk заказа для страниц заказа (по умолчанию — последний с товарами)')
+        parser.add_argument('--only', nargs='+', metavar='VIEW', help='Только эти страницы')
+        parser.add_argument('--output', help=f'Файл результата (по умолчанию {OUTPUT_DIR}/<commit>.json)')
+        parser.add_argument('--compare', help='JSON предыдущего прогона для сравнения')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Допустимый рост медианы времени (доля)')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        record_id = options['record'] or (
+            RecordProduct.objects.order_by('-record_id').values_list('record_id', flat=True).first()
+        )
+        if record_id is None:
+            raise CommandError('Нет заказов с товарами: сначала python manage.py generate_benchmark_data')
+
+        user, created = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'is_staff': True, 'is_superuser': True})
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        client = Client()
+        client.force_login(user)
+
+        cases = [c for c in CASES if not options['only'] or c[0] in options['only']]
+        results = {}
+        for name, url_name, with_record in cases:
+            url = reverse(url_name, kwargs={'pk': record_id} if with_record else None)
+            results[name] = self._measure(client, url, options)
+            r = results[name]
+            if 'error' in r:
+                self.stdout.write(self.style.ERROR(f'{name:<26} ошибка: {r["error"]}'))
+            else:
+                self.stdout.write(f'{name:<26} {r["status"]}  {r["queries"]:>4} запросов  '
+                                  f'медиана {r["median_ms"]:>8.1f} мс  p95 {r["p95_ms"]:>8.1f} мс')
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': timezone.now().isoformat(),
+                'db_vendor': connection.vendor,
+                'record_id': record_id,
+                'repeat': options['repeat'],
+                'cold_cache': options['cold'],
+                'rows': {
+                    'records': Record.objects.count(),
+                    'products': Product.objects.count(),
+                    'record_products': RecordProduct.objects.count(),
+                    'files': UploadedFile.objects.count(),
+                    'payments': WorkerPayment.objects.count(),
+                },
+            },
+            'results': results,
+        }
+        run_name = report['meta']['commit'] or timezone.now().strftime('%Y%m%d-%H%M%S')
+        output = options['output'] or os.path.join(OUTPUT_DIR, f'{run_name}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результат: {output}'))
+
+        if options['compare']:
+            regressions = self._compare(options['compare'], results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'Регрессии: {", ".join(regressions)}')
+
+    def _measure(self, client, url, options):
+        timings, queries, status = [], None, None
+        try:
+            for i in range(options['warmup'] + max(1, options['repeat'])):
+                if options['cold']:
+                    cache.clear()
+                counter = _QueryCounter()
+                with connection.execute_wrapper(counter):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    elapsed = (time.perf_counter() - started) * 1000
+                if i >= options['warmup']:
+                    timings.append(elapsed)
+                    queries = counter.count
+                    status = response.status_code
+        except Exception as e:
+            return {'url': url, 'error': f'{type(e).__name__}: {e}'[:500]}
+        return {
+            'url': url,
+            'status': status,
+            'queries': queries,
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(_percentile(timings, 0.95), 2),
+            'min_ms': round(min(timings), 2),
+            'max_ms': round(max(timings), 2),
+        }
+
+    def _compare(self, path, results, threshold):
+        with open(path, encoding='utf-8') as fh:
+            baseline = json.load(fh)
+        self.stdout.write(f'\nСравнение с {path} (commit {baseline.get("meta", {}).get("commit")}):')
+        regressions = []
+        for name, current in results.items():
+            before = baseline.get('results', {}).get(name)
+            if not before or 'error' in before or 'error' in current:
+                continue
+            dq = current['queries'] - before['queries']
+            ratio = current['median_ms'] / before['median_ms'] if before['median_ms'] else 1.0
+            regressed = dq > 0 or ratio > 1 + threshold
+            line = (f'{name:<26} запросы {before["queries"]} -> {current["queries"]} ({dq:+d}), '
+                    f'медиана {before["median_ms"]:.1f} -> {current["median_ms"]:.1f} мс ({(ratio - 1) * 100:+.0f}%)')
+            if regressed:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
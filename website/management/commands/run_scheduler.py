@@ -0,0 +1,69 @@
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.apscheduler import create_scheduler, start_ufaloft_watch_thread
+from website.telegram_bot.outbox import start_dispatcher_thread
+from website.utils import metrics
+from website.utils.leader_lock import LeaderLock
+from website.utils.watcher_registry import start_requested_watchers
+
+logger = logging.getLogger(__name__)
+
+LOCK_NAME = 'scheduler'
+
+
+class Command(BaseCommand):
+    help = ('Единственный владелец периодических задач (APScheduler, UFALOFT watcher\'ы, в т.ч. запрошенные из UI, '
+            'диспетчер очереди Telegram). '
+            'Лидерская блокировка в БД гарантирует один активный экземпляр; остальные ждут в резерве.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lock-ttl', type=int, default=60, help='Срок аренды блокировки, сек')
+        parser.add_argument('--standby-poll', type=int, default=15, help='Как часто резервный экземпляр пытается стать лидером, сек')
+
+    def handle(self, *args, **options):
+        ttl = max(10, options['lock_ttl'])
+        lock = LeaderLock(LOCK_NAME, ttl_sec=ttl)
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        while not lock.acquire():
+            holder = lock.holder()
+            self.stdout.write(f'Планировщик уже запущен ({holder.owner if holder else "?"}). Ожидаю в резерве...')
+            for _ in range(max(1, options['standby_poll'])):
+                if stopping:
+                    return
+                time.sleep(1)
+
+        self.stdout.write(self.style.SUCCESS(f'Блокировка получена ({lock.owner}). Запускаю задачи.'))
+        metrics.cleanup_process_files()
+        scheduler = create_scheduler()
+        renew_every = max(1, ttl // 3)
+        try:
+            scheduler.start()
+            start_ufaloft_watch_thread()
+            start_dispatcher_thread()
+            while not stopping:
+                for _ in range(renew_every):
+                    if stopping:
+                        break
+                    time.sleep(1)
+                if not lock.renew():
+                    # кто-то забрал просроченную блокировку — второй активный экземпляр недопустим
+                    raise CommandError('Блокировка планировщика потеряна, завершаю работу')
+                # watcher'ы, запрошенные из UI (/ufaloft/start/)
+                for mode in start_requested_watchers():
+                    self.stdout.write(f'Запущен UFALOFT watcher ({mode}) по запросу из UI')
+        finally:
+            if scheduler.running:
+                scheduler.shutdown(wait=False)
+            lock.release()
+            logger.info('Scheduler stopped (%s)', lock.owner)
@@ -1,14 +1,39 @@
 """
 Команда управления Django для запуска Telegram бота
 """
-from django.core.management.base import BaseCommand
-from website.telegram_bot.bot import run_bot
+from django.core.management.base import BaseCommand, CommandError
+from website.telegram_bot.webhook import delete_webhook, get_secret, set_webhook, webhook_enabled, webhook_path
 
 
 class Command(BaseCommand):
-    help = 'Запускает Telegram бота'
+    help = ('Запускает Telegram бота (long polling). '
+            'В webhook-режиме (TELEGRAM_WEBHOOK_ENABLED=1) бот работает внутри сайта, '
+            'команда только регистрирует/снимает webhook.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--set-webhook', metavar='BASE_URL',
+                            help='Зарегистрировать webhook: BASE_URL + /telegram/webhook/<секрет>/')
+        parser.add_argument('--delete-webhook', action='store_true', help='Снять webhook (вернуться к polling)')
 
     def handle(self, *args, **options):
+        if options['set_webhook']:
+            if not get_secret():
+                raise CommandError('TELEGRAM_WEBHOOK_SECRET не задан')
+            set_webhook(options['set_webhook'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Webhook установлен: {options["set_webhook"].rstrip("/")}{webhook_path("<секрет>")}'
+            ))
+            return
+        if options['delete_webhook']:
+            delete_webhook()
+            self.stdout.write(self.style.SUCCESS('Webhook снят'))
+            return
+        if webhook_enabled():
+            # polling снял бы webhook у Telegram и отобрал обновления у сайта
+            raise CommandError('Включён webhook-режим (TELEGRAM_WEBHOOK_ENABLED=1): бот работает в процессе сайта')
+
+        from website.telegram_bot.bot import run_bot
+
         self.stdout.write(self.style.SUCCESS('Запуск Telegram бота...'))
         try:
             run_bot()
@@ -17,4 +42,3 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Ошибка при запуске бота: {e}'))
             raise
-
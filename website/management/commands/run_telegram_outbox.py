@@ -0,0 +1,26 @@
+"""
+Команда управления Django для отправки очереди Telegram-сообщений (без run_scheduler)
+"""
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from website.telegram_bot.outbox import CONCURRENCY, dispatch_forever, get_token
+
+
+class Command(BaseCommand):
+    help = 'Отправляет сообщения из очереди TelegramOutbox (обычно диспетчер работает внутри run_scheduler)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='Параллельных отправок')
+
+    def handle(self, *args, **options):
+        token = get_token()
+        if not token:
+            self.stdout.write(self.style.ERROR('TELEGRAM_BOT_TOKEN не настроен'))
+            return
+        self.stdout.write(self.style.SUCCESS('Диспетчер Telegram outbox запущен. Для остановки: Ctrl+C'))
+        try:
+            asyncio.run(dispatch_forever(token, concurrency=options['concurrency']))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Диспетчер остановлен пользователем'))
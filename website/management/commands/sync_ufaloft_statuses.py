@@ -1,16 +1,14 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
 import requests
 
-from website.models import Record
 from website.utils.ufaloft import (
     load_cookies,
-    parse_dashboard,
-    sync_by_index,
+    iter_dashboard_pages,
     DEFAULT_DASHBOARD_URL,
-    parse_workshop_price,
+    PAGE_WORKERS,
 )
+from website.utils.ufaloft_sync import sync_dashboard_pages
 
 
 class Command(BaseCommand):
@@ -19,8 +17,9 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--dashboard-url', default=DEFAULT_DASHBOARD_URL)
         parser.add_argument('--dry-run', action='store_true')
-        parser.add_argument('--index-field', default='first_name', choices=['first_name', 'last_name'], help='Поле записи, где хранится ваш индекс')
+        parser.add_argument('--index-field', default='first_name', choices=['first_name', 'last_name'], help='Поле записи с индексом (fallback для записей без external_index)')
         parser.add_argument('--verbose', action='store_true', help='Печатать подробности сопоставления')
+        parser.add_argument('--workers', type=int, default=PAGE_WORKERS, help='Параллельная загрузка страниц листинга')
 
     def handle(self, *args, **options):
         session = requests.Session()
@@ -29,57 +28,18 @@ class Command(BaseCommand):
             return
 
         try:
-            items = parse_dashboard(session, dashboard_url=options['dashboard_url'])
+            # страницы синхронизируются по мере загрузки, не дожидаясь остальных
+            result = sync_dashboard_pages(
+                iter_dashboard_pages(session, dashboard_url=options['dashboard_url'], max_workers=options['workers']),
+                index_field=options['index_field'],
+                dry_run=options['dry_run'],
+            )
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Ошибка загрузки дашборда: {e}'))
             return
         if options['verbose']:
-            self.stdout.write(f'Найдено элементов на дашборде: {len(items)}')
-
-        def update_record(my_index: str, mapped_status: str, raw_status: str, workshop_price: str) -> bool:
-            try:
-                idx = str(my_index).strip()
-                # Выбранное поле
-                field = options['index_field']
-                q = {field: idx}
-                record = Record.objects.filter(**q).first()
-                # Fallback: попробовать другое поле, если не нашли
-                if not record:
-                    alt_field = 'last_name' if field == 'first_name' else 'first_name'
-                    record = Record.objects.filter(**{alt_field: idx}).first()
-                if not record:
-                    if options['verbose']:
-                        self.stdout.write(f'[MISS] index={idx} mapped={mapped_status} raw="{raw_status}" workshop_price="{workshop_price}"')
-                    return False
-                if options['dry_run']:
-                    self.stdout.write(f"#{record.id} ({idx}): {record.status} -> {mapped_status or raw_status}, workshop_price: {workshop_price}")
-                    return False
-                changed = False
-                if mapped_status and record.status != mapped_status:
-                    record.status = mapped_status
-                    changed = True
-                
-                # Обновляем стоимость работы цеха
-                if workshop_price:
-                    try:
-                        new_price = parse_workshop_price(workshop_price)
-                        if new_price is not None and record.workshop_price != new_price:
-                            record.workshop_price = new_price
-                            changed = True
-                    except Exception:
-                        if options['verbose']:
-                            self.stdout.write(f"[WARNING] Не удалось распарсить цену цеха: {workshop_price}")
-                
-                # optionally store raw status somewhere if needed in future
-                if changed:
-                    record.save(update_fields=['status', 'workshop_price'])
-                    if options['verbose']:
-                        self.stdout.write(f"[UPDATED] #{record.id} ({idx}) -> {mapped_status}, workshop_price: {workshop_price}")
-                return changed
-            except Exception:
-                return False
-
-        updated = sync_by_index(update_record, items)
-        self.stdout.write(self.style.SUCCESS(f'Готово. Обновлено записей: {updated}'))
-
+            self.stdout.write(f'Найдено элементов на дашборде: {result.scanned}')
 
+        for line in result.describe(verbose=options['verbose']):
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Готово. Обновлено записей: {result.updated}'))
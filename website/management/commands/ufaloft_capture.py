@@ -1,12 +1,12 @@
 from django.core.management.base import BaseCommand
 
-import requests
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from website.utils.ufaloft import save_cookies, DEFAULT_LOGIN_URL
+from website.utils.ufaloft import DEFAULT_LOGIN_URL
+from website.utils.ufaloft_selenium import export_cookies
 
 
 class Command(BaseCommand):
@@ -45,12 +45,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING('Таймаут ожидания. Попытаюсь всё равно сохранить куки.'))
 
             # Сохраняем куки selenium -> requests -> файл
-            session = requests.Session()
-            for c in driver.get_cookies():
-                # c: {name, value, domain, path, expiry, secure, httpOnly}
-                session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
-
-            save_cookies(session)
+            export_cookies(driver)
             self.stdout.write(self.style.SUCCESS('Куки сохранены. Можно закрывать браузер и запускать синхронизацию.'))
         finally:
             try:
@@ -1,3 +1,4 @@
+import logging
 import time
 
 import requests
@@ -5,13 +6,15 @@ from django.core.management.base import BaseCommand
 
 from website.utils.ufaloft import (
     DEFAULT_DASHBOARD_URL,
+    PAGE_WORKERS,
+    DashboardChangeDetector,
+    UfaloftSessionExpired,
     load_cookies,
-    parse_dashboard,
-    sync_by_index,
-    map_external_status_to_local,
-    parse_workshop_price,
 )
-from website.models import Record
+from website.utils.ufaloft_sync import poll_dashboard
+from website.utils.watcher_registry import WatcherRegistration
+
+logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
@@ -19,64 +22,82 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--dashboard-url', default=DEFAULT_DASHBOARD_URL)
-        parser.add_argument('--interval-min', type=int, default=60)
+        parser.add_argument('--interval-min', type=int, default=2, help='Интервал опроса; неизменившийся дашборд не разбирается, поэтому можно 1–2 минуты')
         parser.add_argument('--index-field', default='first_name', choices=['first_name', 'last_name'])
         parser.add_argument('--verbose', action='store_true')
+        parser.add_argument('--workers', type=int, default=PAGE_WORKERS, help='Параллельная загрузка страниц листинга')
+        parser.add_argument('--full-every', type=int, default=30, help='Каждые N циклов синхронизировать все строки, даже без изменений (0 — никогда)')
 
     def handle(self, *args, **options):
-        dashboard_url = options['dashboard_url']
-        interval_sec = max(60, options['interval_min'] * 60)
-
         session = requests.Session()
         if not load_cookies(session):
             self.stdout.write(self.style.ERROR('Нет сохранённых cookies. Сначала выполните: python manage.py ufaloft_login --username ... --password ... --otp ...'))
             return
 
-        def update_record(my_index: str, mapped_status: str, raw_status: str, workshop_price: str) -> bool:
-            idx = str(my_index).strip()
-            field = options['index_field']
-            record = Record.objects.filter(**{field: idx}).first()
-            if not record:
-                alt_field = 'last_name' if field == 'first_name' else 'first_name'
-                record = Record.objects.filter(**{alt_field: idx}).first()
-            if not record:
-                if options['verbose']:
-                    self.stdout.write(f'[MISS] index={idx} mapped={mapped_status} raw="{raw_status}" workshop_price="{workshop_price}"')
-                return False
-
-            if not mapped_status:
-                mapped_status = map_external_status_to_local(raw_status)
-
-            changed = False
-            if mapped_status and record.status != mapped_status:
-                record.status = mapped_status
-                changed = True
-
-            if workshop_price:
-                try:
-                    new_price = parse_workshop_price(workshop_price)
-                    if new_price is not None and record.workshop_price != new_price:
-                        record.workshop_price = new_price
-                        changed = True
-                except Exception:
-                    if options['verbose']:
-                        self.stdout.write(f"[WARNING] Не удалось распарсить цену цеха: {workshop_price}")
-
-            if changed:
-                record.save(update_fields=['status', 'workshop_price'])
-                if options['verbose']:
-                    self.stdout.write(f'[UPDATED] #{record.id} ({idx}) -> {mapped_status}, workshop_price: {record.workshop_price}')
-
-            return changed
+        registration = WatcherRegistration('requests', options['interval_min'], options['index_field'])
+        if not registration.claim():
+            self.stdout.write(self.style.WARNING('UFALOFT watcher уже запущен (в этом или другом режиме) — второй экземпляр не стартую.'))
+            return
+        try:
+            self._watch(session, registration, options)
+        except KeyboardInterrupt:
+            self.stdout.write('Останавливаю наблюдатель...')
+        finally:
+            registration.stop()
+
+    def _watch(self, session, registration, options):
+        dashboard_url = options['dashboard_url']
+        interval_sec = max(60, options['interval_min'] * 60)
+        detector = DashboardChangeDetector()
+        full_every = max(0, options['full_every'])
+        cycle = 0
 
         self.stdout.write(self.style.SUCCESS('UFALOFT requests-watch запущен. Для остановки: Ctrl+C'))
         while True:
+            cycle += 1
+            if full_every and cycle % full_every == 0:
+                detector.reset()
+            started = time.monotonic()
             try:
-                items = parse_dashboard(session, dashboard_url=dashboard_url)
-                updated = sync_by_index(update_record, items)
-                self.stdout.write(self.style.SUCCESS(f'Синхронизация завершена. Обновлено: {updated}'))
+                diff, result = poll_dashboard(
+                    session, detector, dashboard_url=dashboard_url,
+                    index_field=options['index_field'], max_workers=options['workers'],
+                )
+                updated = result.updated if result else 0
+                if not diff.rows_total:
+                    self.stdout.write(self.style.WARNING('Таблица дашборда не найдена (cookies устарели?)'))
+                elif result:
+                    for line in result.describe(verbose=options['verbose']):
+                        self.stdout.write(line)
+                registration.record_run(started, diff.rows_total, updated)
+                logger.info(
+                    'ufaloft poll: table_changed=%s rows_scanned=%s rows_changed=%s updated=%s',
+                    diff.table_changed, diff.rows_total, diff.rows_changed, updated,
+                )
+                if diff.table_changed:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Синхронизация завершена. Строк: {diff.rows_total}, изменилось: {diff.rows_changed}, обновлено: {updated}'
+                    ))
+                elif options['verbose']:
+                    self.stdout.write(f'Дашборд не изменился ({diff.rows_total} строк)')
+            except UfaloftSessionExpired:
+                registration.record_run(started, error='Сессия истекла')
+                detector.reset()
+                # cookies могли обновить ufaloft_login или hybrid-watcher — перечитываем файл
+                fresh = requests.Session()
+                if load_cookies(fresh) and fresh.cookies.get_dict() != session.cookies.get_dict():
+                    logger.warning('UFALOFT session expired, reloaded cookies from file')
+                    self.stdout.write(self.style.WARNING('Сессия UFALOFT истекла — загружены обновлённые cookies из файла.'))
+                    session.close()
+                    session = fresh
+                    continue
+                logger.error('UFALOFT session expired, requests watcher stopped')
+                self.stdout.write(self.style.ERROR(
+                    'Сессия UFALOFT истекла, новых cookies нет. Наблюдатель остановлен: выполните '
+                    'python manage.py ufaloft_login --username ... --password ... --otp ... и запустите его снова.'
+                ))
+                return
             except Exception as e:
                 self.stdout.write(self.style.ERROR(f'Ошибка синхронизации: {e}'))
+                registration.record_run(started, error=str(e))
             time.sleep(interval_sec)
-
-
@@ -1,20 +1,31 @@
+import logging
 import time
 
+import requests
 from django.core.management.base import BaseCommand
 
-from selenium import webdriver
-import os
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from website.utils.ufaloft import (
+    DEFAULT_DASHBOARD_URL,
+    PAGE_WORKERS,
+    DashboardChangeDetector,
+    UfaloftSessionExpired,
+    load_cookies,
+)
+from website.utils.ufaloft_selenium import (
+    create_driver,
+    login_and_export_cookies,
+    parse_dashboard_with_driver,
+    wait_for_dashboard,
+)
+from website.utils.ufaloft_sync import poll_dashboard, sync_dashboard_items
+from website.utils.watcher_registry import WatcherRegistration
 
-from website.models import Record
-from website.utils.ufaloft import DEFAULT_DASHBOARD_URL, map_external_status_to_local, sync_by_index, parse_workshop_price
-from website.utils.ufaloft_selenium import parse_dashboard_with_driver
+logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = 'Открывает браузер (не закрывает) и каждые N минут парсит дашборд, обновляя статусы по индексу.'
+    help = ('Каждые N минут парсит дашборд, обновляя статусы по индексу. '
+            'hybrid: браузер только для входа/2FA, опрос через requests; browser: браузер открыт постоянно.')
 
     def add_arguments(self, parser):
         parser.add_argument('--dashboard-url', default=DEFAULT_DASHBOARD_URL)
@@ -22,112 +33,120 @@ class Command(BaseCommand):
         parser.add_argument('--index-field', default='first_name', choices=['first_name', 'last_name'])
         parser.add_argument('--verbose', action='store_true')
         parser.add_argument('--headless', action='store_true', help='Run Chrome in headless mode (no GUI)')
+        parser.add_argument('--mode', default='hybrid', choices=['hybrid', 'browser'],
+                            help='hybrid — Chrome запускается только когда сессия истекла; browser — Chrome не закрывается')
+        parser.add_argument('--login-wait-sec', type=int, default=600, help='Сколько ждать входа/2FA в браузере')
+        parser.add_argument('--workers', type=int, default=PAGE_WORKERS, help='Параллельная загрузка страниц листинга (hybrid)')
+        parser.add_argument('--full-every', type=int, default=30, help='hybrid: каждые N циклов синхронизировать все строки, даже без изменений (0 — никогда)')
 
     def handle(self, *args, **options):
-        dashboard_url = options['dashboard_url']
-        interval_sec = max(60, options['interval_min'] * 60)
-
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument('--disable-notifications')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
+        registration = WatcherRegistration(options['mode'], options['interval_min'], options['index_field'])
+        if not registration.claim():
+            self.stdout.write(self.style.WARNING('UFALOFT watcher уже запущен (в этом или другом режиме) — второй экземпляр не стартую.'))
+            return
+        try:
+            if options['mode'] == 'hybrid':
+                self._watch_hybrid(options, registration)
+            else:
+                self._watch_browser(options, registration)
+        except KeyboardInterrupt:
+            self.stdout.write('Останавливаю наблюдатель...')
+        finally:
+            registration.stop()
 
-        if options.get('headless'):
-            chrome_options.add_argument('--headless')
-            self.stdout.write('Запускаю Chrome в headless режиме...')
+    def _login(self, options):
+        self.stdout.write('Открываю браузер для входа. Выполните вход и 2FA, после этого браузер закроется.')
+        try:
+            session = login_and_export_cookies(
+                options['dashboard_url'], wait_sec=options['login_wait_sec'], headless=options['headless'],
+            )
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Ошибка запуска Chrome: {e}'))
+            return None
+        if session is None:
+            self.stdout.write(self.style.WARNING('Вход не выполнен за отведённое время. Повторю в следующем цикле.'))
         else:
-            self.stdout.write('Открываю Chrome браузер...')
+            self.stdout.write(self.style.SUCCESS('Cookies сохранены, браузер закрыт. Дальше опрос через requests.'))
+        return session
+
+    def _watch_hybrid(self, options, registration):
+        interval_sec = max(60, options['interval_min'] * 60)
+        session = requests.Session()
+        logged_in = load_cookies(session)
+        # неизменившийся дашборд не разбирается и не синхронизируется
+        detector = DashboardChangeDetector()
+        full_every = max(0, options['full_every'])
+        cycle = 0
+
+        self.stdout.write(self.style.SUCCESS('UFALOFT hybrid-watch запущен. Для остановки: Ctrl+C'))
+        while True:
+            if not logged_in:
+                session = self._login(options)
+                logged_in = session is not None
+                if not logged_in:
+                    session = requests.Session()
+                    time.sleep(interval_sec)
+                    continue
+            cycle += 1
+            if full_every and cycle % full_every == 0:
+                detector.reset()
+            started = time.monotonic()
+            try:
+                diff, result = poll_dashboard(
+                    session, detector, dashboard_url=options['dashboard_url'],
+                    index_field=options['index_field'], max_workers=options['workers'],
+                )
+                updated = result.updated if result else 0
+                if result:
+                    for line in result.describe(verbose=options['verbose']):
+                        self.stdout.write(line)
+                registration.record_run(started, diff.rows_total, updated)
+                logger.info(
+                    'ufaloft poll: table_changed=%s rows_scanned=%s rows_changed=%s updated=%s',
+                    diff.table_changed, diff.rows_total, diff.rows_changed, updated,
+                )
+                if diff.table_changed:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Синхронизация завершена. Строк: {diff.rows_total}, изменилось: {diff.rows_changed}, обновлено: {updated}'
+                    ))
+                elif options['verbose']:
+                    self.stdout.write(f'Дашборд не изменился ({diff.rows_total} строк)')
+            except UfaloftSessionExpired:
+                self.stdout.write(self.style.WARNING('Сессия UFALOFT истекла — нужен повторный вход.'))
+                registration.record_run(started, error='Сессия истекла')
+                detector.reset()
+                logged_in = False
+                continue
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Ошибка синхронизации: {e}'))
+                registration.record_run(started, error=str(e))
+            time.sleep(interval_sec)
 
+    def _watch_browser(self, options, registration):
+        interval_sec = max(60, options['interval_min'] * 60)
+        self.stdout.write('Запускаю Chrome в headless режиме...' if options['headless'] else 'Открываю Chrome браузер...')
         try:
-            remote_url = os.environ.get("SELENIUM_REMOTE_URL", "").strip()
-            if remote_url:
-                self.stdout.write(f'Использую Remote Selenium: {remote_url}')
-                last_err = None
-                for attempt in range(1, 31):
-                    try:
-                        driver = webdriver.Remote(command_executor=remote_url, options=chrome_options)
-                        last_err = None
-                        break
-                    except Exception as e:
-                        last_err = e
-                        time.sleep(1)
-                if last_err is not None:
-                    raise last_err
-            else:
-                # Используем встроенный Selenium Manager (автоматически найдет правильный ChromeDriver)
-                driver = webdriver.Chrome(options=chrome_options)
+            driver = create_driver(headless=options['headless'])
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Ошибка запуска Chrome: {e}'))
             self.stdout.write('Попробуйте запустить с --headless или включите Remote Selenium (SELENIUM_REMOTE_URL)')
             return
         self.stdout.write('Открыл браузер. Выполните вход и 2FA, табличные строки появятся автоматически.')
-        driver.get(dashboard_url)
+        driver.get(options['dashboard_url'])
 
-        try:
-            WebDriverWait(driver, 600).until(
-                EC.any_of(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'tr.listing-table-tr')),
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'tr.listing-table-tr.unread-item-row')),
-                )
-            )
-        except Exception:
-            self.stdout.write(self.style.WARNING('Таблица не появилась за 10 минут. Продолжаю наблюдение.'))
+        if not wait_for_dashboard(driver, options['login_wait_sec']):
+            self.stdout.write(self.style.WARNING('Таблица не появилась за отведённое время. Продолжаю наблюдение.'))
 
-        def update_record(my_index: str, mapped_status: str, raw_status: str, workshop_price: str) -> bool:
-            idx = str(my_index).strip()
-            field = options['index_field']
-            record = Record.objects.filter(**{field: idx}).first()
-            if not record:
-                alt_field = 'last_name' if field == 'first_name' else 'first_name'
-                record = Record.objects.filter(**{alt_field: idx}).first()
-            if not record:
-                if options['verbose']:
-                    self.stdout.write(f'[MISS] index={idx} mapped={mapped_status} raw="{raw_status}" workshop_price="{workshop_price}"')
-                return False
-            if not mapped_status:
-                mapped_status = map_external_status_to_local(raw_status)
-            
-            changed = False
-            if mapped_status and record.status != mapped_status:
-                record.status = mapped_status
-                changed = True
-            
-            # Обновляем стоимость работы цеха
-            if workshop_price:
-                try:
-                    new_price = parse_workshop_price(workshop_price)
-                    if new_price is not None and record.workshop_price != new_price:
-                        record.workshop_price = new_price
-                        changed = True
-                except Exception:
-                    if options['verbose']:
-                        self.stdout.write(f"[WARNING] Не удалось распарсить цену цеха: {workshop_price}")
-            
-            if changed:
-                record.save(update_fields=['status', 'workshop_price'])
-                if options['verbose']:
-                    self.stdout.write(f'[UPDATED] #{record.id} ({idx}) -> {mapped_status}, workshop_price: {workshop_price}')
-            return changed
-
-        try:
-            while True:
-                try:
-                    items = parse_dashboard_with_driver(driver)
-                    updated = sync_by_index(update_record, items)
-                    self.stdout.write(self.style.SUCCESS(f'Синхронизация завершена. Обновлено: {updated}'))
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f'Ошибка синхронизации: {e}'))
-                time.sleep(interval_sec)
-        except KeyboardInterrupt:
-            self.stdout.write('Останавливаю наблюдатель...')
-        finally:
+        while True:
+            started = time.monotonic()
             try:
-                # По просьбе оставить браузер открытым можно закомментировать quit
-                pass
-            except Exception:
-                pass
-
-
+                items = parse_dashboard_with_driver(driver)
+                result = sync_dashboard_items(items, index_field=options['index_field'])
+                for line in result.describe(verbose=options['verbose']):
+                    self.stdout.write(line)
+                self.stdout.write(self.style.SUCCESS(f'Синхронизация завершена. Обновлено: {result.updated}'))
+                registration.record_run(started, result.scanned, result.updated)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Ошибка синхронизации: {e}'))
+                registration.record_run(started, error=str(e))
+            time.sleep(interval_sec)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0072_workerpaymentdeduction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceFetchFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(unique=True, verbose_name='URL')),
+                ('failures', models.PositiveIntegerField(default=0, verbose_name='Ошибок подряд')),
+                ('last_error', models.CharField(blank=True, default='', max_length=500, verbose_name='Последняя ошибка')),
+                ('last_failed_at', models.DateTimeField(blank=True, null=True, verbose_name='Последняя ошибка (время)')),
+                ('next_retry_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующая попытка')),
+            ],
+            options={
+                'verbose_name': 'Ошибка парсинга цены',
+                'verbose_name_plural': 'Ошибки парсинга цен',
+                'ordering': ['-last_failed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0073_pricefetchfailure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('source', models.CharField(choices=[('parser', 'Парсинг цены поставщика'), ('catalog', 'Парсинг каталога'), ('admin', 'Админка'), ('site', 'Карточка товара')], max_length=10, verbose_name='Источник')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='website.product', verbose_name='Продукт')),
+            ],
+            options={
+                'verbose_name': 'История цены',
+                'verbose_name_plural': 'История цен',
+                'ordering': ['product', 'ts'],
+                'indexes': [models.Index(fields=['product', 'ts'], name='website_pph_product_ts_idx')],
+            },
+        ),
+    ]
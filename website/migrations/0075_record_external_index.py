@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:06
+
+from django.db import migrations, models
+
+
+def backfill_external_index(apps, schema_editor):
+    """Заполняет external_index из числового first_name (или last_name). При дублях индекс получает запись с меньшим id."""
+    Record = apps.get_model('website', 'Record')
+
+    used = set()
+    batch = []
+    for record in Record.objects.order_by('id').only('id', 'first_name', 'last_name').iterator(chunk_size=1000):
+        for value in (record.first_name, record.last_name):
+            value = (value or '').strip()
+            if value.isdigit():
+                if value not in used:
+                    used.add(value)
+                    record.external_index = value
+                    batch.append(record)
+                break
+        if len(batch) >= 500:
+            Record.objects.bulk_update(batch, ['external_index'])
+            batch = []
+    if batch:
+        Record.objects.bulk_update(batch, ['external_index'])
+
+
+def reverse_migration(apps, schema_editor):
+    """Обратная миграция - поле удаляется вместе с данными"""
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0074_productpricehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='record',
+            name='external_index',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True, verbose_name='Индекс UFALOFT'),
+        ),
+        migrations.RunPython(backfill_external_index, reverse_migration),
+    ]
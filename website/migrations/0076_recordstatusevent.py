@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0075_record_external_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('status', 'Статус'), ('workshop_price', 'Стоимость работы цеха')], default='status', max_length=20, verbose_name='Поле')),
+                ('old_value', models.CharField(blank=True, default='', max_length=50, verbose_name='Было')),
+                ('new_value', models.CharField(blank=True, default='', max_length=50, verbose_name='Стало')),
+                ('source', models.CharField(choices=[('ufaloft', 'UFALOFT'), ('site', 'Сайт')], max_length=10, verbose_name='Источник')),
+                ('ts', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время')),
+                ('record', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='website.record', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Изменение заказа',
+                'verbose_name_plural': 'Журнал изменений заказов',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['record', 'ts'], name='website_rse_record_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0076_recordstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Имя')),
+                ('owner', models.CharField(max_length=100, verbose_name='Владелец')),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Захвачен')),
+                ('expires_at', models.DateTimeField(verbose_name='Истекает')),
+            ],
+            options={
+                'verbose_name': 'Блокировка планировщика',
+                'verbose_name_plural': 'Блокировки планировщика',
+            },
+        ),
+    ]
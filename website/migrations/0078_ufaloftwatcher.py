@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0077_schedulerlock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UfaloftWatcher',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('hybrid', 'Hybrid (браузер только для входа)'), ('browser', 'Браузер постоянно'), ('requests', 'Только requests')], max_length=20, unique=True, verbose_name='Режим')),
+                ('state', models.CharField(choices=[('requested', 'Запрошен'), ('running', 'Работает'), ('stopped', 'Остановлен')], default='stopped', max_length=10, verbose_name='Состояние')),
+                ('owner', models.CharField(blank=True, default='', max_length=100, verbose_name='Процесс')),
+                ('interval_min', models.PositiveIntegerField(default=60, verbose_name='Интервал, мин')),
+                ('index_field', models.CharField(default='first_name', max_length=20, verbose_name='Поле индекса')),
+                ('requested_at', models.DateTimeField(blank=True, null=True, verbose_name='Запрошен')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Запущен')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Heartbeat')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний цикл')),
+                ('last_duration', models.FloatField(blank=True, null=True, verbose_name='Длительность цикла, с')),
+                ('last_scanned', models.PositiveIntegerField(default=0, verbose_name='Строк в последнем цикле')),
+                ('last_updated', models.PositiveIntegerField(default=0, verbose_name='Обновлено в последнем цикле')),
+                ('total_updated', models.PositiveIntegerField(default=0, verbose_name='Обновлено всего')),
+                ('runs', models.PositiveIntegerField(default=0, verbose_name='Циклов')),
+                ('last_error', models.CharField(blank=True, default='', max_length=500, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'UFALOFT watcher',
+                'verbose_name_plural': 'UFALOFT watchers',
+                'ordering': ['mode'],
+            },
+        ),
+    ]
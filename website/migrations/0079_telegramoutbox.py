@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0078_ufaloftwatcher'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=50, verbose_name='Telegram ID')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('parse_mode', models.CharField(blank=True, default='Markdown', max_length=20, verbose_name='Разметка')),
+                ('state', models.CharField(choices=[('pending', 'В очереди'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Состояние')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=40, verbose_name='Диспетчер')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в работу')),
+                ('last_error', models.CharField(blank=True, default='', max_length=500, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Отправлено')),
+            ],
+            options={
+                'verbose_name': 'Telegram-сообщение',
+                'verbose_name_plural': 'Очередь Telegram-сообщений',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['state', 'next_attempt_at'], name='website_tgo_state_next_idx')],
+            },
+        ),
+    ]
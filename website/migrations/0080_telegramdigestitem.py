@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0079_telegramoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramDigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=50, verbose_name='Telegram ID')),
+                ('status', models.CharField(max_length=50, verbose_name='Статус')),
+                ('text', models.TextField(verbose_name='Одиночное сообщение')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создано')),
+                ('record', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='telegram_digest_items', to='website.record', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Событие для дайджеста Telegram',
+                'verbose_name_plural': 'Буфер дайджеста Telegram',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['chat_id', 'created_at'], name='website_tgd_chat_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# Только для PostgreSQL: на SQLite миграция ничего не делает (см. website/utils/db_features.py)
+POSTGRES_INDEXES = [
+    (
+        'website_product_custom_fields_gin',
+        'CREATE INDEX IF NOT EXISTS website_product_custom_fields_gin '
+        'ON website_product USING GIN (custom_fields jsonb_path_ops)',
+    ),
+    (
+        'website_product_name_tsv_idx',
+        "CREATE INDEX IF NOT EXISTS website_product_name_tsv_idx "
+        "ON website_product USING GIN (to_tsvector('simple'::regconfig, COALESCE(name, '')))",
+    ),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, sql in POSTGRES_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0080_telegramdigestitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
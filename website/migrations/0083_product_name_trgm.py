@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Только для PostgreSQL. Поиск товара по названию — icontains (подстрока, как на SQLite);
+# Django строит его как UPPER(name::text) LIKE UPPER('%...%'), триграммный GIN-индекс по тому же
+# выражению ускоряет такой LIKE. Индекс tsvector из 0081 заменяется: полнотекстовый поиск
+# по префиксам слов не находил часть слова внутри названия.
+CREATE_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS website_product_name_trgm_idx '
+    'ON website_product USING GIN (UPPER(name::text) gin_trgm_ops)',
+    'DROP INDEX IF EXISTS website_product_name_tsv_idx',
+]
+DROP_SQL = [
+    'DROP INDEX IF EXISTS website_product_name_trgm_idx',
+    "CREATE INDEX IF NOT EXISTS website_product_name_tsv_idx "
+    "ON website_product USING GIN (to_tsvector('simple'::regconfig, COALESCE(name, '')))",
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('website', '0082_record_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
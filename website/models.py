@@ -12,7 +12,8 @@ class Category(models.Model):
 
     def get_fields(self):
         """Получить все поля категории"""
-        return self.category_fields.all().order_by('id')
+        # порядок по id задан в CategoryField.Meta; без order_by() используется prefetch_related
+        return self.category_fields.all()
 
     def __str__(self):
         return self.name
@@ -260,7 +261,8 @@ class Product(models.Model):
     
     def get_custom_characteristics(self):
         """Получить все индивидуальные характеристики продукта"""
-        return self.product_custom_fields.all().order_by('order', 'id')
+        # порядок ('order', 'id') задан в ProductCustomField.Meta; без order_by() используется prefetch_related
+        return self.product_custom_fields.all()
 
     def __str__(self):
         return self.name
@@ -321,6 +323,117 @@ class ProductCustomField(models.Model):
         unique_together = ['product', 'category_field']
 
 
+class ProductPriceHistory(models.Model):
+    """Append-only история цен товара (для графиков и проверки устаревших цен)"""
+    SOURCE_CHOICES = [
+        ('parser', 'Парсинг цены поставщика'),
+        ('catalog', 'Парсинг каталога'),
+        ('admin', 'Админка'),
+        ('site', 'Карточка товара'),
+    ]
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='price_history',
+        db_index=False,  # покрывается индексом (product, ts)
+        verbose_name="Продукт"
+    )
+    ts = models.DateTimeField(default=timezone.now, verbose_name="Время")
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена")
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, verbose_name="Источник")
+
+    class Meta:
+        verbose_name = "История цены"
+        verbose_name_plural = "История цен"
+        ordering = ['product', 'ts']
+        indexes = [
+            models.Index(fields=['product', 'ts'], name='website_pph_product_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.ts:%Y-%m-%d %H:%M} {self.price} ({self.source})"
+
+
+class PriceFetchFailure(models.Model):
+    """Ошибки планового парсинга цен по URL поставщика (для экспоненциального back-off)"""
+
+    url = models.URLField(unique=True, verbose_name="URL")
+    failures = models.PositiveIntegerField(default=0, verbose_name="Ошибок подряд")
+    last_error = models.CharField(max_length=500, blank=True, default='', verbose_name="Последняя ошибка")
+    last_failed_at = models.DateTimeField(null=True, blank=True, verbose_name="Последняя ошибка (время)")
+    next_retry_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Следующая попытка")
+
+    class Meta:
+        verbose_name = "Ошибка парсинга цены"
+        verbose_name_plural = "Ошибки парсинга цен"
+        ordering = ['-last_failed_at']
+
+    def __str__(self):
+        return f"{self.url} ({self.failures})"
+
+
+class SchedulerLock(models.Model):
+    """Аренда лидерства фоновых сервисов: работает только владелец непросроченной записи"""
+
+    name = models.CharField(max_length=50, unique=True, verbose_name="Имя")
+    owner = models.CharField(max_length=100, verbose_name="Владелец")
+    acquired_at = models.DateTimeField(default=timezone.now, verbose_name="Захвачен")
+    expires_at = models.DateTimeField(verbose_name="Истекает")
+
+    class Meta:
+        verbose_name = "Блокировка планировщика"
+        verbose_name_plural = "Блокировки планировщика"
+
+    def __str__(self):
+        return f"{self.name}: {self.owner} до {self.expires_at:%Y-%m-%d %H:%M:%S}"
+
+
+class UfaloftWatcher(models.Model):
+    """Реестр UFALOFT watcher'ов: одновременно работает не больше одного (любого режима), живость определяется по heartbeat"""
+    MODE_CHOICES = [
+        ('hybrid', 'Hybrid (браузер только для входа)'),
+        ('browser', 'Браузер постоянно'),
+        ('requests', 'Только requests'),
+    ]
+    STATE_CHOICES = [
+        ('requested', 'Запрошен'),
+        ('running', 'Работает'),
+        ('stopped', 'Остановлен'),
+    ]
+    HEARTBEAT_STALE_SEC = 120
+
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, unique=True, verbose_name="Режим")
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='stopped', verbose_name="Состояние")
+    owner = models.CharField(max_length=100, blank=True, default='', verbose_name="Процесс")
+    interval_min = models.PositiveIntegerField(default=60, verbose_name="Интервал, мин")
+    index_field = models.CharField(max_length=20, default='first_name', verbose_name="Поле индекса")
+    requested_at = models.DateTimeField(null=True, blank=True, verbose_name="Запрошен")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Запущен")
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name="Heartbeat")
+    last_run_at = models.DateTimeField(null=True, blank=True, verbose_name="Последний цикл")
+    last_duration = models.FloatField(null=True, blank=True, verbose_name="Длительность цикла, с")
+    last_scanned = models.PositiveIntegerField(default=0, verbose_name="Строк в последнем цикле")
+    last_updated = models.PositiveIntegerField(default=0, verbose_name="Обновлено в последнем цикле")
+    total_updated = models.PositiveIntegerField(default=0, verbose_name="Обновлено всего")
+    runs = models.PositiveIntegerField(default=0, verbose_name="Циклов")
+    last_error = models.CharField(max_length=500, blank=True, default='', verbose_name="Последняя ошибка")
+
+    class Meta:
+        verbose_name = "UFALOFT watcher"
+        verbose_name_plural = "UFALOFT watchers"
+        ordering = ['mode']
+
+    @property
+    def is_alive(self) -> bool:
+        if self.state != 'running' or self.heartbeat_at is None:
+            return False
+        return (timezone.now() - self.heartbeat_at).total_seconds() < self.HEARTBEAT_STALE_SEC
+
+    def __str__(self):
+        return f"{self.mode}: {self.state}"
+
+
 class Record(models.Model):
     STATUS_CHOICES = [
         ('otrisovka', 'Отрисовка'),
@@ -331,6 +444,9 @@ class Record(models.Model):
     ]
     
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # меняется при любом сохранении заказа и при изменении товаров/расходов/файлов/выплат
+    # (website/signals.py) — по нему версионируются кэши рассчитанных данных заказа
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
     customer = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -341,6 +457,15 @@ class Record(models.Model):
     )
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
+    # Номер заказа в UFALOFT (индекс после "-" в заголовке). Угадывается из first_name/last_name
+    # (и переугадывается при исправлении имени), вручную — в форме редактирования заказа.
+    external_index = models.CharField(
+        max_length=20,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name="Индекс UFALOFT"
+    )
     telegram = models.CharField(max_length=100, blank=True, default='', verbose_name="Telegram")
     phone = models.CharField(max_length=15, blank=True, default='')
     address = models.CharField(max_length=100, blank=True, default='')
@@ -425,10 +550,106 @@ class Record(models.Model):
     margin_oleg = models.BooleanField(default=True, verbose_name="Моржа Олег")
 
     products = models.ManyToManyField(Product, related_name='records', blank=True, verbose_name="Комплектующие")
+
+    @staticmethod
+    def guess_external_index(first_name, last_name):
+        """Индекс UFALOFT — числовое значение first_name (поле "Индекс") или last_name"""
+        for value in (first_name, last_name):
+            value = (value or '').strip()
+            if value.isdigit():
+                return value
+        return None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # имя и индекс на момент загрузки: save() переугадывает индекс только при смене имени
+        loaded = instance.__dict__
+        instance._index_source = (loaded.get('first_name'), loaded.get('last_name'), loaded.get('external_index'))
+        return instance
+
+    def _refresh_external_index(self):
+        """
+        Угадывает external_index по имени, если имя изменилось, а индекс пустой или сам был угадан
+        из прежнего имени (исправили опечатку — заказ перепривязывается). Индекс, заданный вручную
+        (форма редактирования), не трогается. Возвращает True, если индекс изменён.
+        """
+        source = getattr(self, '_index_source', None)
+        if source is not None and source[:2] == (self.first_name, self.last_name):
+            return False
+        guessed_before = (
+            source is not None and source[2] is not None
+            and self.external_index == source[2] == self.guess_external_index(source[0], source[1])
+        )
+        if self.external_index and not guessed_before:
+            return False
+        guessed = self.guess_external_index(self.first_name, self.last_name)
+        if guessed and Record.objects.filter(external_index=guessed).exclude(pk=self.pk).exists():
+            guessed = None
+        if guessed == (self.external_index or None):
+            return False
+        self.external_index = guessed
+        return True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'first_name', 'last_name'} & set(update_fields):
+            if self._refresh_external_index() and update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'external_index'}
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # auto_now не срабатывает, если поля нет в update_fields
+            kwargs['update_fields'] = set(update_fields) | {'updated_at'}
+        super().save(*args, **kwargs)
+        self._index_source = (self.first_name, self.last_name, self.external_index)
+
+    @classmethod
+    def touch(cls, record_ids):
+        """Отмечает заказы изменёнными (изменились связанные данные) — одним UPDATE"""
+        record_ids = [pk for pk in set(record_ids) if pk]
+        if record_ids:
+            cls.objects.filter(pk__in=record_ids).update(updated_at=timezone.now())
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
 
+class RecordStatusEvent(models.Model):
+    """Append-only журнал изменений статуса и стоимости работы цеха заказа"""
+    FIELD_CHOICES = [
+        ('status', 'Статус'),
+        ('workshop_price', 'Стоимость работы цеха'),
+    ]
+    SOURCE_CHOICES = [
+        ('ufaloft', 'UFALOFT'),
+        ('site', 'Сайт'),
+    ]
+
+    record = models.ForeignKey(
+        Record,
+        on_delete=models.CASCADE,
+        related_name='status_events',
+        db_index=False,  # покрывается индексом (record, ts)
+        verbose_name="Заказ"
+    )
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES, default='status', verbose_name="Поле")
+    old_value = models.CharField(max_length=50, blank=True, default='', verbose_name="Было")
+    new_value = models.CharField(max_length=50, blank=True, default='', verbose_name="Стало")
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, verbose_name="Источник")
+    ts = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Время")
+
+    class Meta:
+        verbose_name = "Изменение заказа"
+        verbose_name_plural = "Журнал изменений заказов"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['record', 'ts'], name='website_rse_record_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.record_id} {self.field}: {self.old_value} -> {self.new_value} ({self.source})"
+
+
 class RecordProduct(models.Model):
     BUYER_CHOICES = [
         ('Юра', 'Юра'),
@@ -705,4 +926,62 @@ class WorkerPaymentDeduction(models.Model):
         base = f"{self.amount} ₽"
         if self.reason:
             return f"{base} — {self.reason}"
-        return base
\ No newline at end of file
+        return base
+
+class TelegramOutbox(models.Model):
+    """Очередь исходящих Telegram-сообщений: веб только добавляет строки, отправляет диспетчер"""
+    STATE_CHOICES = [
+        ("pending", "В очереди"),
+        ("sending", "Отправляется"),
+        ("sent", "Отправлено"),
+        ("failed", "Ошибка"),
+    ]
+
+    chat_id = models.CharField(max_length=50, verbose_name="Telegram ID")
+    text = models.TextField(verbose_name="Текст")
+    parse_mode = models.CharField(max_length=20, blank=True, default="Markdown", verbose_name="Разметка")
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default="pending", verbose_name="Состояние")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Следующая попытка")
+    claimed_by = models.CharField(max_length=40, blank=True, default="", verbose_name="Диспетчер")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Взято в работу")
+    last_error = models.CharField(max_length=500, blank=True, default="", verbose_name="Последняя ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Отправлено")
+
+    class Meta:
+        verbose_name = "Telegram-сообщение"
+        verbose_name_plural = "Очередь Telegram-сообщений"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["state", "next_attempt_at"], name="website_tgo_state_next_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.chat_id} [{self.state}] {self.text[:40]}"
+
+
+class TelegramDigestItem(models.Model):
+    """Буфер уведомлений об изменении статуса: за окно коалесцирования уходит одно сообщение на получателя"""
+    chat_id = models.CharField(max_length=50, verbose_name="Telegram ID")
+    record = models.ForeignKey(
+        Record,
+        on_delete=models.CASCADE,
+        related_name="telegram_digest_items",
+        db_index=False,
+        verbose_name="Заказ",
+    )
+    status = models.CharField(max_length=50, verbose_name="Статус")
+    text = models.TextField(verbose_name="Одиночное сообщение")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Создано")
+
+    class Meta:
+        verbose_name = "Событие для дайджеста Telegram"
+        verbose_name_plural = "Буфер дайджеста Telegram"
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["chat_id", "created_at"], name="website_tgd_chat_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.chat_id}: №{self.record_id} -> {self.status}"
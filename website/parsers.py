@@ -8,6 +8,7 @@ from bs4 import BeautifulSoup
 
 from django.utils import timezone
 from .models import Product, Category
+from .utils.price_history import record_price, record_price_changes
 
 
 def _ensure_category() -> Category:
@@ -139,6 +140,7 @@ def parse_amix_category_hinges(base_url: str, start_page: int = 1, end_page: int
             if closing_type and product.hinge_closing_type != closing_type:
                 product.hinge_closing_type = closing_type
                 changed = True
+            old_price = product.our_price
             if price and product.our_price != price:
                 product.our_price = price
                 changed = True
@@ -149,8 +151,11 @@ def parse_amix_category_hinges(base_url: str, start_page: int = 1, end_page: int
             if changed:
                 product.last_parsed = timezone.now()
                 product.save()
+                record_price_changes([(product.id, old_price, product.our_price)], 'catalog', ts=product.last_parsed)
                 changed_total += 1
             else:
+                if created and product.our_price:
+                    record_price(product.id, product.our_price, 'catalog', ts=product.last_parsed)
                 changed_total += 1 if created else 0
 
         time.sleep(delay_sec)
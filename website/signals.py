@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from .models import (
+    CalculationMethod, Category, CategoryField, Designer, Product, Profile, Record, RecordProduct,
+    UnplannedExpense, UploadedFile, WorkerPayment,
+)
+from .telegram_bot.recipients import invalidate_worker_telegram_ids
+from .utils.cache_ns import bump
 
 
 @receiver(post_save, sender=User)
@@ -20,3 +25,44 @@ def save_user_profile(sender, instance, **kwargs):
         # Если профиля нет, создаем его
         Profile.objects.get_or_create(user=instance)
 
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_delete, sender=Designer)
+def invalidate_telegram_recipients(sender, **kwargs):
+    """Сбрасывает кэш designer_id -> telegram_id (удаление Designer обнуляет Profile.designer через update)"""
+    invalidate_worker_telegram_ids()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CategoryField)
+@receiver(post_delete, sender=CategoryField)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Сбрасывает всё, что закэшировано в пространстве 'catalog' (фильтры товаров и т.п.)"""
+    bump('catalog')
+
+
+@receiver(post_save, sender=RecordProduct)
+@receiver(post_delete, sender=RecordProduct)
+@receiver(post_save, sender=UnplannedExpense)
+@receiver(post_delete, sender=UnplannedExpense)
+@receiver(post_save, sender=UploadedFile)
+@receiver(post_delete, sender=UploadedFile)
+@receiver(post_save, sender=WorkerPayment)
+@receiver(post_delete, sender=WorkerPayment)
+def touch_record(sender, instance, **kwargs):
+    """Изменились данные, от которых зависят расчёты заказа — обновляем Record.updated_at"""
+    Record.touch([instance.record_id])
+
+
+@receiver(post_save, sender=Designer)
+@receiver(post_delete, sender=Designer)
+@receiver(post_save, sender=CalculationMethod)
+@receiver(post_delete, sender=CalculationMethod)
+def invalidate_workers_cache(sender, **kwargs):
+    """Ставки/методы расчёта работников входят в моржу всех их заказов"""
+    bump('workers')
@@ -26,11 +26,6 @@ from .handlers import (
     echo_message,
 )
 
-# Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 # Hide sensitive data: third-party libs may log full URLs (including bot token) at INFO/DEBUG.
@@ -40,8 +35,13 @@ logging.getLogger("telegram").setLevel(logging.INFO)
 logging.getLogger("telegram.ext").setLevel(logging.INFO)
 
 
-def create_bot():
-    """Создает и настраивает экземпляр бота"""
+def create_bot(polling: bool = True):
+    """
+    Создает и настраивает экземпляр бота
+
+    Args:
+        polling: False — без Updater, обновления передаются из webhook (dcrm/asgi.py)
+    """
     # Пробуем получить токен из переменных окружения или из Django settings
     token = os.environ.get('TELEGRAM_BOT_TOKEN') or getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
     if not token:
@@ -51,7 +51,10 @@ def create_bot():
             "TELEGRAM_BOT_TOKEN=ваш_токен_здесь"
         )
     
-    application = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    if not polling:
+        builder = builder.updater(None)
+    application = builder.build()
     
     # Регистрация обработчиков команд
     application.add_handler(CommandHandler("start", start_command))
@@ -66,7 +69,12 @@ def create_bot():
 
 
 def run_bot():
-    """Запускает бота"""
+    """Запускает бота (long polling)"""
+    # Настройка логирования только для отдельного процесса бота, не для веб-сервера
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
     application = create_bot()
     logger.info("Бот запущен и готов к работе")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
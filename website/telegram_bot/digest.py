@@ -0,0 +1,91 @@
+"""
+Коалесцирование уведомлений об изменении статуса заказов
+
+Событие не отправляется сразу, а попадает в буфер TelegramDigestItem. Когда самому старому
+событию получателя исполняется DIGEST_WINDOW_SEC, диспетчер очереди собирает все события
+этого получателя в одно сообщение (по статусам, с номерами заказов) и ставит его в TelegramOutbox.
+DIGEST_WINDOW_SEC=0 — дайджест выключен, сообщения ставятся в очередь сразу.
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from website.models import Record, TelegramDigestItem, TelegramOutbox
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOW_SEC = int(os.environ.get('TELEGRAM_DIGEST_WINDOW_SEC', '120'))
+MAX_IDS_PER_STATUS = 50
+
+
+def digest_enabled() -> bool:
+    return DIGEST_WINDOW_SEC > 0
+
+
+def buffer_status_changes(items: Iterable[Tuple[str, int, str, str]]) -> int:
+    """items: (chat_id, record_id, status, одиночное сообщение) — одним bulk_create"""
+    now = timezone.now()
+    rows = [
+        TelegramDigestItem(chat_id=str(chat_id), record_id=record_id, status=status, text=text, created_at=now)
+        for chat_id, record_id, status, text in items
+    ]
+    if rows:
+        TelegramDigestItem.objects.bulk_create(rows)
+    return len(rows)
+
+
+def build_digest(items: List[TelegramDigestItem]) -> str:
+    """Несколько событий одного получателя -> одно сообщение; по заказу учитывается последний статус"""
+    latest: Dict[int, TelegramDigestItem] = {}
+    for item in items:
+        latest[item.record_id] = item
+    if len(latest) == 1:
+        return next(iter(latest.values())).text
+
+    status_display = dict(Record.STATUS_CHOICES)
+    by_status: Dict[str, List[int]] = defaultdict(list)
+    for record_id, item in sorted(latest.items()):
+        by_status[item.status].append(record_id)
+
+    lines = [f"🔄 **Изменены статусы заказов: {len(latest)}**", ""]
+    for status, record_ids in sorted(by_status.items(), key=lambda kv: -len(kv[1])):
+        shown = ", ".join(f"№{rid}" for rid in record_ids[:MAX_IDS_PER_STATUS])
+        if len(record_ids) > MAX_IDS_PER_STATUS:
+            shown += f" и еще {len(record_ids) - MAX_IDS_PER_STATUS}"
+        lines.append(f"📊 **{status_display.get(status, status)}** ({len(record_ids)}): {shown}")
+    return "\n".join(lines)
+
+
+def flush_digests(window_sec: int = DIGEST_WINDOW_SEC, force: bool = False) -> int:
+    """Переносит созревшие буферы в TelegramOutbox; возвращает число поставленных сообщений"""
+    threshold = timezone.now() - timedelta(seconds=max(0, window_sec))
+    due = TelegramDigestItem.objects.values('chat_id').annotate(oldest=Min('created_at'))
+    if not force:
+        due = due.filter(oldest__lte=threshold)
+    chat_ids = [row['chat_id'] for row in due]
+    if not chat_ids:
+        return 0
+
+    items_by_chat: Dict[str, List[TelegramDigestItem]] = defaultdict(list)
+    for item in TelegramDigestItem.objects.filter(chat_id__in=chat_ids).order_by('id'):
+        items_by_chat[item.chat_id].append(item)
+
+    messages = []
+    ids = []
+    for chat_id, items in items_by_chat.items():
+        messages.append(TelegramOutbox(chat_id=chat_id, text=build_digest(items)))
+        ids.extend(item.id for item in items)
+    with transaction.atomic():
+        # удаление служит захватом: если буфер уже забрал другой диспетчер, не дублируем
+        if TelegramDigestItem.objects.filter(id__in=ids).delete()[0] != len(ids):
+            transaction.set_rollback(True)
+            return 0
+        TelegramOutbox.objects.bulk_create(messages)
+    logger.info('Telegram digest: %s сообщений из %s событий', len(messages), len(ids))
+    return len(messages)
@@ -1,148 +1,163 @@
 """
 Модуль для отправки уведомлений в Telegram
+
+Сообщения не отправляются в HTTP-запросе: они кладутся в очередь TelegramOutbox,
+отправляет их диспетчер (website/telegram_bot/outbox.py) в сервисе run_scheduler.
 """
 import logging
-import asyncio
-from telegram import Bot
-from telegram.error import TelegramError
-from django.conf import settings
-import os
+
+from .digest import buffer_status_changes, digest_enabled
+from .outbox import enqueue, enqueue_many, get_token
+from .recipients import get_worker_telegram_id, get_worker_telegram_ids
 
 logger = logging.getLogger(__name__)
 
 
 def send_telegram_notification(telegram_id: str, message: str):
     """
-    Отправляет уведомление в Telegram синхронно
-    
+    Ставит уведомление в очередь отправки Telegram
+
     Args:
         telegram_id: ID пользователя в Telegram
         message: Текст сообщения
     """
-    token = os.environ.get('TELEGRAM_BOT_TOKEN') or getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
-    
-    if not token:
+    if not get_token():
         logger.error("TELEGRAM_BOT_TOKEN не настроен")
         return False
-    
+
     if not telegram_id:
         logger.warning("telegram_id не указан")
         return False
-    
+
     try:
-        # Создаем новый event loop для синхронного вызова из Django
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        async def send_message():
-            bot = Bot(token=token)
-            await bot.send_message(chat_id=telegram_id, text=message, parse_mode='Markdown')
-        
-        loop.run_until_complete(send_message())
-        loop.close()
-        
-        logger.info(f"Уведомление отправлено в Telegram: {telegram_id}")
+        enqueue(telegram_id, message)
+        logger.info(f"Уведомление поставлено в очередь Telegram: {telegram_id}")
         return True
-        
-    except TelegramError as e:
-        logger.error(f"Ошибка отправки в Telegram: {e}")
-        return False
     except Exception as e:
-        logger.error(f"Неожиданная ошибка при отправке в Telegram: {e}")
+        logger.error(f"Не удалось поставить уведомление в очередь Telegram: {e}")
         return False
 
 
+RECORD_MESSAGE_TEMPLATES = {
+    'created': (
+        "🆕 **Новый заказ №{id}**\n\n"
+        "👤 Клиент: {client}\n"
+        "📍 Адрес: {address}\n"
+        "📊 Статус: {status}\n"
+        "💰 Сумма: {amount} ₽\n\n"
+        "Вы назначены: **{role}**"
+    ),
+    'status_changed': (
+        "🔄 **Изменен статус заказа №{id}**\n\n"
+        "👤 Клиент: {client}\n"
+        "📊 Новый статус: **{status}**\n"
+        "💰 Сумма: {amount} ₽\n\n"
+        "Ваша роль: **{role}**"
+    ),
+}
+
+RECORD_WORKER_ROLES = (
+    ('designer_id', 'Проектировщик'),
+    ('designer_worker_id', 'Дизайнер'),
+    ('assembler_worker_id', 'Сборщик'),
+)
+
+
+def record_messages(record, message_type, telegram_ids):
+    """
+    Сообщения работникам заказа: [(telegram_id, текст)]
+
+    Работники берутся по *_id полям заказа, telegram_id — из кэша get_worker_telegram_ids(),
+    поэтому объекты Designer и профили не загружаются.
+    """
+    template = RECORD_MESSAGE_TEMPLATES.get(message_type, RECORD_MESSAGE_TEMPLATES['status_changed'])
+    status_display = dict(record.STATUS_CHOICES).get(record.status, record.status)
+    messages = []
+    for field, role in RECORD_WORKER_ROLES:
+        worker_id = getattr(record, field)
+        if not worker_id:
+            continue
+        telegram_id = telegram_ids.get(worker_id)
+        if not telegram_id:
+            logger.warning(f"У работника ID {worker_id} ({role}) нет подтвержденного Telegram")
+            continue
+        messages.append((telegram_id, template.format(
+            id=record.id,
+            client=f"{record.first_name} {record.last_name}",
+            address=record.address or 'Не указан',
+            status=status_display,
+            amount=record.contract_amount or 0,
+            role=role,
+        )))
+    return messages
+
+
+def _enqueue_messages(messages, records=None):
+    """
+    messages: [(telegram_id, текст)]; records — заказ для каждого сообщения.
+
+    Если records переданы и дайджест включён, сообщения попадают в буфер
+    и уходят одним сообщением на получателя (website/telegram_bot/digest.py).
+    """
+    if not messages:
+        return 0
+    if not get_token():
+        logger.error("TELEGRAM_BOT_TOKEN не настроен")
+        return 0
+    try:
+        if records is not None and digest_enabled():
+            return buffer_status_changes(
+                (chat_id, record.id, record.status, text)
+                for (chat_id, text), record in zip(messages, records)
+            )
+        return enqueue_many(messages)
+    except Exception as e:
+        logger.error(f"Не удалось поставить уведомления в очередь Telegram: {e}", exc_info=True)
+        return 0
+
+
 def notify_workers_about_record(record, message_type='created'):
     """
     Отправляет уведомление всем работникам, связанным с заказом
-    
+
     Args:
         record: объект Record
         message_type: тип уведомления ('created', 'status_changed')
     """
-    from website.models import Profile
-    
     logger.info(f"notify_workers_about_record вызвана для заказа #{record.id}, тип: {message_type}")
-    
-    # Собираем всех работников
-    workers = []
-    
-    if record.designer:
-        workers.append(('Проектировщик', record.designer))
-        logger.info(f"Добавлен Проектировщик: {record.designer.name} {record.designer.surname}")
-    if record.designer_worker:
-        workers.append(('Дизайнер', record.designer_worker))
-        logger.info(f"Добавлен Дизайнер: {record.designer_worker.name} {record.designer_worker.surname}")
-    if record.assembler_worker:
-        workers.append(('Сборщик', record.assembler_worker))
-        logger.info(f"Добавлен Сборщик: {record.assembler_worker.name} {record.assembler_worker.surname}")
-    
-    if not workers:
+
+    if not any(getattr(record, field) for field, _ in RECORD_WORKER_ROLES):
         logger.warning(f"Нет назначенных работников для заказа #{record.id}")
         return
-    
-    # Формируем сообщение
-    status_display = dict(record.STATUS_CHOICES).get(record.status, record.status)
-    
-    if message_type == 'created':
-        message_template = (
-            "🆕 **Новый заказ №{id}**\n\n"
-            "👤 Клиент: {client}\n"
-            "📍 Адрес: {address}\n"
-            "📊 Статус: {status}\n"
-            "💰 Сумма: {amount} ₽\n\n"
-            "Вы назначены: **{role}**"
-        )
-    else:  # status_changed
-        message_template = (
-            "🔄 **Изменен статус заказа №{id}**\n\n"
-            "👤 Клиент: {client}\n"
-            "📊 Новый статус: **{status}**\n"
-            "💰 Сумма: {amount} ₽\n\n"
-            "Ваша роль: **{role}**"
-        )
-    
-    # Отправляем уведомления каждому работнику
-    for role, worker in workers:
+
+    messages = record_messages(record, message_type, get_worker_telegram_ids())
+    # о новых заказах сообщаем сразу, смены статуса коалесцируются в дайджест
+    records = [record] * len(messages) if message_type == 'status_changed' else None
+    queued = _enqueue_messages(messages, records)
+    logger.info(f"Заказ #{record.id}: уведомлений поставлено в очередь: {queued}")
+
+
+def notify_record_status_changes(record_ids):
+    """
+    Уведомления об изменении статуса для пачки заказов (например, после синхронизации UFALOFT)
+
+    Args:
+        record_ids: id заказов, у которых изменился статус
+    """
+    from website.models import Record
+
+    telegram_ids = get_worker_telegram_ids()
+    messages = []
+    records = []
+    for record in Record.objects.filter(id__in=list(record_ids)):
         try:
-            logger.info(f"Поиск профиля для работника {worker.name} {worker.surname} (ID: {worker.id})")
-            
-            # Получаем профиль работника
-            profile = Profile.objects.filter(
-                designer=worker,
-                telegram_verified=True,
-                telegram_id__isnull=False
-            ).first()
-            
-            if profile and profile.telegram_id:
-                logger.info(f"Профиль найден: user={profile.user.username}, telegram_id={profile.telegram_id}")
-                
-                message = message_template.format(
-                    id=record.id,
-                    client=f"{record.first_name} {record.last_name}",
-                    address=record.address or 'Не указан',
-                    status=status_display,
-                    amount=record.contract_amount or 0,
-                    role=role
-                )
-                
-                logger.info(f"Отправка сообщения работнику {worker.name} {worker.surname}")
-                result = send_telegram_notification(profile.telegram_id, message)
-                
-                if result:
-                    logger.info(f"✓ Уведомление успешно отправлено работнику {worker.name} {worker.surname} ({role})")
-                else:
-                    logger.error(f"✗ Не удалось отправить уведомление работнику {worker.name} {worker.surname}")
-            else:
-                if not profile:
-                    logger.warning(f"Профиль не найден для работника {worker.name} {worker.surname}")
-                elif not profile.telegram_verified:
-                    logger.warning(f"У работника {worker.name} {worker.surname} Telegram не подтвержден")
-                elif not profile.telegram_id:
-                    logger.warning(f"У работника {worker.name} {worker.surname} нет telegram_id")
-                
+            record_msgs = record_messages(record, 'status_changed', telegram_ids)
         except Exception as e:
-            logger.error(f"Ошибка при отправке уведомления работнику {worker}: {e}", exc_info=True)
+            logger.error(f"Ошибка уведомления об изменении статуса заказа #{record.id}: {e}", exc_info=True)
+            continue
+        messages.extend(record_msgs)
+        records.extend([record] * len(record_msgs))
+    _enqueue_messages(messages, records)
 
 
 def notify_worker_payment_paid(payment) -> bool:
@@ -158,7 +173,6 @@ def notify_worker_payment_paid(payment) -> bool:
     - краткое описание расчёта (процент/погонный/м²)
     """
     from decimal import Decimal
-    from website.models import Profile
 
     if not payment:
         return False
@@ -168,12 +182,8 @@ def notify_worker_payment_paid(payment) -> bool:
     if not record or not worker:
         return False
 
-    profile = Profile.objects.filter(
-        designer=worker,
-        telegram_verified=True,
-        telegram_id__isnull=False,
-    ).first()
-    if not (profile and profile.telegram_id):
+    telegram_id = get_worker_telegram_id(payment.worker_id)
+    if not telegram_id:
         logger.warning(
             f"[tg] worker payment notify skipped: no verified telegram for worker={getattr(worker, 'id', None)}"
         )
@@ -234,5 +244,5 @@ def notify_worker_payment_paid(payment) -> bool:
             lines.append(f"... и еще {len(deductions) - 20}")
 
     message = "\n".join(lines)
-    return send_telegram_notification(profile.telegram_id, message)
+    return send_telegram_notification(telegram_id, message)
 
@@ -0,0 +1,247 @@
+"""
+Очередь исходящих Telegram-сообщений (TelegramOutbox) и асинхронный диспетчер
+
+Веб-запросы только добавляют строки в очередь. Диспетчер держит один Bot (один HTTP-пул),
+отправляет сообщения параллельно с учётом лимитов Telegram (~30 сообщений/с на бота,
+1 сообщение/с в один чат) и повторяет неудачные попытки с экспоненциальной задержкой.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.utils import timezone
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+from telegram.request import HTTPXRequest
+
+from website.models import TelegramOutbox
+from website.utils import metrics
+
+from .digest import digest_enabled, flush_digests
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get('TELEGRAM_OUTBOX_BATCH', '50'))
+CONCURRENCY = int(os.environ.get('TELEGRAM_OUTBOX_CONCURRENCY', '8'))
+RATE_PER_SEC = float(os.environ.get('TELEGRAM_OUTBOX_RATE', '25'))
+MAX_ATTEMPTS = int(os.environ.get('TELEGRAM_OUTBOX_MAX_ATTEMPTS', '5'))
+POLL_INTERVAL_SEC = float(os.environ.get('TELEGRAM_OUTBOX_POLL_SEC', '2'))
+KEEP_SENT_DAYS = int(os.environ.get('TELEGRAM_OUTBOX_KEEP_DAYS', '14'))
+PER_CHAT_INTERVAL_SEC = 1.0
+RETRY_BASE = timedelta(seconds=30)
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def get_token() -> Optional[str]:
+    return os.environ.get('TELEGRAM_BOT_TOKEN') or getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
+
+
+def enqueue(chat_id: str, text: str, parse_mode: str = 'Markdown') -> TelegramOutbox:
+    return TelegramOutbox.objects.create(chat_id=str(chat_id), text=text, parse_mode=parse_mode)
+
+
+def enqueue_many(messages: Iterable[Tuple[str, str]], parse_mode: str = 'Markdown') -> int:
+    """messages: (chat_id, text) — одним bulk_create"""
+    rows = [TelegramOutbox(chat_id=str(chat_id), text=text, parse_mode=parse_mode) for chat_id, text in messages]
+    if rows:
+        TelegramOutbox.objects.bulk_create(rows)
+    return len(rows)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """30 с, 1 мин, 2 мин, ... (attempts — уже сделанные попытки)"""
+    return RETRY_BASE * (2 ** max(0, min(attempts - 1, 10)))
+
+
+def _due_filter(now) -> Q:
+    # «sending» дольше CLAIM_TIMEOUT — диспетчер упал посреди пачки, забираем заново
+    return Q(state='pending', next_attempt_at__lte=now) | Q(state='sending', claimed_at__lt=now - CLAIM_TIMEOUT)
+
+
+def claim_batch(claim_token: str, limit: int = BATCH_SIZE) -> List[TelegramOutbox]:
+    """Атомарно помечает пачку сообщений своим токеном: два диспетчера не отправят одно сообщение дважды"""
+    close_old_connections()
+    now = timezone.now()
+    ids = list(TelegramOutbox.objects.filter(_due_filter(now)).order_by('id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    TelegramOutbox.objects.filter(_due_filter(now), id__in=ids).update(state='sending', claimed_by=claim_token, claimed_at=now)
+    return list(TelegramOutbox.objects.filter(state='sending', claimed_by=claim_token, claimed_at=now).order_by('id'))
+
+
+@dataclass
+class BatchOutcome:
+    sent: List[int] = field(default_factory=list)
+    retry: Dict[int, Tuple[str, Optional[float]]] = field(default_factory=dict)  # id -> (ошибка, задержка Telegram)
+    failed: Dict[int, str] = field(default_factory=dict)
+
+
+def apply_outcome(rows: List[TelegramOutbox], outcome: BatchOutcome) -> None:
+    now = timezone.now()
+    if outcome.sent:
+        TelegramOutbox.objects.filter(id__in=outcome.sent).update(state='sent', sent_at=now, claimed_by='', last_error='')
+    to_update = []
+    by_id = {r.id: r for r in rows}
+    for row_id, error in outcome.failed.items():
+        row = by_id[row_id]
+        row.state, row.last_error, row.attempts = 'failed', error[:500], row.attempts + 1
+        to_update.append(row)
+    for row_id, (error, retry_after) in outcome.retry.items():
+        row = by_id[row_id]
+        row.attempts += 1
+        row.last_error = error[:500]
+        if row.attempts >= MAX_ATTEMPTS:
+            row.state = 'failed'
+        else:
+            row.state = 'pending'
+            delay = timedelta(seconds=retry_after) if retry_after else retry_delay(row.attempts)
+            row.next_attempt_at = now + delay
+        to_update.append(row)
+    for row in to_update:
+        row.claimed_by = ''
+    if to_update:
+        TelegramOutbox.objects.bulk_update(to_update, ['state', 'attempts', 'last_error', 'next_attempt_at', 'claimed_by'])
+
+
+def purge_sent(days: int = KEEP_SENT_DAYS) -> int:
+    deleted, _ = TelegramOutbox.objects.filter(state='sent', sent_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+class RateLimiter:
+    """Равномерно распределяет отправки: не больше rate сообщений в секунду на бота"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / max(rate, 0.1)
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class OutboxDispatcher:
+    def __init__(self, bot: Bot, concurrency: int = CONCURRENCY, rate: float = RATE_PER_SEC, batch_size: int = BATCH_SIZE):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.limiter = RateLimiter(rate)
+        self.claim_token = uuid.uuid4().hex
+
+    async def _send_one(self, row: TelegramOutbox, outcome: BatchOutcome) -> Optional[float]:
+        """Возвращает паузу (сек), если Telegram попросил подождать"""
+        async with self.semaphore:
+            await self.limiter.wait()
+            started = time.perf_counter()
+            result = 'retry'
+            try:
+                await self.bot.send_message(chat_id=row.chat_id, text=row.text, parse_mode=row.parse_mode or None)
+                outcome.sent.append(row.id)
+                result = 'sent'
+            except RetryAfter as e:
+                retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+                outcome.retry[row.id] = (f'RetryAfter {retry_after}s', retry_after)
+                return retry_after
+            except (Forbidden, BadRequest) as e:
+                # бот заблокирован / чат не найден / битая разметка — повтор не поможет
+                outcome.failed[row.id] = str(e)
+                result = 'failed'
+            except TelegramError as e:
+                outcome.retry[row.id] = (str(e), None)
+            except Exception as e:
+                logger.exception('Неожиданная ошибка отправки в Telegram (outbox #%s)', row.id)
+                outcome.retry[row.id] = (str(e), None)
+            finally:
+                metrics.TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - started)
+                metrics.TELEGRAM_MESSAGES.labels(result).inc()
+        return None
+
+    async def _send_chat(self, rows: List[TelegramOutbox], outcome: BatchOutcome) -> None:
+        # в один чат — последовательно и не чаще раза в секунду
+        for i, row in enumerate(rows):
+            pause = await self._send_one(row, outcome)
+            if pause:
+                for rest in rows[i + 1:]:
+                    outcome.retry[rest.id] = ('Отложено после RetryAfter', pause)
+                return
+            if i + 1 < len(rows):
+                await asyncio.sleep(PER_CHAT_INTERVAL_SEC)
+
+    async def run_once(self) -> int:
+        if digest_enabled():
+            await sync_to_async(flush_digests)()
+        rows = await sync_to_async(claim_batch)(self.claim_token, self.batch_size)
+        if not rows:
+            return 0
+        by_chat: Dict[str, List[TelegramOutbox]] = defaultdict(list)
+        for row in rows:
+            by_chat[row.chat_id].append(row)
+        outcome = BatchOutcome()
+        await asyncio.gather(*(self._send_chat(chat_rows, outcome) for chat_rows in by_chat.values()))
+        await sync_to_async(apply_outcome)(rows, outcome)
+        logger.info('Telegram outbox: sent=%s retry=%s failed=%s', len(outcome.sent), len(outcome.retry), len(outcome.failed))
+        return len(rows)
+
+    async def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        last_purge = 0.0
+        while not (stop and stop.is_set()):
+            try:
+                processed = await self.run_once()
+                if time.monotonic() - last_purge > 3600:
+                    await sync_to_async(purge_sent)()
+                    last_purge = time.monotonic()
+            except Exception:
+                logger.exception('Ошибка диспетчера Telegram outbox')
+                processed = 0
+            if not processed:
+                await asyncio.sleep(POLL_INTERVAL_SEC)
+
+
+async def dispatch_forever(token: str, stop: Optional[threading.Event] = None, concurrency: int = CONCURRENCY) -> None:
+    """Один Bot и один HTTP-пул на всё время работы диспетчера"""
+    request = HTTPXRequest(connection_pool_size=max(1, concurrency) + 2)
+    async with Bot(token=token, request=request) as bot:
+        await OutboxDispatcher(bot, concurrency=concurrency).run_forever(stop)
+
+
+def start_dispatcher_thread() -> Optional[threading.Thread]:
+    """Диспетчер в отдельном потоке со своим event loop (внутри run_scheduler)"""
+    if os.environ.get('TELEGRAM_OUTBOX_ENABLED', '1') != '1':
+        return None
+    token = get_token()
+    if not token:
+        logger.warning('TELEGRAM_BOT_TOKEN не настроен — Telegram outbox не отправляется')
+        return None
+
+    def run():
+        try:
+            while True:
+                try:
+                    asyncio.run(dispatch_forever(token))
+                except Exception:
+                    # например, нет сети при инициализации Bot — пробуем снова
+                    logger.exception('Telegram outbox dispatcher stopped, restarting in 30s')
+                time.sleep(30)
+        finally:
+            connection.close()
+
+    t = threading.Thread(target=run, name='TelegramOutbox', daemon=True)
+    t.start()
+    logger.info('Telegram outbox dispatcher started')
+    return t
@@ -0,0 +1,44 @@
+"""
+Кэш получателей уведомлений: designer_id -> подтверждённый telegram_id
+
+Загружается одним запросом на все профили и сбрасывается сигналами при сохранении/удалении
+Profile (website/signals.py), поэтому уведомление по заказу не делает запрос на каждого работника.
+"""
+import os
+from typing import Dict, Optional
+
+from django.core.cache import cache
+
+CACHE_KEY = 'telegram:worker_ids:v1'
+# TTL — страховка на случай процесс-локального кэша (CACHE_BACKEND=locmem), где сброс не виден соседям
+CACHE_TTL = int(os.environ.get('TELEGRAM_RECIPIENTS_TTL', '300'))
+
+
+def get_worker_telegram_ids() -> Dict[int, str]:
+    """{designer_id: telegram_id} для профилей с подтверждённым Telegram"""
+    ids = cache.get(CACHE_KEY)
+    if ids is None:
+        from website.models import Profile
+
+        ids = {}
+        rows = (
+            Profile.objects.filter(designer__isnull=False, telegram_verified=True, telegram_id__isnull=False)
+            .exclude(telegram_id='')
+            .order_by('id')
+            .values_list('designer_id', 'telegram_id')
+        )
+        for designer_id, telegram_id in rows:
+            # несколько профилей на одного работника — как раньше, берём первый
+            ids.setdefault(designer_id, telegram_id)
+        cache.set(CACHE_KEY, ids, CACHE_TTL)
+    return ids
+
+
+def get_worker_telegram_id(designer_id: Optional[int]) -> Optional[str]:
+    if not designer_id:
+        return None
+    return get_worker_telegram_ids().get(designer_id)
+
+
+def invalidate_worker_telegram_ids() -> None:
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,132 @@
+"""
+Webhook-режим Telegram бота внутри ASGI-процесса сайта (dcrm/asgi.py)
+
+Вместо отдельного контейнера с long polling Telegram сам присылает обновления
+POST-запросом на секретный путь /telegram/webhook/<TELEGRAM_WEBHOOK_SECRET>/.
+Обработчики те же (handlers.py): они async, а к БД ходят через sync_to_async
+(thread_sensitive — один поток для ORM, как и у остального async-кода Django).
+
+Включение: TELEGRAM_WEBHOOK_ENABLED=1, TELEGRAM_WEBHOOK_SECRET=<случайная строка>,
+сервер — ASGI (uvicorn), затем один раз:
+    python manage.py run_telegram_bot --set-webhook https://example.com
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+from typing import Optional
+
+from telegram import Bot, Update
+
+from .outbox import get_token
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+MAX_BODY_BYTES = 1024 * 1024
+
+
+def get_secret() -> str:
+    return os.environ.get('TELEGRAM_WEBHOOK_SECRET', '')
+
+
+def webhook_enabled() -> bool:
+    return os.environ.get('TELEGRAM_WEBHOOK_ENABLED', '0') == '1' and bool(get_secret()) and bool(get_token())
+
+
+def webhook_path(secret: Optional[str] = None) -> str:
+    return f'/telegram/webhook/{secret or get_secret()}/'
+
+
+async def _respond(send, status: int, body: bytes = b'') -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class TelegramWebhookApp:
+    """ASGI-обёртка: секретный путь обрабатывает бот, остальное — Django"""
+
+    def __init__(self, django_app, secret: Optional[str] = None):
+        self.django_app = django_app
+        self.secret = secret or get_secret()
+        self.path = webhook_path(self.secret)
+        self._bot_app = None
+        self._init_lock = asyncio.Lock()
+
+    async def _get_bot_app(self):
+        # Application (и его HTTP-пул) создаётся в event loop сервера при первом обновлении
+        async with self._init_lock:
+            if self._bot_app is None:
+                from .bot import create_bot
+
+                application = create_bot(polling=False)
+                await application.initialize()
+                self._bot_app = application
+        return self._bot_app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope.get('path') != self.path:
+            return await self.django_app(scope, receive, send)
+        if scope.get('method') != 'POST':
+            return await _respond(send, 405)
+        # байты, а не str: compare_digest падает с TypeError на не-ASCII строках (вместо 403 — 500)
+        token = dict(scope.get('headers') or []).get(SECRET_HEADER, b'')
+        if not hmac.compare_digest(token, self.secret.encode()):
+            return await _respond(send, 403)
+        body = await _read_body(receive)
+        if body is None:
+            return await _respond(send, 400)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return await _respond(send, 400)
+
+        try:
+            application = await self._get_bot_app()
+            await application.process_update(Update.de_json(data, application.bot))
+        except Exception:
+            # 200 всё равно: иначе Telegram будет повторять то же обновление
+            logger.exception('Ошибка обработки Telegram webhook (update_id=%s)', data.get('update_id'))
+        await _respond(send, 200, b'ok')
+
+
+async def _set_webhook(base_url: str) -> bool:
+    async with Bot(token=get_token()) as bot:
+        return await bot.set_webhook(
+            url=base_url.rstrip('/') + webhook_path(),
+            secret_token=get_secret(),
+            allowed_updates=Update.ALL_TYPES,
+        )
+
+
+async def _delete_webhook() -> bool:
+    async with Bot(token=get_token()) as bot:
+        return await bot.delete_webhook()
+
+
+def set_webhook(base_url: str) -> bool:
+    return asyncio.run(_set_webhook(base_url))
+
+
+def delete_webhook() -> bool:
+    return asyncio.run(_delete_webhook())
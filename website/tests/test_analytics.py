@@ -0,0 +1,47 @@
+"""
+Кэш моржи аналитики: правка комплектации заказа меняет закэшированные цифры
+
+    python manage.py test website.tests.test_analytics
+"""
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from website.models import Product, Record
+from website.views.analytics import get_monthly_margins
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MonthlyMarginCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.record = Record.objects.create(first_name='Иван', last_name='Иванов', contract_amount=Decimal('500'))
+        cls.product = Product.objects.create(name='Петля', our_price=Decimal('100'))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _margin(self):
+        created = timezone.localtime(self.record.created_at)
+        records = Record.objects.filter(created_at__year=created.year).prefetch_related(
+            'files', 'unplanned_expenses', 'recordproduct_set__product',
+        )
+        return get_monthly_margins(records, created.year)[created.month]['margin_total']
+
+    def test_products_change_invalidates_margin(self):
+        self.assertEqual(self._margin(), Decimal('500'))
+
+        url = reverse('add_products_to_record', args=[self.record.pk])
+        self.client.post(url, {f'product_{self.product.pk}': 'on', f'quantity_{self.product.pk}': '2'})
+        self.assertEqual(self._margin(), Decimal('300'))
+
+        self.client.get(reverse('clear_products', args=[self.record.pk]))
+        self.assertEqual(self._margin(), Decimal('500'))
@@ -0,0 +1,73 @@
+"""
+Блокировки в БД: лидер планировщика (LeaderLock) и единственный UFALOFT watcher на все режимы
+
+    python manage.py test website.tests.test_locks
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from website.models import SchedulerLock, UfaloftWatcher
+from website.utils.leader_lock import LeaderLock
+from website.utils.watcher_registry import WatcherRegistration, request_start
+
+
+class LeaderLockTests(TestCase):
+    def test_single_holder(self):
+        a, b = LeaderLock('scheduler'), LeaderLock('scheduler')
+        self.assertTrue(a.acquire())
+        self.assertFalse(b.acquire())
+        self.assertEqual(b.holder().owner, a.owner)
+        # повторный acquire владельца продлевает аренду
+        self.assertTrue(a.acquire())
+        self.assertTrue(a.renew())
+        self.assertFalse(b.renew())
+
+    def test_expired_lock_is_taken_over(self):
+        a, b = LeaderLock('scheduler'), LeaderLock('scheduler')
+        a.acquire()
+        SchedulerLock.objects.filter(name='scheduler').update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(a.holder())
+        self.assertTrue(b.acquire())
+        # прежний владелец узнаёт о потере лидерства при продлении
+        self.assertFalse(a.renew())
+        self.assertEqual(a.holder().owner, b.owner)
+
+    def test_release(self):
+        a, b = LeaderLock('scheduler'), LeaderLock('scheduler')
+        a.acquire()
+        a.release()
+        self.assertTrue(b.acquire())
+
+    def test_names_are_independent(self):
+        self.assertTrue(LeaderLock('scheduler').acquire())
+        self.assertTrue(LeaderLock('outbox').acquire())
+
+
+class WatcherRegistrationTests(TestCase):
+    def _registration(self, mode):
+        registration = WatcherRegistration(mode)
+        self.addCleanup(registration.stop)
+        return registration
+
+    def test_single_watcher_across_modes(self):
+        hybrid = self._registration('hybrid')
+        self.assertTrue(hybrid.claim())
+        self.assertFalse(self._registration('requests').claim())
+        self.assertFalse(self._registration('hybrid').claim())
+        hybrid.stop()
+        self.assertTrue(self._registration('requests').claim())
+
+    def test_stale_heartbeat_frees_slot(self):
+        self.assertTrue(self._registration('browser').claim())
+        UfaloftWatcher.objects.filter(mode='browser').update(
+            heartbeat_at=timezone.now() - timedelta(seconds=UfaloftWatcher.HEARTBEAT_STALE_SEC + 1),
+        )
+        self.assertTrue(self._registration('requests').claim())
+
+    def test_request_start_returns_running_watcher(self):
+        self.assertTrue(self._registration('hybrid').claim())
+        watcher, created = request_start('requests')
+        self.assertFalse(created)
+        self.assertEqual(watcher.mode, 'hybrid')
@@ -0,0 +1,92 @@
+"""
+Цены товаров: back-off планового парсинга, выбор устаревших URL, агрегаты истории цен
+
+    python manage.py test website.tests.test_prices
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from website.models import PriceFetchFailure, Product, ProductPriceHistory
+from website.utils.price_history import price_aggregates, record_price_changes
+from website.utils.price_refresh import BACKOFF_BASE, BACKOFF_MAX, _record_failures, backoff_delay, select_stale_urls
+
+
+def _product(name, **fields):
+    return Product.objects.create(name=name, our_price=Decimal('100'), **fields)
+
+
+class BackoffDelayTests(SimpleTestCase):
+    def test_doubles_up_to_max(self):
+        self.assertEqual(backoff_delay(1), min(BACKOFF_BASE, BACKOFF_MAX))
+        self.assertEqual(backoff_delay(2), min(BACKOFF_BASE * 2, BACKOFF_MAX))
+        self.assertEqual(backoff_delay(1000), BACKOFF_MAX)
+
+
+class SelectStaleUrlsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        _product('Новый', source_url='https://shop.example/a')
+        _product('Дубль', source_url='https://shop.example/a', last_parsed=now)
+        _product('Старый', source_url='https://shop.example/b', last_parsed=now - timedelta(days=30))
+        _product('Свежий', source_url='https://shop.example/c', last_parsed=now - timedelta(hours=1))
+        _product('Без ссылки', source_url='')
+
+    def test_order_and_dedup(self):
+        self.assertEqual(select_stale_urls(10), [
+            'https://shop.example/a', 'https://shop.example/b', 'https://shop.example/c',
+        ])
+        self.assertEqual(select_stale_urls(1), ['https://shop.example/a'])
+        self.assertEqual(select_stale_urls(0), [])
+
+    def test_backoff_excludes_failing_urls(self):
+        now = timezone.now()
+        _record_failures({'https://shop.example/b': '404'}, now)
+        self.assertNotIn('https://shop.example/b', select_stale_urls(10, now=now))
+        self.assertIn('https://shop.example/b', select_stale_urls(10, now=now + backoff_delay(1)))
+
+        _record_failures({'https://shop.example/b': 'timeout'}, now)
+        failure = PriceFetchFailure.objects.get(url='https://shop.example/b')
+        self.assertEqual((failure.failures, failure.last_error), (2, 'timeout'))
+        self.assertEqual(failure.next_retry_at, now + backoff_delay(2))
+
+
+class PriceHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = _product('Петля')
+
+    def _ts(self, month, day, hour=12):
+        return datetime(2026, month, day, hour, tzinfo=dt_timezone.utc)
+
+    def test_record_price_changes_skips_unchanged(self):
+        written = record_price_changes([
+            (self.product.id, Decimal('100'), Decimal('100')),
+            (self.product.id, Decimal('100'), None),
+            (self.product.id, Decimal('100'), Decimal('120')),
+        ], source='parser')
+        self.assertEqual(written, 1)
+        self.assertEqual(list(ProductPriceHistory.objects.values_list('price', flat=True)), [Decimal('120')])
+
+    def test_monthly_aggregates(self):
+        for ts, price in [
+            (self._ts(1, 5), '100'), (self._ts(1, 20), '140'), (self._ts(1, 25), '120'),
+            (self._ts(2, 3), '90'),
+        ]:
+            ProductPriceHistory.objects.create(product=self.product, ts=ts, price=Decimal(price), source='parser')
+
+        january, february = price_aggregates([self.product.id], period='month')
+        self.assertEqual(
+            (january['min_price'], january['max_price'], january['last_price'], january['points']),
+            (Decimal('100'), Decimal('140'), Decimal('120'), 3),
+        )
+        self.assertEqual(january['last_ts'], self._ts(1, 25))
+        self.assertEqual((february['last_price'], february['points']), (Decimal('90'), 1))
+        self.assertEqual(len(price_aggregates([self.product.id], period='month', since=self._ts(2, 1))), 1)
+
+    def test_unknown_period(self):
+        with self.assertRaises(ValueError):
+            price_aggregates(period='decade')
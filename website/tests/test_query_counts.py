@@ -0,0 +1,141 @@
+"""
+Регрессия числа SQL-запросов на ключевых страницах
+
+Данные засеваются дважды — N заказов, затем ещё 9×N (итого 10×N) — и число запросов каждой
+страницы сравнивается: оно не должно расти с объёмом данных (N+1) и не должно превышать бюджет
+из QUERY_BUDGETS. Кэш очищается перед замером: меряется худший (холодный) случай.
+
+    python manage.py test website.tests.test_query_counts
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from website.models import Profile, Record
+from website.utils.benchmark_data import BenchmarkScale, check_media_root, generate_benchmark_data
+
+N = 5
+
+# Бюджет SQL-запросов на страницу — единственное место, где он задаётся.
+# Ускорили страницу — уменьшите бюджет, чтобы выигрыш не потерялся.
+QUERY_BUDGETS = {
+    'home': 9,
+    'home_worker': 10,
+    'record_detail': 13,
+    'record_detail_worker': 14,
+    'analytics_dashboard': 23,
+    'payments_page': 56,
+    'customer_detail': 7,
+    'profiles_list': 11,
+    'add_products_to_record': 15,
+}
+
+# имя -> (url name, пользователь, нужен ли pk заказа / заказчика)
+CASES = {
+    'home': ('home', 'admin', None),
+    'home_worker': ('home', 'worker', None),
+    'record_detail': ('record_detail', 'admin', 'record'),
+    'record_detail_worker': ('record_detail', 'worker', 'record'),
+    'analytics_dashboard': ('analytics_dashboard', 'admin', None),
+    'payments_page': ('payments_page', 'admin', None),
+    'customer_detail': ('customer_detail', 'admin', 'customer'),
+    'profiles_list': ('profiles_list', 'admin', None),
+    'add_products_to_record': ('add_products_to_record', 'admin', 'record'),
+}
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class QueryCountRegressionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='dcrm-test-media-')
+        cls._media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls._media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.customer = User.objects.create_user('customer', first_name='Иван', last_name='Иванов')
+        cls.worker = User.objects.create_user('worker')
+        cls._seed(N)
+        # работник — проектировщик из сгенерированных, у него есть заказы
+        designer = Record.objects.order_by('id').first().designer
+        Profile.objects.filter(user=cls.worker).update(designer=designer)
+
+    @classmethod
+    def _seed(cls, records):
+        scale = BenchmarkScale(
+            records=records, products=records * 2, record_products=records * 4, categories=2,
+            workers_per_role=2, csv_ratio=0.5, csv_rows=5, days=1,
+        )
+        generate_benchmark_data(scale, seed=records)
+        Record.objects.filter(customer__isnull=True).update(customer=cls.customer)
+        # профили тоже растут вместе с данными (profiles_list)
+        for i in range(records):
+            User.objects.create_user(f'user{User.objects.count()}-{i}')
+
+    def _url(self, name):
+        url_name, _, arg = CASES[name]
+        if arg == 'record':
+            return reverse(url_name, kwargs={'pk': Record.objects.order_by('id').first().pk})
+        if arg == 'customer':
+            return reverse(url_name, kwargs={'user_id': self.customer.pk})
+        return reverse(url_name)
+
+    def _count_queries(self, name):
+        self.client.force_login(getattr(self, CASES[name][1]))
+        url = self._url(name)
+        # первый запрос — досинхронизация данных (страница выплат создаёт/обновляет WorkerPayment
+        # пачкой на работника); меряется повторный запрос с пустым кэшем
+        self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, f'{name}: {url}')
+        return len(ctx.captured_queries)
+
+    def test_budgets_cover_all_cases(self):
+        self.assertEqual(set(QUERY_BUDGETS), set(CASES))
+
+    def test_query_counts_do_not_grow_with_data(self):
+        small = {name: self._count_queries(name) for name in CASES}
+        self._seed(N * 9)
+        self.assertEqual(Record.objects.count(), N * 10)
+        large = {name: self._count_queries(name) for name in CASES}
+        for name in CASES:
+            with self.subTest(view=name):
+                self.assertLessEqual(large[name], small[name],
+                                     f'{name}: {small[name]} запросов на {N} заказах, {large[name]} на {N * 10}')
+                self.assertLessEqual(large[name], QUERY_BUDGETS[name],
+                                     f'{name}: {large[name]} запросов, бюджет {QUERY_BUDGETS[name]}')
+
+
+class BenchmarkMediaRootTests(SimpleTestCase):
+    def test_refuses_working_media_root(self):
+        media_root = tempfile.mkdtemp(prefix='dcrm-test-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root):
+            check_media_root()
+            os.makedirs(os.path.join(media_root, 'uploads', 'record_1'))
+            with self.assertRaises(ValueError):
+                check_media_root()
+        with override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'media')):
+            with self.assertRaises(ValueError):
+                check_media_root()
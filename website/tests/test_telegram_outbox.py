@@ -0,0 +1,111 @@
+"""
+Telegram: очередь исходящих сообщений (захват пачки, повторы, failed) и дайджест статусов
+
+    python manage.py test website.tests.test_telegram_outbox
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from website.models import Record, TelegramDigestItem, TelegramOutbox
+from website.telegram_bot import outbox
+from website.telegram_bot.digest import buffer_status_changes, build_digest, flush_digests
+from website.telegram_bot.outbox import BatchOutcome, apply_outcome, claim_batch, enqueue, retry_delay
+
+
+# claim_batch закрывает устаревшие соединения — внутри транзакции TestCase этого делать нельзя
+@mock.patch.object(outbox, 'close_old_connections', lambda: None)
+class OutboxTests(TestCase):
+    def test_claim_batch_does_not_double_claim(self):
+        messages = [enqueue('1', f'msg {i}') for i in range(3)]
+        first = claim_batch('a', limit=2)
+        second = claim_batch('b')
+        self.assertEqual([m.id for m in first], [m.id for m in messages[:2]])
+        self.assertEqual([m.id for m in second], [messages[2].id])
+        self.assertEqual(claim_batch('c'), [])
+        self.assertEqual({m.state for m in first + second}, {'sending'})
+
+    def test_not_due_is_not_claimed(self):
+        TelegramOutbox.objects.create(chat_id='1', text='later', next_attempt_at=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(claim_batch('a'), [])
+
+    def test_stale_sending_is_reclaimed(self):
+        message = enqueue('1', 'msg')
+        claim_batch('dead')
+        TelegramOutbox.objects.filter(pk=message.pk).update(claimed_at=timezone.now() - outbox.CLAIM_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual([m.id for m in claim_batch('alive')], [message.id])
+
+    def test_retry_delay_doubles(self):
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3)], [timedelta(seconds=30), timedelta(seconds=60), timedelta(seconds=120)])
+
+    def test_apply_outcome(self):
+        for i in range(4):
+            enqueue('1', f'msg {i}')
+        sent, failed, retry, flood = rows = claim_batch('a')
+        started = timezone.now()
+        apply_outcome(rows, BatchOutcome(
+            sent=[sent.id],
+            failed={failed.id: 'Forbidden: bot was blocked by the user'},
+            retry={retry.id: ('Timed out', None), flood.id: ('Flood control exceeded', 7.0)},
+        ))
+        by_id = TelegramOutbox.objects.in_bulk()
+        self.assertEqual(by_id[sent.id].state, 'sent')
+        self.assertEqual((by_id[failed.id].state, by_id[failed.id].attempts), ('failed', 1))
+        self.assertEqual((by_id[retry.id].state, by_id[retry.id].attempts), ('pending', 1))
+        self.assertGreaterEqual(by_id[retry.id].next_attempt_at, started + retry_delay(1))
+        # задержка из RetryAfter Telegram важнее собственного back-off
+        self.assertLess(by_id[flood.id].next_attempt_at, started + timedelta(seconds=8))
+        self.assertEqual({m.claimed_by for m in by_id.values()}, {''})
+
+    def test_retry_gives_up_after_max_attempts(self):
+        message = enqueue('1', 'msg')
+        TelegramOutbox.objects.filter(pk=message.pk).update(attempts=outbox.MAX_ATTEMPTS - 1)
+        rows = claim_batch('a')
+        apply_outcome(rows, BatchOutcome(retry={message.id: ('Timed out', None)}))
+        message.refresh_from_db()
+        self.assertEqual((message.state, message.attempts), ('failed', outbox.MAX_ATTEMPTS))
+        self.assertEqual(claim_batch('b'), [])
+
+
+class DigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first = Record.objects.create(first_name='Иван', last_name='Иванов', status='otrisovka')
+        cls.second = Record.objects.create(first_name='Петр', last_name='Петров', status='otrisovka')
+
+    def _item(self, record, status, text=''):
+        return TelegramDigestItem(chat_id='1', record=record, status=status, text=text)
+
+    def test_single_record_keeps_latest_message(self):
+        text = build_digest([
+            self._item(self.first, 'na_raspile', 'на распиле'),
+            self._item(self.first, 'zakaz_gotov', 'готов'),
+        ])
+        self.assertEqual(text, 'готов')
+
+    def test_several_records_are_grouped_by_latest_status(self):
+        text = build_digest([
+            self._item(self.first, 'na_raspile'),
+            self._item(self.second, 'na_raspile'),
+            self._item(self.first, 'zakaz_gotov'),
+        ])
+        self.assertIn('Изменены статусы заказов: 2', text)
+        self.assertIn(f'**Заказ готов** (1): №{self.first.id}', text)
+        self.assertIn(f'**На распиле** (1): №{self.second.id}', text)
+
+    def test_flush_waits_for_window(self):
+        buffer_status_changes([
+            ('1', self.first.id, 'na_raspile', 'a'),
+            ('1', self.second.id, 'na_raspile', 'b'),
+            ('2', self.first.id, 'na_raspile', 'c'),
+        ])
+        self.assertEqual(flush_digests(window_sec=120), 0)
+        TelegramDigestItem.objects.update(created_at=timezone.now() - timedelta(seconds=121))
+        self.assertEqual(flush_digests(window_sec=120), 2)
+        self.assertFalse(TelegramDigestItem.objects.exists())
+        messages = dict(TelegramOutbox.objects.values_list('chat_id', 'text'))
+        self.assertEqual(messages['2'], 'c')
+        self.assertIn('Изменены статусы заказов: 2', messages['1'])
+        self.assertEqual(flush_digests(force=True), 0)
@@ -0,0 +1,170 @@
+"""
+UFALOFT: пагинация листинга, детектор изменений дашборда, сопоставление строк с заказами
+
+    python manage.py test website.tests.test_ufaloft
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, TestCase
+
+from website.models import Record, RecordStatusEvent
+from website.utils.ufaloft import (
+    DEFAULT_DASHBOARD_URL,
+    DashboardChangeDetector,
+    DashboardItem,
+    _with_page_param,
+    discover_page_urls,
+)
+from website.utils.ufaloft_sync import poll_dashboard, sync_dashboard_items
+
+
+def _row(index, status, price=''):
+    return (
+        '<tr class="listing-table-tr">'
+        f'<td class="item_heading_td"><a class="item_heading_link" href="/index.php?module=items/info&id={index}">'
+        f'3167ЮВ-{index} Гульназ Старобалтачево</a></td>'
+        f'<td class="fieldtype_dropdown field-1284-td">{status}</td>'
+        f'<td class="fieldtype_formula field-1227-td">{price}</td>'
+        '</tr>'
+    )
+
+
+def _page(*rows, pagination=''):
+    return f'<html><body><table class="table">{"".join(rows)}</table>{pagination}</body></html>'
+
+
+class _FakeSession:
+    """Отдаёт один и тот же HTML дашборда вместо requests.Session"""
+
+    def __init__(self, html):
+        self.html = html
+
+    def get(self, url, **kwargs):
+        return SimpleNamespace(text=self.html, url=url, raise_for_status=lambda: None)
+
+
+def _item(index, status, price=''):
+    return DashboardItem(my_index=str(index), raw_title=f'3167ЮВ-{index}', status_text=status, link='', workshop_price=price)
+
+
+class DiscoverPageUrlsTests(SimpleTestCase):
+    def test_ajax_pagination_builds_urls_up_to_max_pages(self):
+        pagination = (
+            '<ul class="pagination"><li class="active"><a href="#">1</a></li>'
+            '<li><a href="#">2</a></li><li><a href="javascript:void(0)">3</a></li>'
+            '<li>…</li><li><a href="#">120</a></li></ul>'
+        )
+        urls = discover_page_urls(_page(pagination=pagination), max_pages=50)
+        # последняя страница (120) выше предела — грузим 2..50, а не только видимые 2 и 3
+        self.assertEqual(len(urls), 49)
+        self.assertEqual(urls[0], _with_page_param(DEFAULT_DASHBOARD_URL, 2))
+        self.assertEqual(urls[-1], _with_page_param(DEFAULT_DASHBOARD_URL, 50))
+
+    def test_real_hrefs_are_used_as_is(self):
+        pagination = (
+            '<div class="pagination"><span>1</span>'
+            '<a href="index.php?module=dashboard/&p=2">2</a><a href="#">3</a></div>'
+        )
+        urls = discover_page_urls(_page(pagination=pagination))
+        self.assertEqual(urls, [
+            'https://lk.ufaloft.ru/index.php?module=dashboard/&p=2',
+            _with_page_param(DEFAULT_DASHBOARD_URL, 3),
+        ])
+
+    def test_single_page(self):
+        self.assertEqual(discover_page_urls(_page(_row(393, 'Отрисовка'))), [])
+        self.assertEqual(discover_page_urls(_page(pagination='<ul class="pagination"><li>1</li></ul>')), [])
+
+    def test_page_param_is_replaced(self):
+        url = _with_page_param(DEFAULT_DASHBOARD_URL + '&page=3', 5)
+        self.assertTrue(url.endswith('page=5'))
+        self.assertNotIn('page=3', url)
+
+
+class DashboardChangeDetectorTests(SimpleTestCase):
+    def setUp(self):
+        self.detector = DashboardChangeDetector()
+        self.html = _page(_row(393, 'Отрисовка', '1 000'), _row(394, 'На распиле'))
+
+    def test_unchanged_table_is_skipped(self):
+        first = self.detector.diff(self.html)
+        self.assertTrue(first.table_changed)
+        self.assertEqual([i.my_index for i in first.items], ['393', '394'])
+        self.assertEqual(first.items[0].workshop_price, '1 000')
+        self.detector.commit(first)
+
+        second = self.detector.diff(self.html)
+        self.assertFalse(second.table_changed)
+        self.assertEqual(second.items, [])
+        self.assertEqual(second.rows_total, 2)
+
+    def test_only_changed_rows_are_parsed(self):
+        self.detector.commit(self.detector.diff(self.html))
+        diff = self.detector.diff(_page(_row(393, 'Заказ готов', '1 000'), _row(394, 'На распиле')))
+        self.assertTrue(diff.table_changed)
+        self.assertEqual(diff.rows_changed, 1)
+        self.assertEqual([(i.my_index, i.status_text) for i in diff.items], [('393', 'Заказ готов')])
+
+    def test_state_moves_only_on_commit(self):
+        self.detector.diff(self.html)
+        # синхронизация упала — commit() не вызван, изменения не теряются
+        self.assertEqual(len(self.detector.diff(self.html).items), 2)
+
+    def test_empty_page_is_not_committed(self):
+        self.detector.commit(self.detector.diff(self.html))
+        empty = self.detector.diff('<html><form><input type="password"></form></html>')
+        self.assertEqual(empty.rows_total, 0)
+        self.detector.commit(empty)
+        self.assertFalse(self.detector.diff(self.html).table_changed)
+
+
+class SyncDashboardItemsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # external_index угадывается из числового first_name
+        cls.indexed = Record.objects.create(first_name='393', last_name='Гульназ', status='otrisovka')
+        cls.unlinked = Record.objects.create(first_name='394', last_name='Ринат', status='otrisovka')
+        Record.objects.filter(pk=cls.unlinked.pk).update(external_index=None)
+
+    def test_match_by_external_index(self):
+        result = sync_dashboard_items([_item(393, 'На распиле', '12 500')], notify=False)
+        self.assertEqual((result.matched, len(result.changes), result.linked), (1, 1, 0))
+        record = Record.objects.get(pk=self.indexed.pk)
+        self.assertEqual(record.status, 'na_raspile')
+        self.assertEqual(record.workshop_price, Decimal('12500.00'))
+        self.assertEqual(
+            set(RecordStatusEvent.objects.filter(record=record, source='ufaloft').values_list('field', flat=True)),
+            {'status', 'workshop_price'},
+        )
+
+    def test_name_fallback_links_record(self):
+        result = sync_dashboard_items([_item(394, 'Отрисовка')], notify=False)
+        self.assertEqual((result.matched, len(result.changes), result.linked), (1, 0, 1))
+        self.assertEqual(Record.objects.get(pk=self.unlinked.pk).external_index, '394')
+
+    def test_missed_and_unparsed(self):
+        result = sync_dashboard_items([_item(999, 'Отрисовка'), _item(393, 'Отрисовка', 'договорная')], notify=False)
+        self.assertEqual([i.my_index for i in result.missed], ['999'])
+        self.assertEqual([i.my_index for i in result.unparsed_prices], ['393'])
+        self.assertEqual(result.changes, [])
+
+    def test_dry_run_writes_nothing(self):
+        result = sync_dashboard_items([_item(393, 'Заказ готов'), _item(394, 'Заказ готов')], dry_run=True, notify=False)
+        self.assertEqual((len(result.changes), result.linked), (2, 1))
+        self.assertEqual(Record.objects.get(pk=self.indexed.pk).status, 'otrisovka')
+        self.assertIsNone(Record.objects.get(pk=self.unlinked.pk).external_index)
+        self.assertFalse(RecordStatusEvent.objects.exists())
+
+    def test_poll_skips_unchanged_dashboard(self):
+        session = _FakeSession(_page(_row(393, 'На распиле')))
+        detector = DashboardChangeDetector()
+        diff, result = poll_dashboard(session, detector)
+        self.assertEqual((diff.rows_total, result.matched, len(result.changes)), (1, 1, 1))
+
+        Record.objects.filter(pk=self.indexed.pk).update(status='otrisovka')
+        diff, result = poll_dashboard(session, detector)
+        # таблица не изменилась — строки не разбираются и не синхронизируются
+        self.assertFalse(diff.table_changed)
+        self.assertIsNone(result)
+        self.assertEqual(Record.objects.get(pk=self.indexed.pk).status, 'otrisovka')
@@ -29,7 +29,10 @@ urlpatterns = [
     path('record/<int:pk>/update/', update_record, name='update_record'),
     path('record/<int:pk>/set-margin/', set_margin_flags, name='set_margin_flags'),
     path('record/<int:pk>/update-status/', update_record_status, name='update_record_status'),
+    path('records/changes/', record_changes, name='record_changes'),
     path('product/<int:pk>/', product_detail, name='product_detail'),
+    path('product/<int:pk>/price-history/', product_price_history, name='product_price_history'),
+    path('products/price-history/', price_history_summary, name='price_history_summary'),
     path('unplanned-expenses/', unplanned_expenses_list, name='unplanned_expenses_list'),
     path('unplanned-expenses/edit/<int:pk>/', edit_unplanned_expense, name='edit_unplanned_expense'),
     path('analytics/', analytics_dashboard, name='analytics_dashboard'),
@@ -38,6 +41,7 @@ urlpatterns = [
     path('payments/<int:payment_id>/mark-unpaid/', mark_payment_unpaid, name='mark_payment_unpaid'),
     path('ufaloft/start/', start_ufaloft_watch, name='start_ufaloft_watch'),
     path('ufaloft/ui/', ufaloft_ui, name='ufaloft_ui'),
+    path('ufaloft/status/', ufaloft_status, name='ufaloft_status'),
     path('profile/', my_profile, name='my_profile'),
     path('profiles/', profiles_list, name='profiles_list'),
     path('profiles/<int:user_id>/', staff_profile, name='staff_profile'),
@@ -45,5 +49,6 @@ urlpatterns = [
     path('create_product/', create_product, name='create_product'),
     path('products/', products_list, name='products_list'),
     path('categories/create/', create_category, name='create_category'),
+    path('metrics', metrics, name='metrics'),
 
 ]
\ No newline at end of file
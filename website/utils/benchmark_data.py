@@ -0,0 +1,293 @@
+"""
+Синтетические данные для бенчмарков и тестов числа запросов
+
+Всё создаётся через bulk_create пачками (без save() и сигналов — уведомления, журнал и кэши не
+трогаются), поэтому 50k заказов и 500k позиций генерируются за минуты, а не часы.
+Объекты помечаются (BENCH_TAG в Record.kto, префикс BENCH_PREFIX в названиях), чтобы их можно
+было удалить flush_benchmark_data(), не задев реальные данные.
+
+Используется командой generate_benchmark_data и тестами website/tests/.
+"""
+import os
+import random
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    CalculationMethod, Category, CategoryField, Designer, Product, ProductCustomField, Profession,
+    Record, RecordProduct, UnplannedExpense, UploadedFile, WorkerPayment, WorkerPaymentDeduction,
+)
+
+BENCH_TAG = 'bench'
+BENCH_PREFIX = 'Bench'
+# CSV раскроя — в своём каталоге: id заказов отдельной БД начинаются с 1 и совпали бы
+# с папками uploads/record_<id>/ реальных заказов
+BENCH_UPLOADS = f'uploads/{BENCH_TAG}'
+
+FIRST_NAMES = ['Иван', 'Петр', 'Сергей', 'Анна', 'Мария', 'Елена', 'Олег', 'Юрий', 'Ольга', 'Дмитрий']
+LAST_NAMES = ['Иванов', 'Петров', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Лебедев', 'Морозов']
+CITIES = ['Москва', 'Уфа', 'Казань', 'Самара', 'Пермь', 'Екатеринбург']
+DETAIL_NAMES = ['Боковина', 'Полка', 'Дно', 'Крышка', 'Фасад', 'Цоколь', 'Задняя стенка']
+
+# профессия -> (метод расчёта, ставки): имена как в справочниках рабочей базы
+WORKER_PROFILES = [
+    ('проектировщик', 'Процент', {'percentage': Decimal('5.00')}),
+    ('дизайнер', 'За м²', {'rate_per_square_meter': Decimal('350.00')}),
+    ('сборщики', 'Погонный метр', {'rate_per_square_meter': Decimal('500.00')}),
+]
+
+
+@dataclass
+class BenchmarkScale:
+    records: int = 50_000
+    products: int = 10_000
+    record_products: int = 500_000
+    categories: int = 20
+    fields_per_category: int = 3
+    workers_per_role: int = 10
+    csv_ratio: float = 0.1         # доля заказов с CSV раскроя
+    csv_rows: int = 40             # деталей в одном CSV
+    expense_ratio: float = 0.3     # доля заказов с непланируемыми расходами
+    payment_ratio: float = 0.5     # доля заказов с выплатами работникам
+    deduction_ratio: float = 0.1   # доля выплат с санкционным вычетом
+    days: int = 730                # заказы распределяются по последним N дням
+    batch_size: int = 2000
+
+
+@contextmanager
+def _without_auto_now(*fields):
+    """bulk_create подставляет now() в auto_now/auto_now_add — отключаем, чтобы сохранить даты из данных"""
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _workers(scale: BenchmarkScale, rng: random.Random) -> Dict[str, List[Designer]]:
+    by_role = {}
+    for profession_name, method_name, rates in WORKER_PROFILES:
+        profession, _ = Profession.objects.get_or_create(name=profession_name)
+        method, _ = CalculationMethod.objects.get_or_create(name=method_name)
+        existing = list(Designer.objects.filter(profession=profession, surname__startswith=BENCH_PREFIX))
+        missing = scale.workers_per_role - len(existing)
+        if missing > 0:
+            Designer.objects.bulk_create([
+                Designer(name=rng.choice(FIRST_NAMES), surname=f'{BENCH_PREFIX}{len(existing) + i}',
+                         profession=profession, method=method, **rates)
+                for i in range(missing)
+            ])
+            existing = list(Designer.objects.filter(profession=profession, surname__startswith=BENCH_PREFIX))
+        by_role[profession_name] = existing
+    return by_role
+
+
+def _catalog(scale: BenchmarkScale, rng: random.Random) -> List[int]:
+    categories = Category.objects.bulk_create([
+        Category(name=f'{BENCH_PREFIX} категория {i}') for i in range(scale.categories)
+    ])
+    fields = CategoryField.objects.bulk_create([
+        # bulk_create не вызывает save(): field_key задаём сами
+        CategoryField(category=c, name=f'Характеристика {j}', field_key=f'bench_{j}',
+                      field_type='number' if j == 0 else 'text')
+        for c in categories for j in range(scale.fields_per_category)
+    ], batch_size=scale.batch_size)
+    fields_by_category = {}
+    for f in fields:
+        fields_by_category.setdefault(f.category_id, []).append(f)
+
+    products = []
+    for i in range(scale.products):
+        category = categories[i % len(categories)]
+        values = {f.field_key: str(rng.randint(1, 900)) for f in fields_by_category[category.id]}
+        price = Decimal(rng.randint(50, 20_000))
+        products.append(Product(
+            name=f'{BENCH_PREFIX} товар {i}', category=category, custom_fields=values,
+            our_price=price, parsed_price=price * Decimal('0.9'),
+        ))
+    products = Product.objects.bulk_create(products, batch_size=scale.batch_size)
+
+    ProductCustomField.objects.bulk_create((
+        ProductCustomField(product=p, category_field=f, value=p.custom_fields[f.field_key], order=k)
+        for p in products for k, f in enumerate(fields_by_category[p.category_id])
+    ), batch_size=scale.batch_size)
+    return [p.id for p in products]
+
+
+def _cutting_list(rng: random.Random, rows: int) -> bytes:
+    """CSV раскроя в формате выгрузки: ';', cp1251, без заголовка; длина/ширина в мм, толщина 16/18"""
+    lines = [
+        f'{rng.choice(DETAIL_NAMES)} {n};{rng.randint(1, 4)};{rng.randint(100, 2700)};{rng.randint(50, 1200)};'
+        f'{rng.choice((16, 16, 18, 4))}'
+        for n in range(1, rows + 1)
+    ]
+    return '\r\n'.join(lines).encode('cp1251')
+
+
+def _records(scale: BenchmarkScale, rng: random.Random, workers: Dict[str, List[Designer]]) -> List[Record]:
+    now = timezone.now()
+    statuses = [s for s, _ in Record.STATUS_CHOICES]
+    records = []
+    for i in range(scale.records):
+        created = now - timedelta(days=rng.uniform(0, scale.days))
+        contract = Decimal(rng.randint(80, 900) * 1000)
+        records.append(Record(
+            created_at=created, updated_at=created,
+            first_name=f'{rng.randint(1000, 99999)}', last_name=rng.choice(LAST_NAMES),
+            phone=f'+7{rng.randint(9000000000, 9999999999)}', city=rng.choice(CITIES),
+            kto=BENCH_TAG, status=rng.choice(statuses),
+            contract_amount=contract, advance=contract * Decimal('0.3'),
+            designer=rng.choice(workers['проектировщик']),
+            designer_worker=rng.choice(workers['дизайнер']),
+            assembler_worker=rng.choice(workers['сборщики']),
+            delivery_price=Decimal(rng.choice((0, 1500, 3000))),
+            workshop_price=Decimal(rng.randint(20, 200) * 1000),
+        ))
+    fields = [Record._meta.get_field('created_at'), Record._meta.get_field('updated_at')]
+    with _without_auto_now(*fields):
+        return Record.objects.bulk_create(records, batch_size=scale.batch_size)
+
+
+def _record_products(scale: BenchmarkScale, rng: random.Random, records: List[Record], product_ids: List[int]) -> int:
+    per_record = max(1, scale.record_products // max(1, len(records)))
+    per_record = min(per_record, len(product_ids))
+    field = RecordProduct._meta.get_field('added_at')
+    created = 0
+    with _without_auto_now(field):
+        batch = []
+        for record in records:
+            # (record, product) уникальны — выборка без повторов
+            for product_id in rng.sample(product_ids, per_record):
+                batch.append(RecordProduct(
+                    record_id=record.id, product_id=product_id, quantity=rng.randint(1, 12),
+                    buyer=rng.choice(('Юра', 'Олег')), added_at=record.created_at,
+                ))
+            if len(batch) >= scale.batch_size * 5:
+                RecordProduct.objects.bulk_create(batch, batch_size=scale.batch_size)
+                created += len(batch)
+                batch = []
+        RecordProduct.objects.bulk_create(batch, batch_size=scale.batch_size)
+    return created + len(batch)
+
+
+def check_media_root() -> None:
+    """ValueError, если MEDIA_ROOT похож на рабочий: CSV раскроя пишутся только в отдельный каталог"""
+    media_root = os.path.realpath(settings.MEDIA_ROOT)
+    if media_root == os.path.realpath(os.path.join(settings.BASE_DIR, 'media')):
+        raise ValueError(f'MEDIA_ROOT не переопределён ({media_root})')
+    for folder, allowed in ((media_root, 'uploads'), (os.path.join(media_root, 'uploads'), BENCH_TAG)):
+        if os.path.isdir(folder) and set(os.listdir(folder)) - {allowed}:
+            raise ValueError(f'В MEDIA_ROOT ({media_root}) уже есть рабочие файлы')
+
+
+def _files(scale: BenchmarkScale, rng: random.Random, records: List[Record]) -> int:
+    chosen = [r for r in records if rng.random() < scale.csv_ratio]
+    uploaded = []
+    for record in chosen:
+        name = f'{BENCH_UPLOADS}/record_{record.id}/raskroy.csv'
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(_cutting_list(rng, scale.csv_rows))
+        uploaded.append(UploadedFile(record_id=record.id, file=name))
+    UploadedFile.objects.bulk_create(uploaded, batch_size=scale.batch_size)
+    return len(uploaded)
+
+
+def _expenses(scale: BenchmarkScale, rng: random.Random, records: List[Record]) -> int:
+    expenses = [
+        UnplannedExpense(record_id=r.id, item=rng.choice(('Доставка', 'Крепёж', 'Стекло', 'Подсветка')),
+                         price=Decimal(rng.randint(5, 150) * 100), spent_by=rng.choice(('Юра', 'Олег')))
+        for r in records if rng.random() < scale.expense_ratio
+        for _ in range(rng.randint(1, 3))
+    ]
+    UnplannedExpense.objects.bulk_create(expenses, batch_size=scale.batch_size)
+    return len(expenses)
+
+
+def _payments(scale: BenchmarkScale, rng: random.Random, records: List[Record]) -> Dict[str, int]:
+    now = timezone.now()
+    payments = []
+    for r in records:
+        if rng.random() >= scale.payment_ratio:
+            continue
+        for role, worker_id in (('designer', r.designer_id), ('designer_worker', r.designer_worker_id),
+                                ('assembler_worker', r.assembler_worker_id)):
+            is_paid = rng.random() < 0.6
+            payments.append(WorkerPayment(
+                record_id=r.id, worker_id=worker_id, role=role,
+                amount=Decimal(rng.randint(5, 60) * 1000), is_paid=is_paid, paid_at=now if is_paid else None,
+            ))
+    payments = WorkerPayment.objects.bulk_create(payments, batch_size=scale.batch_size)
+    deductions = [
+        WorkerPaymentDeduction(payment=p, amount=Decimal(rng.randint(1, 10) * 500), reason='Брак')
+        for p in payments if rng.random() < scale.deduction_ratio
+    ]
+    WorkerPaymentDeduction.objects.bulk_create(deductions, batch_size=scale.batch_size)
+    return {'payments': len(payments), 'deductions': len(deductions)}
+
+
+def generate_benchmark_data(scale: BenchmarkScale, seed: int = 0, log=None) -> Dict[str, int]:
+    """Создаёт каталог, заказы и связанные данные; возвращает число созданных объектов по типам.
+
+    При csv_ratio > 0 MEDIA_ROOT должен быть отдельным (check_media_root), иначе ValueError.
+    """
+    if scale.csv_ratio > 0:
+        check_media_root()
+    rng = random.Random(seed)
+    log = log or (lambda msg: None)
+    summary = {}
+    with transaction.atomic():
+        workers = _workers(scale, rng)
+        log('Каталог...')
+        product_ids = _catalog(scale, rng)
+        summary['products'] = len(product_ids)
+        log('Заказы...')
+        records = _records(scale, rng, workers)
+        summary['records'] = len(records)
+        log('Позиции заказов...')
+        summary['record_products'] = _record_products(scale, rng, records, product_ids)
+        summary['expenses'] = _expenses(scale, rng, records)
+        summary.update(_payments(scale, rng, records))
+    # файлы — вне транзакции: при её откате они всё равно остались бы на диске
+    log('CSV раскроя...')
+    summary['files'] = _files(scale, rng, records)
+    return summary
+
+
+def flush_benchmark_data() -> Dict[str, int]:
+    """Удаляет всё, что создал generate_benchmark_data (по меткам), включая CSV на диске"""
+    for name in UploadedFile.objects.filter(record__kto=BENCH_TAG).values_list('file', flat=True).iterator():
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        if os.path.exists(path):
+            os.remove(path)
+            try:
+                os.rmdir(os.path.dirname(path))  # uploads/bench/record_<id>/, если там больше ничего нет
+            except OSError:
+                pass
+    with transaction.atomic():
+        # дочерние строки — одним DELETE без сигналов: иначе touch_record (website/signals.py)
+        # обновлял бы удаляемый заказ на каждую из сотен тысяч позиций
+        for model in (RecordProduct, UnplannedExpense, UploadedFile, WorkerPaymentDeduction, WorkerPayment):
+            lookup = 'payment__record__kto' if model is WorkerPaymentDeduction else 'record__kto'
+            qs = model.objects.filter(**{lookup: BENCH_TAG})
+            qs._raw_delete(qs.db)
+        _, records = Record.objects.filter(kto=BENCH_TAG).delete()
+        _, products = Product.objects.filter(name__startswith=f'{BENCH_PREFIX} ').delete()
+        _, categories = Category.objects.filter(name__startswith=f'{BENCH_PREFIX} ').delete()
+        _, workers = Designer.objects.filter(surname__startswith=BENCH_PREFIX).delete()
+    deleted = {}
+    for counts in (records, products, categories, workers):
+        for label, n in counts.items():
+            deleted[label] = deleted.get(label, 0) + n
+    return deleted
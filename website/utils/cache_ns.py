@@ -0,0 +1,64 @@
+"""Версионированные пространства имён в кэше: группа ключей сбрасывается одним incr версии.
+
+Ключ = <namespace>:v<версия>:<части>. bump(namespace) увеличивает версию — все старые ключи группы
+перестают читаться сразу (O(1), без перебора) и вытесняются по TTL.
+
+    filters = cached('catalog', 'product_filters', build_filters)
+    bump('catalog')                                  # после изменения каталога
+"""
+import time
+from typing import Callable
+
+from django.core.cache import cache
+
+VERSION_PREFIX = 'nsver:'
+
+
+def _version_key(namespace: str) -> str:
+    return f'{VERSION_PREFIX}{namespace}'
+
+
+def _new_version() -> int:
+    # не 1: если ключ версии вытеснен из кэша, новая версия не совпадёт ни с одной прежней
+    return time.time_ns() // 1000
+
+
+def _ensure_version(key: str) -> int:
+    # add — чтобы параллельный bump() в другом процессе не был затёрт
+    cache.add(key, _new_version(), None)
+    return cache.get(key) or _new_version()
+
+
+def ns_version(namespace: str) -> int:
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = _ensure_version(key)
+    return version
+
+
+def ns_key(namespace: str, *parts) -> str:
+    return ':'.join([namespace, f'v{ns_version(namespace)}', *map(str, parts)])
+
+
+def bump(namespace: str) -> None:
+    """Сбрасывает все ключи пространства имён"""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # версии ещё нет (или вытеснена) — любая новая версия уже не совпадёт со старыми ключами
+        cache.set(key, _new_version(), None)
+
+
+def cached(namespace: str, name: str, compute: Callable, timeout=None):
+    """Значение из кэша пространства имён или compute() с сохранением"""
+    key = ns_key(namespace, name)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            cache.set(key, value)
+        else:
+            cache.set(key, value, timeout)
+    return value
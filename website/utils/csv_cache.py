@@ -5,6 +5,8 @@ import hashlib
 from django.core.cache import cache
 from django.conf import settings
 
+from . import metrics
+
 
 def calculate_file_area(file_path):
     """
@@ -67,8 +69,10 @@ def get_record_files_area(record):
         # Пытаемся получить из кэша
         cached_area = cache.get(cache_key)
         if cached_area is not None:
+            metrics.CACHE_REQUESTS.labels('csv_area', 'hit').inc()
             total_area += cached_area
             continue
+        metrics.CACHE_REQUESTS.labels('csv_area', 'miss').inc()
         
         # Если нет в кэше, вычисляем
         area = calculate_file_area(file_path)
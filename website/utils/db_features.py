@@ -0,0 +1,26 @@
+"""Запросы, которые на PostgreSQL используют индексы из 0081_postgres_indexes и 0083_product_name_trgm, а на SQLite — простой путь"""
+from django.db import connections
+from django.db.models import Q, QuerySet
+
+
+def is_postgres(using: str = 'default') -> bool:
+    return connections[using].vendor == 'postgresql'
+
+
+def json_key_q(field: str, key: str, value, using: str = 'default') -> Q:
+    """field->key = value. На PostgreSQL — через @> (GIN-индекс), на SQLite @> не поддерживается"""
+    if is_postgres(using):
+        return Q(**{f'{field}__contains': {key: value}})
+    return Q(**{f'{field}__{key}': value})
+
+
+def text_search(qs: QuerySet, field: str, text: str) -> QuerySet:
+    """Поиск подстроки без учёта регистра (icontains) на обеих БД.
+
+    На PostgreSQL UPPER(field) LIKE '%...%' для Product.name идёт по триграммному GIN-индексу
+    website_product_name_trgm_idx (от 3 символов запроса).
+    """
+    text = (text or '').strip()
+    if not text:
+        return qs
+    return qs.filter(**{f'{field}__icontains': text})
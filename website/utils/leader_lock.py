@@ -0,0 +1,55 @@
+"""Лидерская блокировка в БД: одна активная копия фонового сервиса на все процессы/контейнеры.
+
+Блокировка — аренда с TTL: владелец продлевает её чаще, чем раз в TTL; если процесс умер,
+запись истекает и её забирает следующий претендент.
+"""
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..models import SchedulerLock
+
+
+class LeaderLock:
+    def __init__(self, name: str, ttl_sec: int = 60):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_sec)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def acquire(self) -> bool:
+        """Захватывает свободную/просроченную блокировку или продлевает свою"""
+        now = timezone.now()
+        mine = SchedulerLock.objects.filter(name=self.name, owner=self.owner).update(expires_at=now + self.ttl)
+        if mine:
+            return True
+        taken = (
+            SchedulerLock.objects.filter(name=self.name, expires_at__lt=now)
+            .update(owner=self.owner, acquired_at=now, expires_at=now + self.ttl)
+        )
+        if taken:
+            return True
+        try:
+            with transaction.atomic():
+                SchedulerLock.objects.create(name=self.name, owner=self.owner, acquired_at=now, expires_at=now + self.ttl)
+            return True
+        except IntegrityError:
+            return False
+
+    def renew(self) -> bool:
+        """Продлевает только свою блокировку; False — лидерство потеряно"""
+        now = timezone.now()
+        return bool(
+            SchedulerLock.objects.filter(name=self.name, owner=self.owner, expires_at__gte=now)
+            .update(expires_at=now + self.ttl)
+        )
+
+    def release(self) -> None:
+        SchedulerLock.objects.filter(name=self.name, owner=self.owner).delete()
+
+    def holder(self):
+        """Текущий непросроченный владелец или None"""
+        return SchedulerLock.objects.filter(name=self.name, expires_at__gte=timezone.now()).first()
@@ -0,0 +1,115 @@
+"""
+Метрики приложения в формате Prometheus (страница /metrics)
+
+Включение: METRICS_ENABLED=1 и установленный prometheus_client. Без него (или при METRICS_ENABLED=0)
+все метрики — заглушки, вызовы ничего не стоят.
+
+Несколько процессов (воркеры gunicorn, планировщик): PROMETHEUS_MULTIPROC_DIR — общий каталог,
+куда каждый процесс пишет свои значения (mmap-файлы), а /metrics суммирует их. Файлы процесса
+называются <тип>_<METRICS_PROCESS_NAME>-<pid>.db, поэтому контейнеры с общим каталогом не
+пересекаются, а cleanup_process_files() при старте сервиса удаляет только свои старые файлы.
+
+    from website.utils import metrics
+    metrics.CACHE_REQUESTS.labels('margin', 'hit').inc(n)
+    with metrics.UFALOFT_SYNC_SECONDS.time(): ...
+"""
+import glob
+import os
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR', '')
+PROCESS_NAME = os.environ.get('METRICS_PROCESS_NAME', 'web')
+ENABLED = prometheus_client is not None and os.environ.get('METRICS_ENABLED', '').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def _process_identifier() -> str:
+    # без "_": имя файла разбирается prometheus_client по "_"
+    return f"{PROCESS_NAME.replace('_', '-')}-{os.getpid()}"
+
+
+def cleanup_process_files() -> None:
+    """Удаляет файлы значений прошлых запусков этого сервиса (вызывать до форка воркеров)"""
+    if not MULTIPROC_DIR:
+        return
+    prefix = PROCESS_NAME.replace('_', '-')
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, f'*_{prefix}-*.db')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+if ENABLED:
+    if MULTIPROC_DIR:
+        os.makedirs(MULTIPROC_DIR, exist_ok=True)
+        from prometheus_client import values
+
+        values.ValueClass = values.MultiProcessValue(_process_identifier)
+    _Counter = prometheus_client.Counter
+    _Histogram = prometheus_client.Histogram
+else:
+    def _Counter(*args, **kwargs):
+        return _NoopMetric()
+
+    _Histogram = _Counter
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HTTP_REQUEST_SECONDS = _Histogram(
+    'dcrm_http_request_duration_seconds', 'Время обработки запроса', ['view', 'method'], buckets=LATENCY_BUCKETS,
+)
+HTTP_RESPONSES = _Counter('dcrm_http_responses_total', 'Ответы по коду статуса', ['view', 'method', 'status'])
+HTTP_DB_QUERIES = _Histogram('dcrm_http_db_queries', 'SQL-запросов на HTTP-запрос', ['view'], buckets=QUERY_BUCKETS)
+HTTP_DB_SECONDS = _Histogram('dcrm_http_db_duration_seconds', 'Время SQL на HTTP-запрос', ['view'], buckets=LATENCY_BUCKETS)
+
+# cache: csv_area | margin; result: hit | miss
+CACHE_REQUESTS = _Counter('dcrm_cache_requests_total', 'Обращения к кэшам расчётов', ['cache', 'result'])
+
+UFALOFT_SYNC_SECONDS = _Histogram('dcrm_ufaloft_sync_duration_seconds', 'Длительность синхронизации UFALOFT', buckets=LATENCY_BUCKETS)
+# result: matched | changed | linked | missed
+UFALOFT_SYNC_RECORDS = _Counter('dcrm_ufaloft_sync_records_total', 'Заказы в синхронизации UFALOFT', ['result'])
+
+TELEGRAM_SEND_SECONDS = _Histogram('dcrm_telegram_send_duration_seconds', 'Отправка сообщения в Telegram', buckets=LATENCY_BUCKETS)
+# result: sent | retry | failed
+TELEGRAM_MESSAGES = _Counter('dcrm_telegram_messages_total', 'Исход отправки сообщений Telegram', ['result'])
+
+SCRAPER_FETCH_SECONDS = _Histogram('dcrm_scraper_fetch_duration_seconds', 'Загрузка страницы цены', buckets=LATENCY_BUCKETS)
+# result: ok | error
+SCRAPER_URLS = _Counter('dcrm_scraper_urls_total', 'Обработанные URL парсера цен', ['result'])
+
+
+def render_latest():
+    """(тело, content-type) для /metrics"""
+    if MULTIPROC_DIR:
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,87 @@
+"""Запись и агрегирование истории цен товаров (ProductPriceHistory)"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.db.models import Count, F, Max, Min, Window
+from django.db.models.functions import RowNumber, Trunc
+from django.utils import timezone
+
+from ..models import ProductPriceHistory
+
+PERIODS = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def record_price(product_id: int, price: Optional[Decimal], source: str, ts: Optional[datetime] = None) -> None:
+    """Добавляет одну точку истории. Пустая цена не пишется."""
+    if price is None:
+        return
+    ProductPriceHistory.objects.create(product_id=product_id, price=price, source=source, ts=ts or timezone.now())
+
+
+def record_price_changes(changes: Iterable[Tuple[int, Optional[Decimal], Optional[Decimal]]], source: str, ts: Optional[datetime] = None) -> int:
+    """Пишет одним bulk_create только реально изменившиеся цены.
+
+    changes: (product_id, old_price, new_price)
+    """
+    ts = ts or timezone.now()
+    rows = [
+        ProductPriceHistory(product_id=product_id, price=new, source=source, ts=ts)
+        for product_id, old, new in changes
+        if new is not None and old != new
+    ]
+    if rows:
+        ProductPriceHistory.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def price_aggregates(
+    product_ids: Optional[Sequence[int]] = None,
+    period: str = 'month',
+    source: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> List[dict]:
+    """min/max/последняя цена по товару и периоду — одним SQL-запросом (оконные функции).
+
+    Возвращает список словарей: product_id, period, min_price, max_price, last_price, last_ts, points.
+    """
+    if period not in PERIODS:
+        raise ValueError(f'Неизвестный период: {period}')
+
+    qs = ProductPriceHistory.objects.all()
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=product_ids)
+    if source:
+        qs = qs.filter(source=source)
+    if since:
+        qs = qs.filter(ts__gte=since)
+    if until:
+        qs = qs.filter(ts__lt=until)
+
+    bucket = Trunc('ts', period)
+    partition = [F('product_id'), bucket]
+    rows = (
+        qs.annotate(
+            period_start=bucket,
+            min_price=Window(Min('price'), partition_by=partition),
+            max_price=Window(Max('price'), partition_by=partition),
+            points=Window(Count('id'), partition_by=partition),
+            row_number=Window(RowNumber(), partition_by=partition, order_by=[F('ts').desc(), F('id').desc()]),
+        )
+        .filter(row_number=1)
+        .order_by('product_id', 'period_start')
+        .values_list('product_id', 'period_start', 'min_price', 'max_price', 'price', 'ts', 'points')
+    )
+    return [
+        {
+            'product_id': product_id,
+            'period': period_start,
+            'min_price': min_price,
+            'max_price': max_price,
+            'last_price': last_price,
+            'last_ts': last_ts,
+            'points': points,
+        }
+        for product_id, period_start, min_price, max_price, last_price, last_ts, points in rows
+    ]
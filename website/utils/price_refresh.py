@@ -0,0 +1,125 @@
+"""Плановое обновление цен товаров: сначала самые «старые», с бюджетом на запуск и back-off по URL"""
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Product, PriceFetchFailure
+from .price_history import record_price_changes
+from .price_scraper import scrape_prices
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET = int(os.environ.get('PRICE_REFRESH_BUDGET', '200'))
+DEFAULT_WORKERS = int(os.environ.get('PRICE_REFRESH_WORKERS', '4'))
+BACKOFF_BASE = timedelta(hours=int(os.environ.get('PRICE_REFRESH_BACKOFF_HOURS', '12')))
+BACKOFF_MAX = timedelta(days=int(os.environ.get('PRICE_REFRESH_BACKOFF_MAX_DAYS', '14')))
+
+
+@dataclass
+class PriceRefreshReport:
+    urls: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def backoff_delay(failures: int) -> timedelta:
+    """base * 2^(n-1), не больше BACKOFF_MAX"""
+    exponent = max(0, failures - 1)
+    # ограничиваем степень, чтобы не переполнить timedelta
+    return min(BACKOFF_BASE * (2 ** min(exponent, 16)), BACKOFF_MAX)
+
+
+def select_stale_urls(budget: int, now=None) -> List[str]:
+    """URL товаров в порядке last_parsed (никогда не парсенные — первыми), без тех, что в back-off"""
+    if budget <= 0:
+        return []
+    now = now or timezone.now()
+    blocked = PriceFetchFailure.objects.filter(next_retry_at__gt=now).values('url')
+    qs = (
+        Product.objects.exclude(source_url='')
+        .exclude(source_url__in=blocked)
+        .order_by(F('last_parsed').asc(nulls_first=True), 'id')
+        .values_list('source_url', flat=True)
+    )
+    urls: List[str] = []
+    seen = set()
+    # несколько товаров могут ссылаться на одну страницу — бюджет считаем по URL
+    for url in qs.iterator(chunk_size=500):
+        if url in seen:
+            continue
+        seen.add(url)
+        urls.append(url)
+        if len(urls) >= budget:
+            break
+    return urls
+
+
+def _record_failures(errors: Dict[str, str], now) -> None:
+    existing = {f.url: f for f in PriceFetchFailure.objects.filter(url__in=list(errors))}
+    to_create = []
+    to_update = []
+    for url, error in errors.items():
+        failure = existing.get(url)
+        if failure is None:
+            failure = PriceFetchFailure(url=url, failures=0)
+            to_create.append(failure)
+        else:
+            to_update.append(failure)
+        failure.failures += 1
+        failure.last_error = error[:500]
+        failure.last_failed_at = now
+        failure.next_retry_at = now + backoff_delay(failure.failures)
+    if to_create:
+        PriceFetchFailure.objects.bulk_create(to_create)
+    if to_update:
+        PriceFetchFailure.objects.bulk_update(to_update, ['failures', 'last_error', 'last_failed_at', 'next_retry_at'])
+
+
+def refresh_stale_prices(budget: int = DEFAULT_BUDGET, max_workers: int = DEFAULT_WORKERS, dry_run: bool = False) -> PriceRefreshReport:
+    """Обновляет parsed_price для не более чем `budget` URL, начиная с самых давно обновлённых."""
+    now = timezone.now()
+    report = PriceRefreshReport()
+    urls = select_stale_urls(budget, now=now)
+    report.urls = len(urls)
+    if not urls:
+        return report
+
+    results = scrape_prices(urls, max_workers=max_workers)
+    prices = {url: r.price for url, r in results.items() if r.ok}
+    report.errors = {url: r.error or 'нет ответа' for url, r in results.items() if not r.ok}
+    report.failed = len(report.errors)
+    if dry_run:
+        report.updated = len(prices)
+        return report
+
+    finished = timezone.now()
+    with transaction.atomic():
+        products = list(Product.objects.filter(source_url__in=list(prices)).only('id', 'source_url', 'parsed_price', 'last_parsed'))
+        changes = []
+        for product in products:
+            new_price = prices[product.source_url]
+            changes.append((product.id, product.parsed_price, new_price))
+            product.parsed_price = new_price
+            product.last_parsed = finished
+        if products:
+            Product.objects.bulk_update(products, ['parsed_price', 'last_parsed'], batch_size=500)
+            record_price_changes(changes, 'parser', ts=finished)
+        report.updated = len(products)
+
+        if prices:
+            PriceFetchFailure.objects.filter(url__in=list(prices)).delete()
+        if report.errors:
+            _record_failures(report.errors, finished)
+
+    logger.info(
+        'Price refresh: urls=%s updated_products=%s failed_urls=%s',
+        report.urls, report.updated, report.failed,
+    )
+    return report
@@ -0,0 +1,127 @@
+"""Парсинг цен поставщиков: одиночный запрос и параллельный обход списка URL"""
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en;q=0.8'
+}
+
+UNIVERSAL_SELECTORS = [
+    '.price', '.product-price', '[itemprop="price"]',
+    '.current-price', '.js-product-price', '.price-value'
+]
+
+_local = threading.local()
+
+
+@dataclass
+class PriceResult:
+    url: str
+    price: Optional[Decimal] = None
+    error: str = ''
+
+    @property
+    def ok(self) -> bool:
+        return self.price is not None
+
+
+def _get_session() -> requests.Session:
+    """Keep-alive сессия на поток: requests.Session не потокобезопасна"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        _local.session = session
+    return session
+
+
+def extract_price_from_text(text: str) -> Optional[Decimal]:
+    """Извлекает цену из текста"""
+    text = text.strip().replace(' ', '').replace(',', '.').replace('₽', '')
+    patterns = [
+        r'(\d+[\.,]\d{2})',  # 123.45 или 123,45
+        r'(\d+)',  # 12345
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            price_str = match.group(1).replace(',', '.')
+            try:
+                return Decimal(price_str)
+            except Exception:
+                continue
+    return None
+
+
+def fetch_price(url: str, session: Optional[requests.Session] = None, timeout: int = 10) -> Decimal:
+    """Загружает страницу товара и возвращает цену. Бросает исключение, если цена не найдена."""
+    session = session or _get_session()
+    logger.debug(f"Попытка запроса к {url}")
+    response = session.get(url, headers=HEADERS, timeout=timeout, verify=False)
+    logger.debug(f"Статус: {response.status_code}")
+    response.raise_for_status()
+
+    soup = BeautifulSoup(response.content, 'html.parser')
+
+    # Автоопределение для MDM
+    if 'mdm-' in url or 'mdm.com' in url:
+        price_element = soup.select_one('.price-main')
+        if price_element:
+            price = extract_price_from_text(price_element.get_text())
+            if price is not None:
+                return price
+
+    # Универсальные селекторы
+    for selector in UNIVERSAL_SELECTORS:
+        price_element = soup.select_one(selector)
+        if price_element:
+            price = extract_price_from_text(price_element.get_text())
+            if price:
+                return price
+
+    raise ValueError("Цена не найдена на странице")
+
+
+def _fetch_result(url: str, timeout: int) -> PriceResult:
+    started = time.perf_counter()
+    try:
+        result = PriceResult(url=url, price=fetch_price(url, timeout=timeout))
+    except Exception as e:
+        result = PriceResult(url=url, error=str(e)[:500])
+    metrics.SCRAPER_FETCH_SECONDS.observe(time.perf_counter() - started)
+    metrics.SCRAPER_URLS.labels('ok' if result.ok else 'error').inc()
+    return result
+
+
+def scrape_prices(urls: Iterable[str], max_workers: int = 8, timeout: int = 10) -> Dict[str, PriceResult]:
+    """Параллельно парсит цены для списка URL.
+
+    Каждый URL запрашивается один раз; ошибки не прерывают обход, а возвращаются в PriceResult.error.
+    """
+    unique_urls = list(dict.fromkeys(u for u in urls if u))
+    results: Dict[str, PriceResult] = {}
+    if not unique_urls:
+        return results
+
+    workers = max(1, min(max_workers, len(unique_urls)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='price-scraper') as pool:
+        futures = [pool.submit(_fetch_result, url, timeout) for url in unique_urls]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result.url] = result
+    return results
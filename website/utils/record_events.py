@@ -0,0 +1,40 @@
+"""Журнал изменений статуса/стоимости цеха заказов (RecordStatusEvent)"""
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from ..models import RecordStatusEvent
+
+MAX_EVENTS_PAGE = 500
+
+
+def _as_text(value) -> str:
+    return '' if value is None else str(value)
+
+
+def log_record_changes(changes: Iterable[Tuple[int, str, object, object]], source: str, ts: Optional[datetime] = None) -> List[RecordStatusEvent]:
+    """Пишет одним bulk_create только реально изменившиеся значения.
+
+    changes: (record_id, field, old_value, new_value), field — 'status' или 'workshop_price'
+    """
+    ts = ts or timezone.now()
+    rows = [
+        RecordStatusEvent(record_id=record_id, field=field, old_value=_as_text(old), new_value=_as_text(new), source=source, ts=ts)
+        for record_id, field, old, new in changes
+        if _as_text(old) != _as_text(new)
+    ]
+    if rows:
+        RecordStatusEvent.objects.bulk_create(rows, batch_size=500)
+    return rows
+
+
+def events_after(qs: QuerySet, after_id: Optional[int] = None, since: Optional[datetime] = None, limit: int = 200) -> List[RecordStatusEvent]:
+    """Изменения после курсора (id события) или момента времени, по возрастанию id"""
+    if after_id is not None:
+        qs = qs.filter(id__gt=after_id)
+    elif since is not None:
+        qs = qs.filter(ts__gt=since)
+    limit = max(1, min(limit, MAX_EVENTS_PAGE))
+    return list(qs.order_by('id')[:limit])
@@ -1,10 +1,15 @@
+import hashlib
 import json
 import os
 import re
+import shutil
+import threading
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from decimal import Decimal, InvalidOperation
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Tuple, Dict, FrozenSet, Iterator, Sequence, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import requests
 from bs4 import BeautifulSoup
@@ -12,9 +17,17 @@ from bs4 import BeautifulSoup
 
 DEFAULT_LOGIN_URL = 'https://lk.ufaloft.ru/index.php?module=dashboard/'
 DEFAULT_DASHBOARD_URL = 'https://lk.ufaloft.ru/index.php?module=dashboard/'
-# Store cookies next to uploaded media (persisted volume in Docker).
-# If MEDIA_ROOT is not set, fall back to local ./media directory.
-COOKIES_PATH = os.path.join(os.environ.get('MEDIA_ROOT') or 'media', 'ufaloft_cookies.json')
+# Живые cookies сессии UFALOFT — рядом с БД (том /data в Docker), не в MEDIA_ROOT: медиа отдаются по HTTP.
+# UFALOFT_COOKIES_PATH — явный путь; без DB_PATH — текущий каталог.
+COOKIES_PATH = os.environ.get('UFALOFT_COOKIES_PATH') or os.path.join(
+    os.path.dirname(os.environ.get('DB_PATH') or ''), 'ufaloft_cookies.json',
+)
+# прежнее место (до переноса) — файл переносится при первом чтении
+_LEGACY_COOKIES_PATH = os.path.join(os.environ.get('MEDIA_ROOT') or 'media', 'ufaloft_cookies.json')
+# Пагинация листинга: параметр номера страницы, параллельность загрузки и предел страниц
+PAGE_PARAM = os.environ.get('UFALOFT_PAGE_PARAM', 'page')
+PAGE_WORKERS = int(os.environ.get('UFALOFT_PAGE_WORKERS', '4'))
+MAX_PAGES = int(os.environ.get('UFALOFT_MAX_PAGES', '50'))
 
 
 @dataclass
@@ -47,18 +60,25 @@ def _resolve_verify_param():
     return True
 
 
-def ensure_media_dir() -> None:
-    base = os.environ.get('MEDIA_ROOT') or 'media'
-    os.makedirs(base, exist_ok=True)
-
-
 def save_cookies(session: requests.Session, path: str = COOKIES_PATH) -> None:
-    ensure_media_dir()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
     with open(path, 'w', encoding='utf-8') as f:
         json.dump(session.cookies.get_dict(), f, ensure_ascii=False)
+    # только владельцу: в файле действующая сессия
+    os.chmod(path, 0o600)
 
 
 def load_cookies(session: requests.Session, path: str = COOKIES_PATH) -> bool:
+    if path == COOKIES_PATH and not os.path.exists(path) and os.path.exists(_LEGACY_COOKIES_PATH):
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            shutil.move(_LEGACY_COOKIES_PATH, path)
+            os.chmod(path, 0o600)
+        except OSError:
+            # каталог недоступен для записи — читаем по старому пути, после входа сохранится уже в path
+            path = _LEGACY_COOKIES_PATH
     if not os.path.exists(path):
         return False
     try:
@@ -147,41 +167,263 @@ def _find_key(keys, preferred_names):
     return None
 
 
-def parse_dashboard(session: requests.Session, dashboard_url: str = DEFAULT_DASHBOARD_URL) -> List[DashboardItem]:
+class UfaloftSessionExpired(RuntimeError):
+    """Вместо дашборда пришла страница входа — cookies устарели"""
+
+
+_LOGIN_PAGE_RE = re.compile(r'<input\b[^>]*type=["\']?password', re.I)
+
+
+def is_login_page(html: str, url: str = '') -> bool:
+    if 'module=users/login' in url:
+        return True
+    return 'listing-table-tr' not in html and bool(_LOGIN_PAGE_RE.search(html))
+
+
+def fetch_dashboard_html(session: requests.Session, dashboard_url: str = DEFAULT_DASHBOARD_URL) -> str:
     resp = session.get(dashboard_url, headers=HEADERS, timeout=30, verify=_resolve_verify_param())
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.content, 'html.parser')
+    if is_login_page(resp.text, getattr(resp, 'url', '') or ''):
+        raise UfaloftSessionExpired('Сессия UFALOFT истекла: требуется повторный вход')
+    return resp.text
 
-    rows = soup.select('tr.listing-table-tr') or []
-    rows += soup.select('tr.listing-table-tr.unread-item-row')
 
-    items: List[DashboardItem] = []
-    for tr in rows:
-        # Link and title
-        link_el = tr.select_one('.item_heading_td .item_heading_link') or tr.select_one('.item_heading_link')
-        if not link_el:
-            continue
-        title = link_el.get_text(strip=True)
-        href = link_el.get('href', '')
-        link_abs = _absolute(href, dashboard_url) if href else dashboard_url
+def _parse_row(tr, dashboard_url: str) -> Optional[DashboardItem]:
+    # Link and title
+    link_el = tr.select_one('.item_heading_td .item_heading_link') or tr.select_one('.item_heading_link')
+    if not link_el:
+        return None
+    title = link_el.get_text(strip=True)
+    href = link_el.get('href', '')
+    link_abs = _absolute(href, dashboard_url) if href else dashboard_url
 
-        my_index = _extract_my_index_from_title(title)
-        if not my_index:
-            continue
+    my_index = _extract_my_index_from_title(title)
+    if not my_index:
+        return None
+
+    # Status cell
+    status_td = tr.select_one('td.fieldtype_dropdown.field-1284-td') or tr.select_one('.fieldtype_dropdown.field-1284-td')
+    status_text = status_td.get_text(strip=True) if status_td else ''
 
-        # Status cell
-        status_td = tr.select_one('td.fieldtype_dropdown.field-1284-td') or tr.select_one('.fieldtype_dropdown.field-1284-td')
-        status_text = status_td.get_text(strip=True) if status_td else ''
+    # Workshop price cell (стоимость работы цеха)
+    workshop_price_td = tr.select_one('td.fieldtype_formula.field-1227-td') or tr.select_one('.fieldtype_formula.field-1227-td')
+    workshop_price = workshop_price_td.get_text(strip=True) if workshop_price_td else ''
 
-        # Workshop price cell (стоимость работы цеха)
-        workshop_price_td = tr.select_one('td.fieldtype_formula.field-1227-td') or tr.select_one('.fieldtype_formula.field-1227-td')
-        workshop_price = workshop_price_td.get_text(strip=True) if workshop_price_td else ''
+    return DashboardItem(my_index=my_index, raw_title=title, status_text=status_text, link=link_abs, workshop_price=workshop_price)
 
-        items.append(DashboardItem(my_index=my_index, raw_title=title, status_text=status_text, link=link_abs, workshop_price=workshop_price))
 
+def parse_dashboard_html(html: str, dashboard_url: str = DEFAULT_DASHBOARD_URL) -> List[DashboardItem]:
+    """Строки листинга одной страницы (unread-item-row — подмножество listing-table-tr, отдельно не выбираем)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    items: List[DashboardItem] = []
+    for tr in soup.select('tr.listing-table-tr'):
+        item = _parse_row(tr, dashboard_url)
+        if item:
+            items.append(item)
     return items
 
 
+# Блок пагинации листинга: <ul class="pagination">…</ul> (или div)
+_PAGINATION_RE = re.compile(r'<(ul|div)\b[^>]*class="[^"]*\bpagination\b[^"]*"[^>]*>.*?</\1>', re.S | re.I)
+
+
+def _with_page_param(url: str, page: int) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != PAGE_PARAM]
+    query.append((PAGE_PARAM, str(page)))
+    return urlunsplit(parts._replace(query=urlencode(query, safe='/')))
+
+
+def discover_page_urls(html: str, dashboard_url: str = DEFAULT_DASHBOARD_URL, max_pages: Optional[int] = None) -> List[str]:
+    """URL страниц 2..N листинга по блоку пагинации первой страницы.
+
+    Ссылки с настоящим href берутся как есть; для javascript:/# (AJAX-пагинация) адрес
+    строится из dashboard_url и параметра UFALOFT_PAGE_PARAM.
+    """
+    max_pages = max_pages or MAX_PAGES
+    pages: Dict[int, str] = {}
+    last = 1
+    for block in _PAGINATION_RE.finditer(html):
+        soup = BeautifulSoup(block.group(0), 'html.parser')
+        # номера из текста (включая текущую страницу и «…»-разрывы) задают последнюю страницу
+        numbers = [int(t) for t in soup.stripped_strings if t.isdigit()]
+        # последняя страница выше предела — грузим до предела, а не только видимые ссылки
+        last = max(last, min(max(numbers, default=1), max_pages))
+        for a in soup.find_all('a'):
+            text = a.get_text(strip=True)
+            href = (a.get('href') or '').strip()
+            if text.isdigit() and 2 <= int(text) <= max_pages and href and not href.startswith(('#', 'javascript')):
+                pages.setdefault(int(text), _absolute(href, dashboard_url))
+    for page in range(2, last + 1):
+        pages.setdefault(page, _with_page_param(dashboard_url, page))
+    return [pages[p] for p in sorted(pages)]
+
+
+def _clone_session(session: requests.Session) -> requests.Session:
+    """Отдельная сессия для потока загрузки: requests.Session не потокобезопасна"""
+    clone = requests.Session()
+    clone.headers.update(session.headers)
+    clone.cookies.update(session.cookies)
+    clone.auth = session.auth
+    clone.proxies.update(session.proxies)
+    clone.verify = session.verify
+    return clone
+
+
+def fetch_dashboard_pages(
+    session: requests.Session,
+    dashboard_url: str = DEFAULT_DASHBOARD_URL,
+    max_workers: int = PAGE_WORKERS,
+) -> Iterator[Tuple[int, str, str]]:
+    """(номер страницы, url, html) по мере загрузки.
+
+    Первая страница грузится сразу (по ней определяется пагинация), остальные —
+    параллельно, у каждого потока своя keep-alive сессия с cookies исходной;
+    порядок выдачи — по завершению загрузки.
+    """
+    first = fetch_dashboard_html(session, dashboard_url)
+    yield 1, dashboard_url, first
+
+    urls = discover_page_urls(first, dashboard_url)
+    if not urls:
+        return
+    local = threading.local()
+    clones: List[requests.Session] = []
+    clones_lock = threading.Lock()
+
+    def fetch(url: str) -> str:
+        thread_session = getattr(local, 'session', None)
+        if thread_session is None:
+            thread_session = local.session = _clone_session(session)
+            with clones_lock:
+                clones.append(thread_session)
+        return fetch_dashboard_html(thread_session, url)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))), thread_name_prefix='ufaloft-page') as pool:
+            futures = {pool.submit(fetch, url): (page, url) for page, url in enumerate(urls, start=2)}
+            for future in as_completed(futures):
+                page, url = futures[future]
+                yield page, url, future.result()
+    finally:
+        for clone in clones:
+            clone.close()
+
+
+def iter_dashboard_pages(
+    session: requests.Session,
+    dashboard_url: str = DEFAULT_DASHBOARD_URL,
+    max_workers: int = PAGE_WORKERS,
+) -> Iterator[List[DashboardItem]]:
+    """Строки дашборда постранично по мере загрузки; повторы my_index между страницами отбрасываются."""
+    seen = set()
+    for _page, url, html in fetch_dashboard_pages(session, dashboard_url, max_workers=max_workers):
+        batch: List[DashboardItem] = []
+        for item in parse_dashboard_html(html, url):
+            if item.my_index in seen:
+                continue
+            seen.add(item.my_index)
+            batch.append(item)
+        yield batch
+
+
+def iter_dashboard_items(
+    session: requests.Session,
+    dashboard_url: str = DEFAULT_DASHBOARD_URL,
+    max_workers: int = PAGE_WORKERS,
+) -> Iterator[DashboardItem]:
+    for batch in iter_dashboard_pages(session, dashboard_url, max_workers=max_workers):
+        yield from batch
+
+
+def parse_dashboard(session: requests.Session, dashboard_url: str = DEFAULT_DASHBOARD_URL, max_workers: int = PAGE_WORKERS) -> List[DashboardItem]:
+    return list(iter_dashboard_items(session, dashboard_url, max_workers=max_workers))
+
+
+# Строка листинга целиком (классы listing-table-tr / unread-item-row); вложенных <tr> в строках нет
+_LISTING_ROW_RE = re.compile(r'<tr\b[^>]*\blisting-table-tr\b[^>]*>.*?</tr>', re.S | re.I)
+
+
+def _listing_table_html(html: str) -> str:
+    """Вырезает HTML таблицы листинга строковыми операциями (без BeautifulSoup)"""
+    first = html.find('listing-table-tr')
+    if first == -1:
+        return ''
+    start = html.rfind('<table', 0, first)
+    end = html.find('</table>', html.rfind('listing-table-tr'))
+    if start == -1:
+        start = html.rfind('<tr', 0, first)
+    if end == -1:
+        end = len(html)
+    return html[start:end + len('</table>')]
+
+
+def _fragment_hash(fragment: str) -> str:
+    return hashlib.sha1(fragment.encode('utf-8', errors='replace')).hexdigest()
+
+
+@dataclass
+class DashboardDiff:
+    table_changed: bool
+    rows_total: int
+    rows_changed: int
+    items: List[DashboardItem]  # только строки, чей HTML изменился с прошлого цикла
+    table_hash: str = ''
+    row_hashes: FrozenSet[str] = frozenset()
+
+
+class DashboardChangeDetector:
+    """Пропускает неизменившийся дашборд и отдаёт на синхронизацию только изменившиеся строки.
+
+    Хэш таблицы листинга сравнивается до разбора HTML; при изменении разбираются
+    только строки с новым хэшем фрагмента. Состояние фиксируется через commit() после
+    успешной синхронизации, чтобы ошибка записи не «съела» изменения.
+    """
+
+    def __init__(self):
+        self.table_hash: Optional[str] = None
+        self.row_hashes: FrozenSet[str] = frozenset()
+
+    def reset(self) -> None:
+        self.table_hash = None
+        self.row_hashes = frozenset()
+
+    def diff(self, html: Union[str, Sequence[str]], dashboard_url: str = DEFAULT_DASHBOARD_URL) -> DashboardDiff:
+        """html — одна страница или HTML всех страниц листинга в порядке номеров"""
+        pages = [html] if isinstance(html, str) else list(html)
+        table = ''.join(_listing_table_html(page) for page in pages)
+        table_hash = _fragment_hash(table)
+        if table and table_hash == self.table_hash:
+            return DashboardDiff(False, len(self.row_hashes), 0, [], table_hash, self.row_hashes)
+
+        fragments = _LISTING_ROW_RE.findall(table)
+        hashes = set()
+        seen_indexes = set()
+        items: List[DashboardItem] = []
+        changed = 0
+        for fragment in fragments:
+            row_hash = _fragment_hash(fragment)
+            if row_hash in hashes:
+                continue
+            hashes.add(row_hash)
+            if row_hash in self.row_hashes:
+                continue
+            changed += 1
+            tr = BeautifulSoup(fragment, 'html.parser').find('tr')
+            item = _parse_row(tr, dashboard_url) if tr else None
+            if item and item.my_index not in seen_indexes:
+                seen_indexes.add(item.my_index)
+                items.append(item)
+        return DashboardDiff(True, len(hashes), changed, items, table_hash, frozenset(hashes))
+
+    def commit(self, diff: DashboardDiff) -> None:
+        if not diff.rows_total:
+            # пустая страница (например, протухли cookies) — не запоминаем
+            return
+        self.table_hash = diff.table_hash
+        self.row_hashes = diff.row_hashes
+
+
 def _extract_my_index_from_title(title: str) -> Optional[str]:
     # Examples: "3167ЮВ-393 Гульназ Старобалтачево" -> 393
     # Handle hyphen, en dash, em dash: -, – (\u2013), — (\u2014)
@@ -217,19 +459,6 @@ def map_external_status_to_local(external_text: str) -> Optional[str]:
     return None
 
 
-def sync_by_index(update_func, items: List[DashboardItem]) -> int:
-    """update_func: callable like (my_index: str, mapped_status: Optional[str], raw_status: str, workshop_price: str) -> bool
-    Returns number of updated records
-    """
-    updated = 0
-    for item in items:
-        mapped = map_external_status_to_local(item.status_text)
-        ok = update_func(item.my_index, mapped, item.status_text, item.workshop_price)
-        if ok:
-            updated += 1
-    return updated
-
-
 def parse_workshop_price(text: str) -> Optional[Decimal]:
     """Parse workshop price text into Decimal with 2 decimal places.
     Returns None if price cannot be parsed.
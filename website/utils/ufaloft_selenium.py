@@ -1,46 +1,82 @@
-from typing import List
+import os
+import time
+from typing import List, Optional
 
+import requests
+from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
-from .ufaloft import DashboardItem, _extract_my_index_from_title
+from .ufaloft import DEFAULT_DASHBOARD_URL, DashboardItem, parse_dashboard_html, save_cookies
 
 
-def parse_dashboard_with_driver(driver) -> List[DashboardItem]:
-    rows = []
-    rows += driver.find_elements(By.CSS_SELECTOR, 'tr.listing-table-tr')
-    rows += driver.find_elements(By.CSS_SELECTOR, 'tr.listing-table-tr.unread-item-row')
+def create_driver(headless: bool = False):
+    """Chrome: Remote Selenium при заданном SELENIUM_REMOTE_URL (ждём готовности до 30 с), иначе локальный"""
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument('--disable-notifications')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    if headless:
+        chrome_options.add_argument('--headless')
 
-    items: List[DashboardItem] = []
-    for tr in rows:
+    remote_url = os.environ.get("SELENIUM_REMOTE_URL", "").strip()
+    if not remote_url:
+        # Используем встроенный Selenium Manager (автоматически найдет правильный ChromeDriver)
+        return webdriver.Chrome(options=chrome_options)
+    last_err = None
+    for attempt in range(1, 31):
         try:
-            link_el = tr.find_element(By.CSS_SELECTOR, '.item_heading_td .item_heading_link, .item_heading_link')
-        except Exception:
-            continue
-        title = link_el.text.strip()
-        href = link_el.get_attribute('href') or ''
+            return webdriver.Remote(command_executor=remote_url, options=chrome_options)
+        except Exception as e:
+            last_err = e
+            time.sleep(1)
+    raise last_err
 
-        my_index = _extract_my_index_from_title(title)
-        if not my_index:
-            continue
 
-        # статус
-        status_text = ''
-        try:
-            status_td = tr.find_element(By.CSS_SELECTOR, 'td.fieldtype_dropdown.field-1284-td, .fieldtype_dropdown.field-1284-td')
-            status_text = (status_td.text or '').strip()
-        except Exception:
-            pass
+def wait_for_dashboard(driver, timeout: int) -> bool:
+    """Ждёт строк листинга (т.е. завершённого входа и 2FA)"""
+    try:
+        WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'tr.listing-table-tr'))
+        )
+        return True
+    except Exception:
+        return False
+
 
-        # стоимость работы цеха
-        workshop_price = ''
+def export_cookies(driver, session: Optional[requests.Session] = None) -> requests.Session:
+    """Куки selenium -> requests-сессия -> файл COOKIES_PATH"""
+    session = session or requests.Session()
+    for c in driver.get_cookies():
+        # c: {name, value, domain, path, expiry, secure, httpOnly}
+        session.cookies.set(c['name'], c['value'], domain=c.get('domain'), path=c.get('path', '/'))
+    save_cookies(session)
+    return session
+
+
+def login_and_export_cookies(dashboard_url: str = DEFAULT_DASHBOARD_URL, wait_sec: int = 600, headless: bool = False) -> Optional[requests.Session]:
+    """Открывает браузер только на время входа/2FA, сохраняет cookies и закрывает Chrome.
+
+    Возвращает requests-сессию с cookies или None, если вход не завершён за wait_sec.
+    """
+    driver = create_driver(headless=headless)
+    try:
+        driver.get(dashboard_url)
+        if not wait_for_dashboard(driver, wait_sec):
+            return None
+        return export_cookies(driver)
+    finally:
         try:
-            workshop_price_td = tr.find_element(By.CSS_SELECTOR, 'td.fieldtype_formula.field-1227-td, .fieldtype_formula.field-1227-td')
-            workshop_price = (workshop_price_td.text or '').strip()
+            driver.quit()
         except Exception:
             pass
 
-        items.append(DashboardItem(my_index=my_index, raw_title=title, status_text=status_text, link=href, workshop_price=workshop_price))
-
-    return items
-
 
+def parse_dashboard_with_driver(driver) -> List[DashboardItem]:
+    """Один WebDriver-вызов: HTML страницы и её адрес, дальше тот же разбор, что и для requests"""
+    html, page_url = driver.execute_script('return [document.documentElement.outerHTML, window.location.href];')
+    return parse_dashboard_html(html, page_url or DEFAULT_DASHBOARD_URL)
@@ -0,0 +1,261 @@
+"""Общая синхронизация статусов/стоимости цеха из UFALOFT в Record.
+
+Сопоставление по уникальному Record.external_index (один запрос), расчёт изменений в памяти
+и один bulk_update в транзакции — на весь список строк или на каждую загруженную страницу.
+Watcher'ы опрашивают дашборд через poll_dashboard (только изменившиеся строки).
+Каждое изменение попадает в журнал RecordStatusEvent.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import requests
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import Record
+from . import metrics
+from .record_events import log_record_changes
+from .ufaloft import (
+    DEFAULT_DASHBOARD_URL,
+    PAGE_WORKERS,
+    DashboardChangeDetector,
+    DashboardDiff,
+    DashboardItem,
+    fetch_dashboard_pages,
+    map_external_status_to_local,
+    parse_workshop_price,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FIELDS = ('first_name', 'last_name')
+
+
+@dataclass
+class RecordChange:
+    record_id: int
+    my_index: str
+    old_status: str
+    new_status: str
+    old_workshop_price: Optional[Decimal]
+    new_workshop_price: Optional[Decimal]
+    raw_status: str = ''
+
+    @property
+    def status_changed(self) -> bool:
+        return self.old_status != self.new_status
+
+    @property
+    def price_changed(self) -> bool:
+        return self.old_workshop_price != self.new_workshop_price
+
+
+@dataclass
+class SyncResult:
+    scanned: int = 0
+    matched: int = 0
+    linked: int = 0
+    dry_run: bool = False
+    changes: List[RecordChange] = field(default_factory=list)
+    missed: List[DashboardItem] = field(default_factory=list)
+    unparsed_prices: List[DashboardItem] = field(default_factory=list)
+
+    @property
+    def updated(self) -> int:
+        return 0 if self.dry_run else len(self.changes)
+
+    def merge(self, other: 'SyncResult') -> None:
+        self.scanned += other.scanned
+        self.matched += other.matched
+        self.linked += other.linked
+        self.changes.extend(other.changes)
+        self.missed.extend(other.missed)
+        self.unparsed_prices.extend(other.unparsed_prices)
+
+    def describe(self, verbose: bool = False) -> Iterator[str]:
+        """Строки для вывода в management-командах"""
+        if verbose:
+            for item in self.missed:
+                yield f'[MISS] index={item.my_index} raw="{item.status_text}" workshop_price="{item.workshop_price}"'
+            for item in self.unparsed_prices:
+                yield f'[WARNING] Не удалось распарсить цену цеха: {item.workshop_price}'
+        for change in self.changes:
+            if self.dry_run:
+                yield (f'#{change.record_id} ({change.my_index}): {change.old_status} -> {change.new_status or change.raw_status}, '
+                       f'workshop_price: {change.new_workshop_price}')
+            elif verbose:
+                yield f'[UPDATED] #{change.record_id} ({change.my_index}) -> {change.new_status}, workshop_price: {change.new_workshop_price}'
+
+
+def _load_candidates(indexes: List[str], index_field: str) -> Dict[str, Record]:
+    """{index: record}. Основной путь — один запрос по уникальному индексу external_index.
+
+    Для индексов, не найденных по external_index, один запрос-fallback по first_name/last_name
+    среди ещё не привязанных записей (при дублях берётся запись с меньшим id, как .first()).
+    """
+    fields = ('id', 'first_name', 'last_name', 'external_index', 'status', 'workshop_price')
+    if not indexes:
+        return {}
+    found: Dict[str, Record] = {
+        r.external_index: r for r in Record.objects.filter(external_index__in=indexes).only(*fields)
+    }
+    missing = [i for i in indexes if i not in found]
+    if not missing:
+        return found
+
+    alt_field = 'last_name' if index_field == 'first_name' else 'first_name'
+    by_field: Dict[str, Dict[str, Record]] = {f: {} for f in INDEX_FIELDS}
+    qs = (
+        Record.objects.filter(external_index__isnull=True)
+        .filter(Q(first_name__in=missing) | Q(last_name__in=missing))
+        .only(*fields)
+        .order_by('id')
+    )
+    for record in qs:
+        for f in INDEX_FIELDS:
+            by_field[f].setdefault(getattr(record, f), record)
+    for idx in missing:
+        record = by_field[index_field].get(idx) or by_field[alt_field].get(idx)
+        if record is not None:
+            found[idx] = record
+    return found
+
+
+def _event_rows(changes: List[RecordChange]):
+    for change in changes:
+        if change.status_changed:
+            yield change.record_id, 'status', change.old_status, change.new_status
+        if change.price_changed:
+            yield change.record_id, 'workshop_price', change.old_workshop_price, change.new_workshop_price
+
+
+def _notify_status_changes(changes: List[RecordChange]) -> None:
+    record_ids = [c.record_id for c in changes if c.status_changed]
+    if not record_ids:
+        return
+    try:
+        from ..telegram_bot.notifications import notify_record_status_changes
+        notify_record_status_changes(record_ids)
+    except Exception:
+        # уведомления не должны откатывать/ронять синхронизацию
+        logger.exception('Не удалось отправить уведомления об изменении статусов UFALOFT')
+
+
+def sync_dashboard_items(items: Iterable[DashboardItem], index_field: str = 'first_name', dry_run: bool = False, notify: bool = True) -> SyncResult:
+    """Сопоставляет строки дашборда с Record по индексу и применяет изменения одним bulk_update.
+
+    Изменения пишутся в RecordStatusEvent (source='ufaloft') в той же транзакции;
+    при notify работники получают уведомления об изменении статуса.
+    """
+    if index_field not in INDEX_FIELDS:
+        raise ValueError(f'index_field должен быть одним из {INDEX_FIELDS}')
+
+    started = time.perf_counter()
+    items = list(items)
+    result = SyncResult(scanned=len(items), dry_run=dry_run)
+    candidates = _load_candidates(sorted({str(i.my_index).strip() for i in items}), index_field)
+
+    changed_records: Dict[int, Record] = {}
+    linked_records: Dict[int, Record] = {}
+    changes: Dict[int, RecordChange] = {}
+    for item in items:
+        idx = str(item.my_index).strip()
+        record = candidates.get(idx)
+        if record is None:
+            result.missed.append(item)
+            continue
+        result.matched += 1
+
+        new_status = map_external_status_to_local(item.status_text) or record.status
+        new_price = record.workshop_price
+        if item.workshop_price:
+            parsed = parse_workshop_price(item.workshop_price)
+            if parsed is None:
+                result.unparsed_prices.append(item)
+            else:
+                new_price = parsed
+
+        # Записи, найденные по имени, привязываем к индексу — дальше поиск идёт только по external_index
+        if record.external_index is None:
+            record.external_index = idx
+            linked_records[record.id] = record
+
+        if new_status == record.status and new_price == record.workshop_price:
+            continue
+
+        change = changes.get(record.id)
+        if change is None:
+            change = RecordChange(
+                record_id=record.id,
+                my_index=idx,
+                old_status=record.status,
+                new_status=new_status,
+                old_workshop_price=record.workshop_price,
+                new_workshop_price=new_price,
+                raw_status=item.status_text,
+            )
+            changes[record.id] = change
+        else:
+            change.new_status = new_status
+            change.new_workshop_price = new_price
+            change.raw_status = item.status_text
+        record.status = new_status
+        record.workshop_price = new_price
+        changed_records[record.id] = record
+
+    result.changes = list(changes.values())
+    result.linked = len(linked_records)
+    to_save = {**linked_records, **changed_records}
+    if to_save and not dry_run:
+        now = timezone.now()
+        for record in to_save.values():
+            record.updated_at = now
+        with transaction.atomic():
+            Record.objects.bulk_update(list(to_save.values()), ['status', 'workshop_price', 'external_index', 'updated_at'])
+            log_record_changes(_event_rows(result.changes), 'ufaloft')
+        if notify:
+            _notify_status_changes(result.changes)
+    if not dry_run:
+        metrics.UFALOFT_SYNC_SECONDS.observe(time.perf_counter() - started)
+        metrics.UFALOFT_SYNC_RECORDS.labels('matched').inc(result.matched)
+        metrics.UFALOFT_SYNC_RECORDS.labels('changed').inc(len(result.changes))
+        metrics.UFALOFT_SYNC_RECORDS.labels('linked').inc(result.linked)
+        metrics.UFALOFT_SYNC_RECORDS.labels('missed').inc(len(result.missed))
+    return result
+
+
+def sync_dashboard_pages(pages: Iterable[Iterable[DashboardItem]], index_field: str = 'first_name', dry_run: bool = False, notify: bool = True) -> SyncResult:
+    """Синхронизация по мере загрузки страниц дашборда: каждая страница — свой запрос и bulk_update.
+
+    Повторы my_index между страницами должен отбрасывать источник (iter_dashboard_pages).
+    """
+    result = SyncResult(dry_run=dry_run)
+    for items in pages:
+        items = list(items)
+        if items:
+            result.merge(sync_dashboard_items(items, index_field=index_field, dry_run=dry_run, notify=notify))
+    return result
+
+
+def poll_dashboard(
+    session: requests.Session,
+    detector: DashboardChangeDetector,
+    dashboard_url: str = DEFAULT_DASHBOARD_URL,
+    index_field: str = 'first_name',
+    max_workers: int = PAGE_WORKERS,
+) -> Tuple[DashboardDiff, Optional[SyncResult]]:
+    """Один цикл watcher'а: грузит все страницы листинга, синхронизирует только изменившиеся строки.
+
+    Неизменившийся дашборд не разбирается (result=None). Состояние детектора фиксируется после
+    успешной синхронизации; UfaloftSessionExpired пробрасывается — повторный вход решает вызывающий.
+    """
+    pages = sorted(fetch_dashboard_pages(session, dashboard_url=dashboard_url, max_workers=max_workers))
+    diff = detector.diff([html for _page, _url, html in pages], dashboard_url=dashboard_url)
+    result = sync_dashboard_items(diff.items, index_field=index_field) if diff.items else None
+    detector.commit(diff)
+    return diff, result
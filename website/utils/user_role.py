@@ -0,0 +1,79 @@
+"""
+Роль пользователя на время запроса: профиль, работник (Designer), его профессия и способ расчёта
+
+Всё загружается одним запросом с select_related при первом обращении и запоминается на запросе
+(request.role — ставит dcrm.middleware.UserRoleMiddleware; get_user_role() работает и без неё).
+Найденный профиль кладётся в кэш связи user.profile, поэтому request.user.profile в коде и
+user.profile в шаблонах (navbar) повторных запросов не делают.
+
+    role = get_user_role(request)
+    if role.is_worker and role.works_on(record): ...
+"""
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+
+
+class UserRole:
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def profile(self):
+        """Profile пользователя (с designer, profession, method) или None"""
+        if not self.user.is_authenticated:
+            return None
+        from website.models import Profile
+
+        profile = (
+            Profile.objects.select_related('designer__profession', 'designer__method')
+            .filter(user=self.user)
+            .first()
+        )
+        # None в кэше — user.profile бросит DoesNotExist без запроса, как и без профиля в БД
+        User.profile.related.set_cached_value(self.user, profile)
+        if profile is not None:
+            Profile.user.field.set_cached_value(profile, self.user)
+        return profile
+
+    @property
+    def is_admin(self):
+        return self.user.is_authenticated and (self.user.is_staff or self.user.is_superuser)
+
+    @property
+    def designer(self):
+        """Designer, привязанный к профилю (пользователь — работник), или None"""
+        return self.profile.designer if self.profile is not None else None
+
+    @property
+    def is_worker(self):
+        return self.profile is not None and self.profile.is_worker
+
+    @property
+    def is_customer(self):
+        return self.profile is not None and self.profile.is_customer
+
+    @property
+    def profession_name(self):
+        designer = self.designer
+        return designer.profession.name if designer and designer.profession else None
+
+    @property
+    def method_name(self):
+        """Способ расчёта работника в нижнем регистре ('' — не задан)"""
+        designer = self.designer
+        return designer.method.name.lower() if designer and designer.method else ''
+
+    def works_on(self, record):
+        """Работник назначен на заказ (сравнение по id — без загрузки работников заказа)"""
+        designer = self.designer
+        return designer is not None and designer.id in (
+            record.designer_id, record.designer_worker_id, record.assembler_worker_id,
+        )
+
+
+def get_user_role(request) -> UserRole:
+    """UserRole текущего запроса (создаётся один раз и хранится в request.role)"""
+    role = getattr(request, 'role', None)
+    if role is None:
+        role = request.role = UserRole(request.user)
+    return role
@@ -0,0 +1,175 @@
+"""Реестр UFALOFT watcher'ов в БД: heartbeat из фонового потока.
+
+Одновременно работает один watcher на все режимы: hybrid, browser и requests опрашивают один
+и тот же дашборд и пишут в те же заказы, параллельно — двойная нагрузка и гонки обновлений.
+Веб только ставит запрос (state='requested'), запускает watcher сервис run_scheduler.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from django.core.management import call_command
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import UfaloftWatcher
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_EVERY_SEC = 30
+
+# режим -> (management-команда, доп. аргументы)
+WATCH_COMMANDS = {
+    'hybrid': ('ufaloft_watch', ['--mode', 'hybrid']),
+    'browser': ('ufaloft_watch', ['--mode', 'browser']),
+    'requests': ('ufaloft_requests_watch', []),
+}
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=UfaloftWatcher.HEARTBEAT_STALE_SEC)
+
+
+class WatcherRegistration:
+    """Регистрация работающего watcher'а: claim() -> record_run() на каждый цикл -> stop()"""
+
+    def __init__(self, mode: str, interval_min: int = 60, index_field: str = 'first_name'):
+        self.mode = mode
+        self.interval_min = interval_min
+        self.index_field = index_field
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _mine(self):
+        return UfaloftWatcher.objects.filter(mode=self.mode, owner=self.owner)
+
+    def claim(self) -> bool:
+        """Занимает слот, если нет живого watcher'а другого процесса ни в одном режиме"""
+        for mode in WATCH_COMMANDS:
+            UfaloftWatcher.objects.get_or_create(mode=mode)
+        with transaction.atomic():
+            # блокируем строки всех режимов (PostgreSQL; SQLite — BEGIN IMMEDIATE), чтобы два
+            # режима не заняли слоты одновременно
+            watchers = list(UfaloftWatcher.objects.select_for_update().order_by('pk'))
+            active = [w for w in watchers if w.is_alive and w.owner != self.owner]
+            if active:
+                logger.warning('UFALOFT watcher already running: %s (%s)', active[0].mode, active[0].owner)
+                return False
+            now = timezone.now()
+            claimed = UfaloftWatcher.objects.filter(mode=self.mode).update(
+                state='running', owner=self.owner, started_at=now, heartbeat_at=now,
+                interval_min=self.interval_min, index_field=self.index_field, last_error='',
+            )
+        if claimed:
+            self._thread = threading.Thread(target=self._heartbeat_loop, name=f'UfaloftHeartbeat-{self.mode}', daemon=True)
+            self._thread.start()
+        return bool(claimed)
+
+    def _heartbeat_loop(self) -> None:
+        # heartbeat идёт и во время долгого сна/ожидания входа в браузере
+        try:
+            while not self._stop.wait(HEARTBEAT_EVERY_SEC):
+                close_old_connections()
+                self._mine().update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    def record_run(self, started: float, scanned: int = 0, updated: int = 0, error: str = '') -> None:
+        """started — time.monotonic() начала цикла"""
+        now = timezone.now()
+        self._mine().update(
+            heartbeat_at=now,
+            last_run_at=now,
+            last_duration=round(time.monotonic() - started, 3),
+            last_scanned=scanned,
+            last_updated=updated,
+            total_updated=F('total_updated') + updated,
+            runs=F('runs') + 1,
+            last_error=error[:500],
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._mine().update(state='stopped')
+
+
+def watcher_status(watcher: UfaloftWatcher) -> dict:
+    return {
+        'mode': watcher.mode,
+        'state': watcher.state,
+        'alive': watcher.is_alive,
+        'owner': watcher.owner,
+        'interval_min': watcher.interval_min,
+        'index_field': watcher.index_field,
+        'requested_at': watcher.requested_at.isoformat() if watcher.requested_at else None,
+        'started_at': watcher.started_at.isoformat() if watcher.started_at else None,
+        'heartbeat_at': watcher.heartbeat_at.isoformat() if watcher.heartbeat_at else None,
+        'last_run_at': watcher.last_run_at.isoformat() if watcher.last_run_at else None,
+        'last_duration': watcher.last_duration,
+        'last_scanned': watcher.last_scanned,
+        'last_updated': watcher.last_updated,
+        'total_updated': watcher.total_updated,
+        'runs': watcher.runs,
+        'last_error': watcher.last_error,
+    }
+
+
+def request_start(mode: str, interval_min: int = 60, index_field: str = 'first_name') -> Tuple[UfaloftWatcher, bool]:
+    """Ставит запрос на запуск. (watcher, False) — watcher (любого режима) уже работает или
+    запрошен, новый не нужен; возвращается именно он"""
+    if mode not in WATCH_COMMANDS:
+        raise ValueError(f'Неизвестный режим: {mode}')
+    watcher, _ = UfaloftWatcher.objects.get_or_create(mode=mode)
+    busy = [w for w in UfaloftWatcher.objects.filter(Q(state='running') | Q(state='requested')) if w.is_alive or w.state == 'requested']
+    if busy:
+        return next((w for w in busy if w.mode == mode), busy[0]), False
+    watcher.state = 'requested'
+    watcher.requested_at = timezone.now()
+    watcher.interval_min = interval_min
+    watcher.index_field = index_field
+    watcher.save(update_fields=['state', 'requested_at', 'interval_min', 'index_field'])
+    return watcher, True
+
+
+def spawn_watcher(mode: str, interval_min: int, index_field: str, verbose: bool = True, headless: bool = False) -> threading.Thread:
+    """Поток с management-командой watcher'а (только внутри run_scheduler)"""
+    command, extra = WATCH_COMMANDS[mode]
+    args = list(extra) + ['--interval-min', str(interval_min), '--index-field', index_field]
+    if verbose:
+        args.append('--verbose')
+    if headless and command == 'ufaloft_watch':
+        args.append('--headless')
+
+    def run():
+        try:
+            logger.info('Starting UFALOFT watcher: %s %s', command, args)
+            call_command(command, *args)
+        except Exception as e:
+            logger.exception('UFALOFT watcher stopped: %s', e)
+        finally:
+            connection.close()
+
+    t = threading.Thread(target=run, name=f'UfaloftWatcher-{mode}', daemon=True)
+    t.start()
+    return t
+
+
+def start_requested_watchers() -> List[str]:
+    """Запускает запрошенные из UI watcher'ы; запрос снимается атомарно, чтобы не стартовать дважды"""
+    started = []
+    for watcher in UfaloftWatcher.objects.filter(state='requested'):
+        if not UfaloftWatcher.objects.filter(pk=watcher.pk, state='requested').update(state='stopped'):
+            continue
+        spawn_watcher(
+            watcher.mode, watcher.interval_min, watcher.index_field,
+            headless=os.environ.get('UFALOFT_HEADLESS', '0') == '1',
+        )
+        started.append(watcher.mode)
+    return started
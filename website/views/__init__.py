@@ -4,12 +4,13 @@
 from .auth import home, logout_user, register_user
 from .records import (
     customer_record, delete_record, add_record, update_record,
-    record_detail, update_record_status, set_margin_flags
+    record_detail, update_record_status, set_margin_flags, record_changes
 )
 from .products import (
     add_products_to_record, export_products, clear_products,
     product_detail, products_list, get_mounting_types_by_category,
-    get_excel_data, save_excel_data, download_excel_file
+    get_excel_data, save_excel_data, download_excel_file,
+    product_price_history, price_history_summary
 )
 from .files import add_file, delete_file, process_csv, process_csv_by_pk
 from .expenses import (
@@ -23,21 +24,23 @@ from .calculations import (
 )
 from .analytics import analytics_dashboard
 from .profiles import my_profile, profiles_list, staff_profile
-from .utils import start_ufaloft_watch, ufaloft_ui
+from .utils import start_ufaloft_watch, ufaloft_status, ufaloft_ui
 from .payments import payments_page, mark_payment_paid, mark_payment_unpaid
 from .create_product import create_product
 from .create_product import create_category
+from .metrics import metrics
 
 __all__ = [
     # Auth
     'home', 'logout_user', 'register_user',
     # Records
     'customer_record', 'delete_record', 'add_record', 'update_record',
-    'record_detail', 'update_record_status', 'set_margin_flags',
+    'record_detail', 'update_record_status', 'set_margin_flags', 'record_changes',
     # Products
     'add_products_to_record', 'export_products', 'clear_products',
     'product_detail', 'products_list', 'get_mounting_types_by_category',
     'get_excel_data', 'save_excel_data', 'download_excel_file',
+    'product_price_history', 'price_history_summary',
     # Files
     'add_file', 'delete_file', 'process_csv', 'process_csv_by_pk',
     # Expenses
@@ -52,10 +55,12 @@ __all__ = [
     # Profiles
     'my_profile', 'profiles_list', 'staff_profile',
     # Utils
-    'start_ufaloft_watch', 'ufaloft_ui',
+    'start_ufaloft_watch', 'ufaloft_status', 'ufaloft_ui',
     # Payments
     'payments_page', 'mark_payment_paid', 'mark_payment_unpaid',
     # Create Product
     'create_product', 'create_category',
+    # Metrics
+    'metrics',
 ]
 
@@ -2,13 +2,64 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 from datetime import datetime
 import json
 import calendar
 from ..models import Record, Designer
+from ..utils import metrics
+from ..utils.cache_ns import ns_version
 from .calculations import calculate_record_margin, calculate_record_total_components, calculate_record_total_expenses
 
 
+# Кэшируется агрегат месяца, а не моржа каждого заказа: при изменении каталога/работников иначе
+# переписывались бы записи всех заказов года, а файловый кэш перебирает каталог на каждый set.
+# Цена компромисса: изменение любого заказа пересчитывает весь его месяц (заказы месяца и так
+# загружены для графиков), зато записей кэша не больше 12 на год при любом бэкенде.
+# Ключ включает версии каталога/работников, число заказов месяца и их последний updated_at —
+# устаревшие значения не читаются, поэтому TTL большой. updated_at должен меняться при любом
+# изменении данных заказа: bulk-операции без сигналов вызывают Record.touch() сами
+MARGIN_CACHE_TIMEOUT = 7 * 24 * 3600
+MARGIN_FIELDS = ('margin_total', 'margin_yura', 'margin_oleg')
+
+
+def get_monthly_margins(records, year, month=None):
+    """{месяц: {'margin_total', 'margin_yura', 'margin_oleg'}} по заказам года (или одного месяца).
+
+    records — заказы этого периода (с prefetch для calculate_record_margin); пересчитываются
+    только месяцы, которых нет в кэше. Не больше 12 записей кэша на год.
+    """
+    period = Record.objects.filter(created_at__year=year)
+    if month:
+        period = period.filter(created_at__month=month)
+    stamps = (
+        period.order_by().annotate(month=TruncMonth('created_at'))
+        .values('month').annotate(count=Count('id'), last_updated=Max('updated_at'))
+    )
+    prefix = f"analytics_margin:c{ns_version('catalog')}:w{ns_version('workers')}:{year}"
+    keys = {
+        row['month'].month: f"{prefix}:{row['month'].month}:{row['count']}:{row['last_updated'].timestamp()}"
+        for row in stamps
+    }
+    cached = cache.get_many(list(keys.values()))
+    margins = {m: cached[key] for m, key in keys.items() if key in cached}
+    missing = {m: {field: 0 for field in MARGIN_FIELDS} for m in keys if m not in margins}
+    metrics.CACHE_REQUESTS.labels('margin', 'hit').inc(len(margins))
+    if missing:
+        metrics.CACHE_REQUESTS.labels('margin', 'miss').inc(len(missing))
+        for record in records:
+            totals = missing.get(timezone.localtime(record.created_at).month)
+            if totals is not None:
+                margin_data = calculate_record_margin(record)
+                for field in MARGIN_FIELDS:
+                    totals[field] += margin_data[field]
+        cache.set_many({keys[m]: totals for m, totals in missing.items()}, MARGIN_CACHE_TIMEOUT)
+        margins.update(missing)
+    return margins
+
+
 @login_required
 def analytics_dashboard(request):
     """Панель аналитики с диаграммами и статистикой"""
@@ -64,57 +115,28 @@ def analytics_dashboard(request):
         9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
     }
     
-    # Кэшируем результаты расчетов для всех записей
-    margin_cache = {}
-    for record in records:
-        # Используем кэш на основе ID записи и времени обновления
-        cache_key = f"record_margin_{record.id}_{record.updated_at.timestamp() if hasattr(record, 'updated_at') else record.created_at.timestamp()}"
-        margin_data = cache.get(cache_key)
-        if margin_data is None:
-            margin_data = calculate_record_margin(record)
-            # Кэшируем на 1 час
-            cache.set(cache_key, margin_data, 3600)
-        margin_cache[record.id] = margin_data
+    # Моржа периода по месяцам (кэш — агрегат на месяц)
+    monthly_margins = get_monthly_margins(records, selected_year, selected_month)
     
     # Анализ моржи по месяцам
     margin_by_month = []
     if selected_month:
-        total_margin = 0
-        for record in records:
-            total_margin += margin_cache[record.id]['margin_total']
+        total_margin = sum(m['margin_total'] for m in monthly_margins.values())
         margin_by_month.append({
             'month': month_names[selected_month],
             'margin': round(total_margin, 2)
         })
     else:
-        year_records = Record.objects.filter(created_at__year=selected_year).select_related(
-            'designer', 'designer_worker', 'assembler_worker'
-        ).prefetch_related('files', 'unplanned_expenses', 'recordproduct_set__product')
         for month in range(1, 13):
-            month_records = year_records.filter(created_at__month=month)
-            total_margin = 0
-            for record in month_records:
-                # Используем кэш или вычисляем
-                cache_key = f"record_margin_{record.id}_{record.updated_at.timestamp() if hasattr(record, 'updated_at') else record.created_at.timestamp()}"
-                margin_data = cache.get(cache_key)
-                if margin_data is None:
-                    margin_data = calculate_record_margin(record)
-                    cache.set(cache_key, margin_data, 3600)
-                total_margin += margin_data['margin_total']
             margin_by_month.append({
                 'month': calendar.month_name[month],
-                'margin': round(total_margin, 2)
+                'margin': round(monthly_margins.get(month, {}).get('margin_total', 0), 2)
             })
     
     # Распределение моржи
-    yura_margin = 0
-    oleg_margin = 0
-    total_margin = 0
-    for record in records:
-        margin_data = margin_cache[record.id]
-        total_margin += margin_data['margin_total']
-        yura_margin += margin_data['margin_yura']
-        oleg_margin += margin_data['margin_oleg']
+    total_margin = sum(m['margin_total'] for m in monthly_margins.values())
+    yura_margin = sum(m['margin_yura'] for m in monthly_margins.values())
+    oleg_margin = sum(m['margin_oleg'] for m in monthly_margins.values())
     
     margin_distribution = [
         {'name': 'Юра', 'value': round(yura_margin, 2)},
@@ -6,17 +6,14 @@ from django.contrib.auth.decorators import login_required
 from django.db import models
 from datetime import datetime
 from ..models import Record, Profile
+from ..utils.user_role import get_user_role
 
 
 def home(request):
     # Если пользователь не админ, показываем только его записи
     if request.user.is_authenticated and not (request.user.is_staff or request.user.is_superuser):
-        # Получаем профиль пользователя
-        try:
-            profile = Profile.objects.get(user=request.user)
-            designer = profile.designer
-        except Profile.DoesNotExist:
-            designer = None
+        # Профиль и работник пользователя (один запрос на весь запрос, см. utils/user_role.py)
+        designer = get_user_role(request).designer
         
         if designer:
             # Пользователь — работник: показываем его задания
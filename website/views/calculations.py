@@ -130,14 +130,18 @@ def calculate_record_margin(record):
         except (ValueError, TypeError, Exception):
             margin_total = Decimal('0')
     
-    # Учет индивидуальных расходов по людям
+    # Учет индивидуальных расходов по людям (по .all() — работает и с prefetch_related)
+    expenses = record.unplanned_expenses.all()
     unplanned_spent = {
-        'Юра': sum(e.price for e in record.unplanned_expenses.filter(spent_by='Юра')),
-        'Олег': sum(e.price for e in record.unplanned_expenses.filter(spent_by='Олег')),
+        'Юра': sum(e.price for e in expenses if e.spent_by == 'Юра'),
+        'Олег': sum(e.price for e in expenses if e.spent_by == 'Олег'),
     }
     
     buyer_product_spent = {'Юра': Decimal('0'), 'Олег': Decimal('0')}
-    for rp in record.recordproduct_set.all().select_related('product'):
+    record_products = record.recordproduct_set.all()
+    if 'recordproduct_set' not in getattr(record, '_prefetched_objects_cache', {}):
+        record_products = record_products.select_related('product')
+    for rp in record_products:
         unit_price = rp.custom_price if rp.custom_price is not None else rp.product.our_price
         try:
             line_total = Decimal(str(unit_price)) * Decimal(rp.quantity)
@@ -6,6 +6,7 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from decimal import Decimal, InvalidOperation
 from ..models import Product, Category, ProductCustomField, CategoryField
+from ..utils.price_history import record_price
 
 
 @login_required
@@ -54,6 +55,7 @@ def create_product(request):
                 pass
         
         product.save()
+        record_price(product.id, product.our_price, 'site')
         
         # Добавляем характеристики
         if product.category:
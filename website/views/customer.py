@@ -5,17 +5,16 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from ..models import Record, Profile
 from ..decorators import customer_required
+from ..utils.user_role import get_user_role
 
 
 @login_required
 def customer_orders(request):
     """Список заказов для заказчика"""
     # Получаем профиль пользователя
-    try:
-        profile = Profile.objects.get(user=request.user)
-    except Profile.DoesNotExist:
-        Profile.objects.create(user=request.user)
-        profile = Profile.objects.get(user=request.user)
+    profile = get_user_role(request).profile
+    if profile is None:
+        profile = Profile.objects.create(user=request.user)
     
     # Если пользователь - работник или админ, показываем все заказы
     if request.user.is_staff or profile.is_worker:
@@ -40,10 +39,7 @@ def customer_order_detail(request, pk):
     """Детальная информация о заказе для заказчика"""
     record = get_object_or_404(Record, id=pk)
     
-    try:
-        profile = Profile.objects.get(user=request.user)
-    except Profile.DoesNotExist:
-        profile = None
+    profile = get_user_role(request).profile
     
     # Проверка прав доступа
     if not request.user.is_staff and profile and not profile.is_worker:
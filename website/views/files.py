@@ -7,31 +7,24 @@ import pandas as pd
 import os
 from decimal import Decimal
 from ..models import Record, UploadedFile
+from ..utils.user_role import get_user_role
 
 
 @login_required
 def add_file(request, pk):
     """Добавление файлов к записи - доступно администраторам и рабочим"""
-    from ..models import Profile
     record = get_object_or_404(Record, id=pk)
     
     # Проверка прав доступа
     if request.user.is_staff or request.user.is_superuser:
         pass
     else:
-        try:
-            profile = request.user.profile
-            if profile and profile.designer:
-                user_designer = profile.designer
-                if not (record.designer == user_designer or 
-                        record.designer_worker == user_designer or 
-                        record.assembler_worker == user_designer):
-                    messages.error(request, 'У вас нет прав для добавления файлов к этой записи')
-                    return redirect('record_detail', pk=pk)
-            else:
-                messages.error(request, 'У вас нет прав для добавления файлов')
+        role = get_user_role(request)
+        if role.designer:
+            if not role.works_on(record):
+                messages.error(request, 'У вас нет прав для добавления файлов к этой записи')
                 return redirect('record_detail', pk=pk)
-        except Profile.DoesNotExist:
+        else:
             messages.error(request, 'У вас нет прав для добавления файлов')
             return redirect('record_detail', pk=pk)
     
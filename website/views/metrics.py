@@ -0,0 +1,24 @@
+"""Страница /metrics для Prometheus"""
+import hmac
+import os
+
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+from ..utils import metrics as app_metrics
+
+
+def metrics(request):
+    """Метрики всех процессов (см. website/utils/metrics.py).
+
+    Без логина: Prometheus ходит без сессии. Если задан METRICS_TOKEN, нужен заголовок
+    Authorization: Bearer <METRICS_TOKEN>.
+    """
+    if not app_metrics.ENABLED:
+        raise Http404
+    token = os.environ.get('METRICS_TOKEN', '')
+    if token:
+        auth = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(auth.encode(), f'Bearer {token}'.encode()):
+            return HttpResponseForbidden()
+    body, content_type = app_metrics.render_latest()
+    return HttpResponse(body, content_type=content_type)
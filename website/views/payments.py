@@ -126,8 +126,16 @@ def payments_page(request):
         records_as_designer_worker = Record.objects.filter(designer_worker=worker).select_related('designer', 'designer_worker', 'assembler_worker')
         records_as_assembler = Record.objects.filter(assembler_worker=worker).select_related('designer', 'designer_worker', 'assembler_worker')
         
-        # Объединяем все записи
-        all_records = (records_as_designer | records_as_designer_worker | records_as_assembler).distinct()
+        # Объединяем все записи (файлы — для расчёта площади по м²)
+        all_records = (records_as_designer | records_as_designer_worker | records_as_assembler).distinct().prefetch_related('files')
+        
+        # Существующие выплаты работника — одним запросом, а не get() на каждую запись
+        existing_payments = {
+            (p.record_id, p.role): p
+            for p in WorkerPayment.objects.filter(worker=worker)
+        }
+        new_payments = []
+        changed_payments = []
         
         # Рассчитываем зарплату для каждой записи
         records_with_salary = []
@@ -156,25 +164,22 @@ def payments_page(request):
             
             if salary > 0 and role_key:
                 # Получаем или создаем запись о выплате
-                try:
-                    payment = WorkerPayment.objects.get(
-                        record=record,
-                        worker=worker,
-                        role=role_key
-                    )
+                payment = existing_payments.get((record.id, role_key))
+                if payment is not None:
                     # Обновляем сумму, если она изменилась
                     if payment.amount != salary:
                         payment.amount = salary
-                        payment.save(update_fields=['amount'])
-                except WorkerPayment.DoesNotExist:
+                        changed_payments.append(payment)
+                else:
                     # Создаем новую запись о выплате
-                    payment = WorkerPayment.objects.create(
+                    payment = WorkerPayment(
                         record=record,
                         worker=worker,
                         role=role_key,
                         amount=salary,
                         is_paid=False
                     )
+                    new_payments.append(payment)
                 
                 # Добавляем в список все выплаты (и оплаченные, и неоплаченные)
                 basis = _get_payment_basis(record, worker, role_key)
@@ -192,13 +197,20 @@ def payments_page(request):
                 })
                 total_salary_gross += salary
 
+        # Сохраняем выплаты пачкой; bulk-операции не шлют post_save, поэтому заказы отмечаем сами
+        if new_payments:
+            WorkerPayment.objects.bulk_create(new_payments)
+        if changed_payments:
+            WorkerPayment.objects.bulk_update(changed_payments, ['amount'])
+        Record.touch([p.record_id for p in new_payments + changed_payments])
+
         # Подтягиваем вычеты пачкой для всех выплат работника (чтобы избежать N+1)
         payment_ids = [row["payment"].id for row in records_with_salary]
         payments_prefetched = {
             p.id: p
             for p in WorkerPayment.objects.filter(id__in=payment_ids)
-            .select_related("record", "worker")
-            .prefetch_related("deductions")
+            .select_related("record", "worker__method", "worker__profession")
+            .prefetch_related("deductions", "record__files")
         }
         for row in records_with_salary:
             p = payments_prefetched.get(row["payment"].id, row["payment"])
@@ -244,9 +256,9 @@ def payments_page(request):
     active_payments = WorkerPayment.objects.filter(
         is_paid=False
     ).select_related(
-        'record', 'worker'
+        'record', 'worker__method', 'worker__profession'
     ).prefetch_related(
-        'deductions'
+        'deductions', 'record__files'
     ).order_by('-created_at')
     
     # Формируем данные для активных выплат
@@ -276,9 +288,9 @@ def payments_page(request):
     
     # Получаем ВСЕ выплаты для модальных окон (включая оплаченные)
     all_payments = WorkerPayment.objects.select_related(
-        'record', 'worker'
+        'record', 'worker__method', 'worker__profession'
     ).prefetch_related(
-        'deductions'
+        'deductions', 'record__files'
     ).order_by('-created_at')
     
     # Формируем данные для ВСЕХ выплат (для модальных окон)
@@ -326,7 +338,11 @@ def payments_page(request):
 
     # Группируем выплаты по заказам для отображения сводки по каждому заказу
     order_payments_map = {}
-    payments_qs = WorkerPayment.objects.select_related('record', 'worker').prefetch_related('deductions').order_by('-record__created_at')
+    payments_qs = (
+        WorkerPayment.objects.select_related('record', 'worker__method', 'worker__profession')
+        .prefetch_related('deductions', 'record__files')
+        .order_by('-record__created_at')
+    )
 
     for payment in payments_qs:
         record = payment.record
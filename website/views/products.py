@@ -5,11 +5,16 @@ from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
 from django.db.models import Q
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from openpyxl import load_workbook
 from io import BytesIO
+from datetime import datetime, time
 from decimal import Decimal, InvalidOperation
 from ..models import RecordProduct, Record, Product, Category, ProductCustomField
 from ..forms import ProductFilterForm
+from ..utils.price_history import record_price_changes, price_aggregates, PERIODS
+from ..utils.db_features import json_key_q, text_search
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import user_passes_test
 
@@ -132,6 +137,8 @@ def clear_products(request, pk):
     record = get_object_or_404(Record, id=pk)
     RecordProduct.objects.filter(record=record).delete()
     record.products.clear()
+    # одним UPDATE, не полагаясь на post_delete каждой строки (ключ кэша моржи в аналитике)
+    Record.touch([record.id])
     messages.success(request, "Комплектующие очищены.")
     return redirect('record_detail', pk=pk)
 
@@ -149,16 +156,16 @@ def add_products_to_record(request, pk):
     
     # Базовые queryset'ы
     products_qs = Product.objects.select_related('category').prefetch_related(
-        'product_custom_fields__category_field'
+        'product_custom_fields__category_field', 'category__category_fields'
     ).all()
 
     # Применяем фильтры к продуктам
     if filter_form.is_valid():
         filters = Q()
         
-        # Поиск по названию
+        # Поиск по подстроке названия (на PostgreSQL — по триграммному GIN-индексу)
         if search := filter_form.cleaned_data.get('search'):
-            filters &= Q(name__icontains=search)
+            products_qs = text_search(products_qs, 'name', search)
         
         # Фильтры по категории
         if category := filter_form.cleaned_data.get('category'):
@@ -173,9 +180,8 @@ def add_products_to_record(request, pk):
         for key, value in filter_form.cleaned_data.items():
             if key.startswith('filter_') and value:
                 field_key = key.replace('filter_', '')
-                # Используем специальный формат для JSONField в Django
-                # Это работает и для SQLite, и для PostgreSQL
-                products_qs = products_qs.filter(**{f'custom_fields__{field_key}': value})
+                # На PostgreSQL — custom_fields @> {key: value} по GIN-индексу
+                products_qs = products_qs.filter(json_key_q('custom_fields', field_key, value))
     
     # Фильтры по ProductCustomField (индивидуальные характеристики)
     # Обрабатываем их отдельно, так как они не в форме
@@ -257,6 +263,8 @@ def add_products_to_record(request, pk):
             ]
             RecordProduct.objects.bulk_create(record_products)
             record.products.set(products_dict.values())
+        # bulk_create не шлёт post_save — отмечаем заказ сами (ключ кэша моржи в аналитике)
+        Record.touch([record.id])
 
         messages.success(request, "Комплектующие успешно сохранены!")
         return redirect('record_detail', pk=pk)
@@ -279,21 +287,25 @@ def add_products_to_record(request, pk):
     # Получаем категории с их характеристиками для фильтров
     categories_with_fields = []
     selected_pcf_filters = {}  # Сохраняем выбранные значения для отображения
-    from ..models import CategoryField, ProductCustomField
-    for category in Category.objects.all():
-        fields = category.category_fields.all()
-        if fields.exists():
+    from ..models import ProductCustomField
+    # Уникальные значения ProductCustomField по всем полям — одним запросом
+    values_by_field = {}
+    pcf_values = (
+        ProductCustomField.objects.filter(category_field__isnull=False).exclude(value='')
+        .values_list('category_field_id', 'value').distinct().order_by('category_field_id', 'value')
+    )
+    for field_id, value in pcf_values:
+        values_by_field.setdefault(field_id, []).append(value)
+
+    for category in Category.objects.prefetch_related('category_fields'):
+        fields = list(category.category_fields.all())
+        if fields:
             # Получаем поля с ProductCustomField для фильтрации
             pcf_fields = []
             for field in fields:
-                # Получаем уникальные значения для этого поля из ProductCustomField
-                unique_values = ProductCustomField.objects.filter(
-                    category_field=field,
-                    product__in=Product.objects.all()  # Используем все продукты для получения всех значений
-                ).exclude(value='').values_list('value', flat=True).distinct().order_by('value')
-                
-                if unique_values.exists():
-                    field.unique_values = list(unique_values)
+                unique_values = values_by_field.get(field.id)
+                if unique_values:
+                    field.unique_values = unique_values
                     # Сохраняем выбранное значение для этого поля (используем строковый ключ)
                     selected_value = request.GET.get(f'pcf_filter_{field.id}', '')
                     selected_pcf_filters[str(field.id)] = selected_value
@@ -346,6 +358,7 @@ def product_detail(request, pk):
         else:
             product.category = None
         # Цена: обновляем только если введено новое значение
+        old_price = product.our_price
         if our_price:
             try:
                 product.our_price = Decimal(our_price)
@@ -370,6 +383,7 @@ def product_detail(request, pk):
             messages.success(request, "Изображение удалено")
 
         product.save()
+        record_price_changes([(product.id, old_price, product.our_price)], 'site')
         
         # Информируем об изменении цены
         if our_price:
@@ -501,6 +515,79 @@ def products_list(request):
     return render(request, 'products_list.html', {'products': products})
 
 
+def _parse_history_params(request):
+    """Общие GET-параметры для эндпоинтов истории цен: period, source, since, until (YYYY-MM-DD)"""
+    period = request.GET.get('period', 'month')
+    if period not in PERIODS:
+        raise ValueError(f'period должен быть одним из: {", ".join(PERIODS)}')
+
+    bounds = {}
+    for key in ('since', 'until'):
+        raw = request.GET.get(key)
+        if not raw:
+            bounds[key] = None
+            continue
+        day = parse_date(raw)
+        if day is None:
+            raise ValueError(f'Неверная дата {key}: {raw}')
+        bounds[key] = timezone.make_aware(datetime.combine(day, time.min))
+    return period, (request.GET.get('source') or None), bounds['since'], bounds['until']
+
+
+def _serialize_price_rows(rows):
+    return [
+        {
+            'product_id': row['product_id'],
+            'period': row['period'].date().isoformat(),
+            'min': f"{row['min_price']:.2f}",
+            'max': f"{row['max_price']:.2f}",
+            'last': f"{row['last_price']:.2f}",
+            'last_ts': row['last_ts'].isoformat(),
+            'points': row['points'],
+        }
+        for row in rows
+    ]
+
+
+@login_required
+def product_price_history(request, pk):
+    """JSON: min/max/последняя цена товара по периодам"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'success': False, 'error': 'Доступ запрещен'}, status=403)
+    product = get_object_or_404(Product.objects.only('id', 'name'), id=pk)
+    try:
+        period, source, since, until = _parse_history_params(request)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    rows = price_aggregates([product.id], period=period, source=source, since=since, until=until)
+    return JsonResponse({
+        'success': True,
+        'product': {'id': product.id, 'name': product.name},
+        'period': period,
+        'rows': _serialize_price_rows(rows),
+    })
+
+
+@login_required
+def price_history_summary(request):
+    """JSON: агрегаты истории цен сразу по многим товарам (?products=1,2,3 или ?category=<id>)"""
+    if not (request.user.is_staff or request.user.is_superuser):
+        return JsonResponse({'success': False, 'error': 'Доступ запрещен'}, status=403)
+    try:
+        period, source, since, until = _parse_history_params(request)
+        product_ids = None
+        if request.GET.get('products'):
+            product_ids = [int(x) for x in request.GET['products'].split(',') if x.strip()]
+        elif request.GET.get('category'):
+            product_ids = Product.objects.filter(category_id=int(request.GET['category'])).values_list('id', flat=True)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    rows = price_aggregates(product_ids, period=period, source=source, since=since, until=until)
+    return JsonResponse({'success': True, 'period': period, 'rows': _serialize_price_rows(rows)})
+
+
 def get_mounting_types_by_category(category_name):
     """Возвращает доступные типы монтажа для категории"""
     if 'петл' in category_name.lower():
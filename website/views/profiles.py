@@ -110,10 +110,10 @@ def profiles_list(request):
     if missing:
         TailscaleInviteLink.objects.bulk_create(missing, ignore_conflicts=True)
     
-    # Создаем профили для всех пользователей
-    users = User.objects.all()
-    for user in users:
-        Profile.objects.get_or_create(user=user)
+    # Создаем недостающие профили (одним запросом, а не get_or_create на каждого пользователя)
+    missing_profiles = [Profile(user=user) for user in User.objects.filter(profile__isnull=True)]
+    if missing_profiles:
+        Profile.objects.bulk_create(missing_profiles, ignore_conflicts=True)
     
     # Получаем профили с предзагрузкой
     profiles = Profile.objects.select_related(
@@ -2,14 +2,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from decimal import Decimal, InvalidOperation
 import os
 import logging
 from django.conf import settings
-from ..models import Record, RecordProduct, UploadedFile, Category, Designer, Profile
+from ..models import Record, RecordProduct, UploadedFile, Category, Designer, RecordStatusEvent
 from ..forms import AddRecordForm, UpdateRecordForm
 from ..utils.csv_cache import get_record_files_area
+from ..utils.record_events import log_record_changes, events_after
+from ..utils.user_role import get_user_role
 
 logger = logging.getLogger(__name__)
 
@@ -69,9 +74,15 @@ def update_record(request, pk):
         return redirect('record_detail', pk=pk)
     
     if request.method == 'POST':
+        # form.is_valid() меняет instance — старые значения запоминаем до привязки формы
+        old_values = {'status': current_record.status, 'workshop_price': current_record.workshop_price}
         form = UpdateRecordForm(request.POST, request.FILES, instance=current_record)
         if form.is_valid():
             record = form.save()
+            log_record_changes(
+                [(record.id, name, old, getattr(record, name)) for name, old in old_values.items()],
+                'site',
+            )
             if 'file' in request.FILES:
                 UploadedFile.objects.create(record=record, file=request.FILES['file'])
             messages.success(request, "Запись успешно обновлена!")
@@ -120,6 +131,7 @@ def update_record_status(request, pk):
             old_status = record.status
             record.status = new_status
             record.save(update_fields=['status'])
+            log_record_changes([(record.id, 'status', old_status, new_status)], 'site')
             
             # Отправляем уведомления работникам об изменении статуса
             if old_status != new_status:
@@ -139,7 +151,15 @@ def update_record_status(request, pk):
 
 def record_detail(request, pk):
     """Детальная информация о записи с расчетами зарплат и моржи"""
-    customer_record = get_object_or_404(Record, id=pk)
+    # работники заказа с профессией и способом расчёта нужны для прав, зарплат и шаблона
+    customer_record = get_object_or_404(
+        Record.objects.select_related(
+            'designer__profession', 'designer__method',
+            'designer_worker__profession', 'designer_worker__method',
+            'assembler_worker__profession', 'assembler_worker__method',
+        ),
+        id=pk,
+    )
     
     # Проверка прав доступа
     user_role = None
@@ -150,21 +170,18 @@ def record_detail(request, pk):
         if request.user.is_staff or request.user.is_superuser:
             user_role = 'admin'
         else:
-            try:
-                profile = request.user.profile
-                if profile and profile.designer:
-                    user_designer = profile.designer
-                    user_role = profile.designer.profession.name if profile.designer.profession else None
-                    
-                    if not (customer_record.designer == user_designer or 
-                            customer_record.designer_worker == user_designer or 
-                            customer_record.assembler_worker == user_designer):
-                        return HttpResponseForbidden("У вас нет доступа к этой записи.")
-                    
-                    if user_role == 'дизайнер' and user_designer.method:
-                        user_payment_method = user_designer.method.name.lower()
-            except Profile.DoesNotExist:
+            role = get_user_role(request)
+            if role.profile is None:
                 return HttpResponseForbidden("У вас нет доступа к этой записи.")
+            if role.designer:
+                user_designer = role.designer
+                user_role = role.profession_name
+                
+                if not role.works_on(customer_record):
+                    return HttpResponseForbidden("У вас нет доступа к этой записи.")
+                
+                if user_role == 'дизайнер' and user_designer.method:
+                    user_payment_method = role.method_name
     else:
         from django.contrib.auth.views import redirect_to_login
         return redirect_to_login(request.get_full_path())
@@ -560,3 +577,58 @@ def record_detail(request, pk):
         'workers_on_project': workers_on_project,
     })
 
+
+
+@login_required
+def record_changes(request):
+    """JSON: изменения статуса/стоимости цеха после курсора (?after=<id события>) или времени (?since=<ISO>).
+
+    Админы видят все заказы, работники — свои задания, заказчики — свои заказы.
+    """
+    after = request.GET.get('after')
+    since_raw = request.GET.get('since')
+    try:
+        after_id = int(after) if after else None
+        limit = int(request.GET.get('limit', 200))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'after и limit должны быть числами'}, status=400)
+    try:
+        since = parse_datetime(since_raw) if since_raw else None
+    except ValueError:
+        since = None
+    if since_raw and since is None:
+        return JsonResponse({'success': False, 'error': f'Неверная дата since: {since_raw}'}, status=400)
+    if since and timezone.is_naive(since):
+        # без смещения — время сервера (TIME_ZONE), как в интерфейсе
+        since = timezone.make_aware(since)
+
+    qs = RecordStatusEvent.objects.all()
+    if not (request.user.is_staff or request.user.is_superuser):
+        designer = get_user_role(request).designer
+        designer_id = designer.id if designer else None
+        if designer_id:
+            qs = qs.filter(
+                Q(record__designer_id=designer_id) |
+                Q(record__designer_worker_id=designer_id) |
+                Q(record__assembler_worker_id=designer_id)
+            )
+        else:
+            qs = qs.filter(record__customer=request.user)
+
+    events = events_after(qs, after_id=after_id, since=since, limit=limit)
+    return JsonResponse({
+        'success': True,
+        'events': [
+            {
+                'id': e.id,
+                'record_id': e.record_id,
+                'field': e.field,
+                'old': e.old_value,
+                'new': e.new_value,
+                'source': e.source,
+                'ts': e.ts.isoformat(),
+            }
+            for e in events
+        ],
+        'last_id': events[-1].id if events else after_id,
+    })
@@ -1,51 +1,56 @@
 """Утилиты и вспомогательные функции"""
-from django.shortcuts import redirect
+from django.shortcuts import redirect, render
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.management import call_command
-import threading
-
-
-def _start_ufaloft_background(interval: str, index_field: str, verbose: str, headless: str, mode: str) -> None:
-    def run():
-        args = ['--interval-min', str(interval), '--index-field', index_field]
-        if verbose == '1':
-            args.append('--verbose')
-        try:
-            if mode == 'requests':
-                call_command('ufaloft_requests_watch', *args)
-            else:
-                # For interactive selenium mode we force GUI (no headless),
-                # because the user is expected to login/2FA in the opened browser window.
-                if mode != 'selenium' and headless == '1':
-                    args.append('--headless')
-                call_command('ufaloft_watch', *args)
-        except Exception:
-            pass
-
-    threading.Thread(target=run, name='UfaloftWatchFromUI', daemon=True).start()
+from django.http import JsonResponse
+
+from ..models import UfaloftWatcher
+from ..utils.watcher_registry import WATCH_COMMANDS, request_start, watcher_status
+
+
+def _wants_json(request) -> bool:
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
 
 
 @login_required
 def start_ufaloft_watch(request):
-    """Запуск Selenium-наблюдателя из UI"""
-    interval = request.GET.get('interval', '60')
+    """Запрос на запуск UFALOFT watcher'а. Запускает его сервис run_scheduler; если watcher
+    (любого режима) уже работает или уже запрошен, возвращается его состояние — второй не создаётся."""
+    mode = request.GET.get('mode', '')  # hybrid|browser|requests (selenium == hybrid)
+    mode = mode if mode in WATCH_COMMANDS else 'hybrid'
+    try:
+        interval = max(1, int(request.GET.get('interval', '60')))
+    except ValueError:
+        interval = 60
     index_field = request.GET.get('index', 'first_name')
-    verbose = request.GET.get('v', '1')
-    headless = request.GET.get('headless', '')
-    mode = request.GET.get('mode', '')  # selenium|requests
-
-    _start_ufaloft_background(interval, index_field, verbose, headless, mode)
-    if mode == 'requests':
-        messages.success(request, 'UFALOFT запущен в фоне (requests). Нужны сохранённые cookies: выполните ufaloft_login.')
-    elif mode == 'selenium':
+    if index_field not in ('first_name', 'last_name'):
+        index_field = 'first_name'
+
+    watcher, requested = request_start(mode, interval, index_field)
+    if _wants_json(request):
+        return JsonResponse({'success': True, 'requested': requested, 'watcher': watcher_status(watcher)})
+
+    if requested:
+        messages.success(request, f'Запуск UFALOFT watcher ({mode}) запрошен — планировщик запустит его в течение минуты.')
+    elif watcher.is_alive:
+        messages.info(request, f'UFALOFT watcher ({watcher.mode}) уже работает — новый не запускается.')
+    else:
+        messages.info(request, f'Запуск UFALOFT watcher ({watcher.mode}) уже запрошен и ожидает планировщик.')
+    if mode != 'requests':
         # noVNC is exposed on host port 7900 by default. We can't "open a window" on user's PC,
         # but user can open noVNC in their browser and login/2FA there.
         host = request.get_host().split(':')[0]
-        messages.success(request, f'UFALOFT Selenium запущен. Откройте браузерное окно Chrome через noVNC: http://{host}:7900 (затем войдите/2FA).')
-    else:
-        messages.success(request, 'UFALOFT Selenium запущен в фоне. На сервере без GUI используйте mode=requests или headless=1.')
-    return redirect('home')
+        messages.info(request, f'Если cookies устарели, Chrome откроется для входа — откройте noVNC: http://{host}:7900 (затем войдите/2FA).')
+    return redirect('ufaloft_status')
+
+
+@login_required
+def ufaloft_status(request):
+    """Состояние UFALOFT watcher'ов: heartbeat, последний цикл, длительность, обновлённые записи"""
+    watchers = list(UfaloftWatcher.objects.all())
+    if _wants_json(request):
+        return JsonResponse({'success': True, 'watchers': [watcher_status(w) for w in watchers]})
+    return render(request, 'ufaloft_status.html', {'watchers': watchers})
 
 
 @login_required